@@ -0,0 +1,229 @@
+# agent.py
+#
+# Lightweight agent: samples this machine with SystemStats (no charts, no
+# per-core history, no process table) and streams compact binary samples
+# to a collector (main.py --collect, or collector.py) over TCP or a Unix
+# socket. See remote.py for the protocol.
+#
+# Usage: python agent.py --connect HOST:PORT [--interval S] [--batch-interval S] [--name NAME]
+#        python agent.py --unix PATH ...
+#        python agent.py --connect HOST:PORT --simulate 100   # 100 synthetic agents in one process
+
+import argparse
+import asyncio
+import socket
+import sys
+import time
+from collections import deque
+
+import remote
+from sampler import advance_deadline
+from constants import UPDATE_INTERVAL, AGENT_BATCH_INTERVAL, AGENT_QUEUE, AGENT_RECONNECT_MAX, GPU_PROVIDER
+
+
+class Agent:
+    # sample: callable returning one packed remote.FRAME
+    def __init__(self, name, sample, interval=UPDATE_INTERVAL / 1000, batch_interval=AGENT_BATCH_INTERVAL,
+                 queue=AGENT_QUEUE, gpu_name="No GPU"):
+        self.name = name
+        self.sample = sample
+        self.interval = interval
+        self.batch_interval = batch_interval
+        self.gpu_name = gpu_name
+        self.pending = deque(maxlen=queue)
+        self.sampled = 0
+        self.sent = 0
+        self.dropped = 0
+        self.batches = 0
+        self._credits = 0
+        self._credit_event = None
+
+    async def run(self, connect, count=None):
+        # connect: coroutine function returning (reader, writer). Stops after
+        # count samples have been sent, else runs until cancelled
+        self._credit_event = asyncio.Event()
+        sampling = asyncio.ensure_future(self._sample_loop(count))
+        try:
+            await self._connection_loop(connect, count)
+        finally:
+            sampling.cancel()
+
+    async def _sample_loop(self, count):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while count is None or self.sampled < count:
+            try:
+                frame = self.sample()
+            except Exception as e:
+                print(f"Agent {self.name} sample error: {e}")
+            else:
+                if len(self.pending) == self.pending.maxlen:
+                    self.dropped += 1
+                self.pending.append(frame)
+                self.sampled += 1
+            now = loop.time()
+            next_tick = advance_deadline(next_tick, self.interval, now)
+            await asyncio.sleep(next_tick - now)
+
+    async def _connection_loop(self, connect, count):
+        delay = 1.0
+        while count is None or self.sent + self.dropped < count:
+            try:
+                reader, writer = await connect()
+            except OSError as e:
+                print(f"Agent {self.name}: cannot connect ({e}), retrying in {delay:.0f} s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, AGENT_RECONNECT_MAX)
+                continue
+            delay = 1.0
+            self._credits = 0
+            self._credit_event.clear()
+            credits = asyncio.ensure_future(self._read_credits(reader))
+            try:
+                writer.write(remote.hello(self.name, self.gpu_name, self.interval))
+                await self._send_loop(writer, count, credits)
+                return
+            except (OSError, asyncio.IncompleteReadError, remote.ProtocolError) as e:
+                print(f"Agent {self.name}: connection lost ({e})")
+            finally:
+                credits.cancel()
+                writer.close()
+
+    async def _send_loop(self, writer, count, credits):
+        loop = asyncio.get_running_loop()
+        next_batch = loop.time()
+        while count is None or self.sent + self.dropped < count:
+            now = loop.time()
+            next_batch = advance_deadline(next_batch, self.batch_interval, now)
+            await asyncio.sleep(next_batch - now)
+            if not self.pending:
+                continue
+            if self._credits <= 0:
+                # Collector is behind: keep sampling into the queue. The
+                # credit reader ends only when the connection drops, so wait
+                # on it too rather than for a credit that cannot come
+                waiter = asyncio.ensure_future(self._credit_event.wait())
+                try:
+                    done, _ = await asyncio.wait({waiter, credits}, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    waiter.cancel()
+                if credits in done:
+                    credits.result()
+                    raise ConnectionResetError('collector stopped sending credits')
+            frames = list(self.pending)
+            self.pending.clear()
+            self._credits -= 1
+            if self._credits <= 0:
+                self._credit_event.clear()
+            try:
+                writer.write(remote.message(remote.BATCH, b''.join(frames)))
+                # TCP backpressure: wait while the socket buffer is full
+                await writer.drain()
+            except BaseException:
+                # Not delivered: resend on the next connection
+                self._requeue(frames)
+                raise
+            self.sent += len(frames)
+            self.batches += 1
+
+    def _requeue(self, frames):
+        # Put unsent frames back ahead of the ones sampled since; what no
+        # longer fits is dropped, oldest first, and counted
+        frames.extend(self.pending)
+        kept = frames[-self.pending.maxlen:]
+        self.dropped += len(frames) - len(kept)
+        self.pending.clear()
+        self.pending.extend(kept)
+
+    async def _read_credits(self, reader):
+        while True:
+            kind, length = remote.parse_header(await reader.readexactly(remote.HEADER.size))
+            payload = await reader.readexactly(length)
+            if kind == remote.CREDIT:
+                self._credits += remote.CREDIT_PAYLOAD.unpack(payload)[0]
+                if self._credits > 0:
+                    self._credit_event.set()
+
+
+def stats_sampler(gpu_provider=GPU_PROVIDER, interval=UPDATE_INTERVAL / 1000):
+    # -> (sample function, GPU name) for this machine
+    from system_stats import SystemStats
+    from headless import collector_intervals
+    stats = SystemStats(max_history=1, per_core_history=0, top_processes=0,
+                        collector_intervals=collector_intervals(interval), gpu_provider=gpu_provider)
+
+    def sample():
+        stats.update()
+        return remote.pack_snapshot(stats.snapshot())
+
+    stats.update()
+    return sample, stats.get_gpu_info()[1]
+
+
+def synthetic_sampler(seed):
+    # Plausible made-up samples (replay.synthetic_frames) stamped with the
+    # current time, for load tests without a fleet of machines
+    from replay import RECORDED_FIELDS, synthetic_frames
+    frames = synthetic_frames(seconds=10 ** 9, rate=1, cores=4, seed=seed)
+    indexes = [RECORDED_FIELDS.index(field) for field in remote.FRAME_FIELDS[1:]]
+
+    def sample():
+        frame = next(frames)
+        return remote.FRAME.pack(time.time(), *(frame[index] for index in indexes))
+
+    return sample, 'Synthetic GPU'
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(':')
+    if not host or not port.isdigit():
+        raise argparse.ArgumentTypeError(f"expected HOST:PORT, not {text!r}")
+    return host, int(port)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='System Monitor agent')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--connect', type=parse_address, metavar='HOST:PORT', help='collector TCP address')
+    target.add_argument('--unix', metavar='PATH', help='collector Unix socket')
+    parser.add_argument('--name', default=socket.gethostname(), help='host name shown by the collector')
+    parser.add_argument('--interval', type=float, default=UPDATE_INTERVAL / 1000, help='seconds between samples')
+    parser.add_argument('--batch-interval', type=float, default=AGENT_BATCH_INTERVAL,
+                        help='seconds between sends; samples in between go as one batch')
+    parser.add_argument('--count', type=int, help='stop after this many samples')
+    parser.add_argument('--gpu', default=GPU_PROVIDER, help='GPU provider (see main.py --gpu)')
+    parser.add_argument('--simulate', type=int, metavar='N', help='run N synthetic agents instead')
+    return parser.parse_args(argv)
+
+
+async def _main(args):
+    if args.unix:
+        async def connect():
+            return await asyncio.open_unix_connection(args.unix)
+    else:
+        async def connect():
+            return await asyncio.open_connection(*args.connect)
+
+    if args.simulate:
+        agents = []
+        for index in range(args.simulate):
+            sample, gpu_name = synthetic_sampler(index)
+            agents.append(Agent(f"{args.name}-{index}", sample, args.interval, args.batch_interval,
+                                gpu_name=gpu_name))
+    else:
+        sample, gpu_name = stats_sampler(args.gpu, args.interval)
+        agents = [Agent(args.name, sample, args.interval, args.batch_interval, gpu_name=gpu_name)]
+    await asyncio.gather(*(agent.run(connect, args.count) for agent in agents))
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+# alerts.py
+#
+# Threshold alerts fed by the snapshot stream, e.g. from a JSON file:
+#
+#   {
+#     "command": "notify-send \"$SYSTEMMONITOR_ALERT_MESSAGE\"",
+#     "rules": [
+#       {"name": "cpu_high", "metric": "cpu", "op": ">", "threshold": 90, "for": 120, "clear": 80},
+#       {"name": "ram_full", "metric": "ram", "op": ">", "threshold": 95},
+#       {"name": "download_stalled", "metric": "net_down", "op": "<", "threshold": 0.01, "for": 30}
+#     ]
+#   }
+#
+# A rule goes ok -> pending when its condition becomes true, pending ->
+# firing once it has held for "for" seconds (and "cooldown" seconds have
+# passed since it last fired), and firing -> ok only when the value is back
+# past "clear" (hysteresis; defaults to the threshold).
+#
+# Work per sample does not depend on the number of rules: rules are indexed
+# by metric and sorted by threshold, so only rules whose threshold lies
+# between the previous and the current value are visited, and pending rules
+# wait in a heap keyed by the time they become due.
+
+import heapq
+import json
+import os
+import subprocess
+import sys
+import time
+from bisect import bisect_left
+from collections import namedtuple
+
+from constants import ALERT_COOLDOWN
+
+AlertEvent = namedtuple('AlertEvent', ['name', 'state', 'severity', 'metric', 'value', 'threshold', 'timestamp',
+                                       'message'])
+
+# Metric name in rules -> StatsSnapshot field
+METRICS = {
+    'cpu': 'cpu_percent',
+    'ram': 'ram_percent',
+    'gpu': 'gpu_percent',
+    'disk': 'disk_percent',
+    'net_up': 'net_up_kb',
+    'net_down': 'net_down_kb',
+    'disk_read': 'disk_read_kb',
+    'disk_write': 'disk_write_kb',
+}
+OPERATORS = {'>': 1, '<': -1}
+
+
+class AlertRule:
+    def __init__(self, name, metric, op, threshold, duration=0.0, clear=None, cooldown=ALERT_COOLDOWN,
+                 severity='warning', command=None):
+        if metric not in METRICS:
+            raise ValueError(f"rule {name}: unknown metric {metric!r} (one of {', '.join(METRICS)})")
+        if op not in OPERATORS:
+            raise ValueError(f"rule {name}: op must be '>' or '<', not {op!r}")
+        self.name = name
+        self.metric = metric
+        self.op = op
+        self.threshold = float(threshold)
+        self.duration = float(duration)
+        self.clear = float(clear) if clear is not None else self.threshold
+        self.cooldown = float(cooldown)
+        self.severity = severity
+        self.command = command
+        # Both operators become "signed value > level"
+        self.sign = OPERATORS[op]
+        self.trigger_level = self.sign * self.threshold
+        self.clear_level = self.sign * self.clear
+        if self.clear_level > self.trigger_level:
+            raise ValueError(f"rule {name}: clear {self.clear:g} is not on the far side of {op} {self.threshold:g}")
+        self.state = 'ok'
+        self.generation = 0
+        self.last_fired = None
+        self.track = None
+
+    @classmethod
+    def from_dict(cls, spec):
+        spec = dict(spec)
+        try:
+            name, metric, op, threshold = spec.pop('name'), spec.pop('metric'), spec.pop('op'), spec.pop('threshold')
+        except KeyError as e:
+            raise ValueError(f"alert rule {spec} is missing {e}") from None
+        if 'for' in spec:
+            spec['duration'] = spec.pop('for')
+        try:
+            return cls(name, metric, op, threshold, **spec)
+        except TypeError as e:
+            raise ValueError(f"rule {name}: {e}") from None
+
+    def describe(self, value):
+        text = f"{self.name}: {self.metric} {value:.2f} {self.op} {self.threshold:g}"
+        if self.duration:
+            text += f" for {self.duration:g} s"
+        return text
+
+
+class _Track:
+    # The rules on one metric in one direction, sorted by their levels
+    def __init__(self, metric, sign):
+        self.field = METRICS[metric]
+        self.sign = sign
+        self.previous = None
+        self.trigger_levels = []
+        self.trigger_rules = []
+        self.clear_levels = []
+        self.clear_rules = []
+
+    def add(self, rule):
+        index = bisect_left(self.trigger_levels, rule.trigger_level)
+        self.trigger_levels.insert(index, rule.trigger_level)
+        self.trigger_rules.insert(index, rule)
+        index = bisect_left(self.clear_levels, rule.clear_level)
+        self.clear_levels.insert(index, rule.clear_level)
+        self.clear_rules.insert(index, rule)
+
+    @staticmethod
+    def between(levels, rules, low, high):
+        # Rules whose level is in [low, high): crossed going from one to the other
+        return rules[bisect_left(levels, low):bisect_left(levels, high)]
+
+
+class AlertEngine:
+    def __init__(self, rules=(), clock=time.monotonic):
+        self._clock = clock
+        self.rules = {}
+        self._tracks = {}
+        self._due = []
+        self._sequence = 0
+        self._firing = {}
+        self._listeners = []
+        # Currently firing AlertEvents; replaced, never mutated, so the Tk
+        # thread can read it while the sampler thread evaluates
+        self.firing = ()
+        for rule in rules:
+            self.add_rule(rule)
+
+    def add_listener(self, callback):
+        # Called with every AlertEvent, on the thread that calls process()
+        self._listeners.append(callback)
+
+    def add_rule(self, rule):
+        if rule.name in self.rules:
+            raise ValueError(f"duplicate alert rule {rule.name!r}")
+        self.rules[rule.name] = rule
+        key = (rule.metric, rule.sign)
+        track = self._tracks.get(key)
+        if track is None:
+            track = self._tracks[key] = _Track(rule.metric, rule.sign)
+        track.add(rule)
+        rule.track = track
+        if track.previous is not None and track.previous > rule.trigger_level:
+            self._activate(rule, self._clock())
+
+    def process(self, snapshot):
+        # Sampler/headless listener: one call per sample
+        now = self._clock()
+        for track in self._tracks.values():
+            value = getattr(snapshot, track.field)
+            if value == value:  # skip NaN
+                self._advance(track, track.sign * value, now)
+        due = self._due
+        while due and due[0][0] <= now:
+            _, _, generation, rule = heapq.heappop(due)
+            if generation == rule.generation and rule.state == 'pending':
+                self._fire(rule, now)
+
+    def _advance(self, track, value, now):
+        previous = track.previous
+        track.previous = value
+        if previous is None:
+            previous = float('-inf')
+        if value > previous:
+            for rule in track.between(track.trigger_levels, track.trigger_rules, previous, value):
+                self._activate(rule, now)
+        elif value < previous:
+            for rule in track.between(track.trigger_levels, track.trigger_rules, value, previous):
+                if rule.state == 'pending':
+                    rule.state = 'ok'
+                    rule.generation += 1
+            for rule in track.between(track.clear_levels, track.clear_rules, value, previous):
+                if rule.state == 'firing':
+                    self._resolve(rule)
+
+    def _activate(self, rule, now):
+        if rule.state != 'ok':
+            return
+        rule.state = 'pending'
+        rule.generation += 1
+        self._schedule(rule, now + rule.duration)
+
+    def _schedule(self, rule, due):
+        self._sequence += 1
+        heapq.heappush(self._due, (due, self._sequence, rule.generation, rule))
+
+    def _fire(self, rule, now):
+        if rule.last_fired is not None and now < rule.last_fired + rule.cooldown:
+            # Still true, but fired too recently: try again when the cooldown ends
+            self._schedule(rule, rule.last_fired + rule.cooldown)
+            return
+        rule.state = 'firing'
+        rule.last_fired = now
+        event = self._event(rule, 'firing')
+        self._firing[rule.name] = event
+        self.firing = tuple(self._firing.values())
+        self._emit(event)
+
+    def _resolve(self, rule):
+        rule.state = 'ok'
+        self._firing.pop(rule.name, None)
+        self.firing = tuple(self._firing.values())
+        self._emit(self._event(rule, 'resolved'))
+
+    def _event(self, rule, state):
+        value = rule.sign * rule.track.previous
+        return AlertEvent(rule.name, state, rule.severity, rule.metric, value, rule.threshold, time.time(),
+                          rule.describe(value))
+
+    def _emit(self, event):
+        for callback in self._listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Alert listener error: {e}")
+
+
+def log_alert(event, stream=None):
+    # Listener: one line per firing/resolution on stderr (stdout may carry
+    # headless output)
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.timestamp))
+    print(f"{stamp} ALERT {event.state.upper()} [{event.severity}] {event.message}", file=stream or sys.stderr,
+          flush=True)
+
+
+class CommandHook:
+    # Listener: runs the rule's command (or the default one) through the
+    # shell without waiting; details are passed as SYSTEMMONITOR_ALERT_*
+    # environment variables
+    def __init__(self, engine, command=None):
+        self.engine = engine
+        self.command = command
+        self._running = []
+
+    def __call__(self, event):
+        command = self.engine.rules[event.name].command or self.command
+        # Reap finished hooks so they do not linger as zombies
+        self._running = [process for process in self._running if process.poll() is None]
+        if not command:
+            return
+        env = dict(os.environ)
+        env.update({
+            'SYSTEMMONITOR_ALERT_NAME': event.name,
+            'SYSTEMMONITOR_ALERT_STATE': event.state,
+            'SYSTEMMONITOR_ALERT_SEVERITY': str(event.severity),
+            'SYSTEMMONITOR_ALERT_METRIC': event.metric,
+            'SYSTEMMONITOR_ALERT_VALUE': f"{event.value:g}",
+            'SYSTEMMONITOR_ALERT_THRESHOLD': f"{event.threshold:g}",
+            'SYSTEMMONITOR_ALERT_MESSAGE': event.message,
+        })
+        try:
+            self._running.append(subprocess.Popen(command, shell=True, env=env, stdin=subprocess.DEVNULL))
+        except OSError as e:
+            print(f"Alert command error: {e}")
+
+
+def load_alerts(path):
+    # -> (AlertEngine, default command or None); raises ValueError on a bad file
+    try:
+        with open(path, encoding='utf-8') as config_file:
+            config = json.load(config_file)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"cannot read alert rules from {path}: {e}") from None
+    if isinstance(config, list):
+        config = {'rules': config}
+    engine = AlertEngine(AlertRule.from_dict(spec) for spec in config.get('rules', ()))
+    return engine, config.get('command')
+
+
+def create_alerts(path):
+    # Engine with the log and command listeners attached
+    engine, command = load_alerts(path)
+    engine.add_listener(log_alert)
+    engine.add_listener(CommandHook(engine, command))
+    return engine
@@ -0,0 +1,120 @@
+# benchmarks/__main__.py
+#
+# Usage: python -m benchmarks [name ...] [--json FILE] [--compare FILE]
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import (bench_alerts, bench_bus, bench_cgroups, bench_charts, bench_collector, bench_exporter,
+                        bench_flight, bench_gpu, bench_headless, bench_hotpaths, bench_instrumentation,
+                        bench_processes, bench_procfs, bench_render, bench_replay, bench_rolling, bench_sampler,
+                        bench_scheduler, bench_startup, bench_tsdb)
+
+
+BENCHMARKS = {
+    'sampler': bench_sampler.run,
+    'charts': bench_charts.run,
+    'headless': bench_headless.run,
+    'tsdb': bench_tsdb.run,
+    'processes': bench_processes.run,
+    'scheduler': bench_scheduler.run,
+    'gpu': bench_gpu.run,
+    'exporter': bench_exporter.run,
+    'startup': bench_startup.run,
+    'hotpaths': bench_hotpaths.run,
+    'instrumentation': bench_instrumentation.run,
+    'rolling': bench_rolling.run,
+    'alerts': bench_alerts.run,
+    'replay': bench_replay.run,
+    'collector': bench_collector.run,
+    'bus': bench_bus.run,
+    'render': bench_render.run,
+    'flight': bench_flight.run,
+    'procfs': bench_procfs.run,
+    'cgroups': bench_cgroups.run,
+}
+# Relative change in a latency figure reported as a regression by --compare
+REGRESSION_THRESHOLD = 0.10
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _flatten(value, prefix=''):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten(item, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def compare(baseline, results):
+    # Latency figures (*_ms) present in both runs, old -> new
+    old = dict(_flatten(baseline['results']))
+    regressions = 0
+    print(f"== compared with {baseline['meta'].get('commit') or 'baseline'} ==")
+    for key, new_value in _flatten(results):
+        if not key.endswith('_ms') or 'budget' in key or key not in old:
+            continue
+        old_value = old[key]
+        change = (new_value - old_value) / old_value if old_value else 0.0
+        flag = ''
+        if change > REGRESSION_THRESHOLD:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{key:<60} {old_value:10.3f} -> {new_value:10.3f} ms ({change:+.1%}){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SystemMonitor benchmarks')
+    parser.add_argument('names', nargs='*', help=f"benchmarks to run (default: all): {', '.join(BENCHMARKS)}")
+    parser.add_argument('--json', metavar='FILE', help='save results (with commit and platform) as JSON')
+    parser.add_argument('--compare', metavar='FILE', help='compare latencies with a previous --json file')
+    args = parser.parse_args()
+
+    names = args.names or list(BENCHMARKS)
+    failed = False
+    results = {}
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark: {name}")
+        print(f"== {name} ==")
+        result = BENCHMARKS[name]()
+        results[name] = result
+        if result.get('passed') is False:
+            failed = True
+
+    if args.json:
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'time': time.time(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'machine': platform.machine(),
+            },
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2, default=str)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            compare(json.load(baseline_file), results)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# benchmarks/bench_alerts.py
+#
+# Alert engine: a scripted scenario must fire and resolve exactly as the
+# rules say (duration, hysteresis, cooldown), and process() with hundreds
+# of rules must stay far below the 1 s tick.
+
+import random
+from collections import namedtuple
+
+from alerts import AlertEngine, AlertRule, METRICS
+from benchmarks.harness import measure, format_latency
+
+RULES = 500
+CALLS = 2000
+PROCESS_BUDGET_MS = 0.1
+
+_Sample = namedtuple('_Sample', sorted(set(METRICS.values())))
+
+
+def _sample(**values):
+    fields = {field: 0.0 for field in _Sample._fields}
+    fields.update({METRICS[metric]: value for metric, value in values.items()})
+    return _Sample(**fields)
+
+
+def _scenario():
+    clock = [0.0]
+    engine = AlertEngine([
+        AlertRule('cpu_high', 'cpu', '>', 90, duration=5, clear=80, cooldown=20),
+        AlertRule('ram_full', 'ram', '>', 95),
+        AlertRule('stalled', 'net_down', '<', 0.01, duration=3),
+    ], clock=lambda: clock[0])
+    events = []
+    engine.add_listener(lambda event: events.append((clock[0], event.name, event.state)))
+    script = ([(95, 50, 10)] * 6 + [(85, 50, 10)] * 3 + [(79, 96, 0)] * 5 + [(95, 50, 0)] * 30
+              + [(50, 50, 0)])
+    for cpu, ram, download in script:
+        engine.process(_sample(cpu=cpu, ram=ram, net_down=download))
+        clock[0] += 1
+    expected = [
+        (5.0, 'cpu_high', 'firing'),     # held for 5 s
+        (9.0, 'cpu_high', 'resolved'),   # 85 is above clear=80: still firing until 79
+        (9.0, 'ram_full', 'firing'),
+        (12.0, 'stalled', 'firing'),
+        (14.0, 'ram_full', 'resolved'),
+        (25.0, 'cpu_high', 'firing'),    # true again from 14 s, held back by the 20 s cooldown
+        (44.0, 'cpu_high', 'resolved'),
+    ]
+    return events, expected, [event.name for event in engine.firing]
+
+
+def _random_rules(count, rng):
+    metrics = list(METRICS)
+    rules = []
+    for index in range(count):
+        threshold = rng.uniform(1, 99)
+        op = rng.choice('><')
+        clear = threshold - 5 if op == '>' else threshold + 5
+        rules.append(AlertRule(f"rule{index}", rng.choice(metrics), op, threshold, duration=rng.choice((0, 5, 60)),
+                               clear=clear, cooldown=30))
+    return rules
+
+
+def run(rules=RULES, calls=CALLS):
+    events, expected, firing = _scenario()
+    scenario_ok = events == expected and firing == ['stalled']
+    print(f"scenario: {len(events)} events, {'as expected' if scenario_ok else f'got {events}'}")
+
+    rng = random.Random(0)
+    clock = [0.0]
+    engine = AlertEngine(_random_rules(rules, rng), clock=lambda: clock[0])
+    fired = [0]
+    engine.add_listener(lambda event: fired.__setitem__(0, fired[0] + 1))
+    values = {metric: 50.0 for metric in METRICS}
+
+    def tick():
+        clock[0] += 1
+        # Random walk, so thresholds are crossed all the time
+        for metric in values:
+            values[metric] = min(max(values[metric] + rng.uniform(-4, 4), 0.0), 100.0)
+        engine.process(_sample(**values))
+
+    result = {'process': measure(tick, calls)}
+    print('  ' + format_latency(f"process ({rules} rules)", result['process']))
+    print(f"  {fired[0]} events, {len(engine.firing)} firing at the end")
+    result['scenario_ok'] = scenario_ok
+    result['passed'] = scenario_ok and result['process']['p50_ms'] < PROCESS_BUDGET_MS
+    print(f"p50 {result['process']['p50_ms']:.3f} ms (budget {PROCESS_BUDGET_MS} ms) "
+          f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
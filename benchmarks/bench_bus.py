@@ -0,0 +1,138 @@
+# benchmarks/bench_bus.py
+#
+# Shared-memory sample bus: headless.py --shared publishes from its own
+# process while two readers here follow it without calling psutil. Checks
+# that the readers see identical snapshots within a per-update budget
+# (printed next to what sampling costs on this machine), and that a reader
+# takes over when the writer is killed and when it is frozen (SIGSTOP),
+# the frozen writer stepping back on SIGCONT.
+
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_replay import _same
+from benchmarks.harness import percentiles
+from shm_bus import SampleBus, SharedStats
+from system_stats import SystemStats
+from constants import MAX_HISTORY, SHM_STALE
+
+INTERVAL = 0.2
+FOLLOW_S = 3.0
+# Reader update() p50 with one new sample per call
+READER_BUDGET_MS = 1.0
+HEADLESS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'headless.py')
+
+
+def _start_writer(name):
+    process = subprocess.Popen([sys.executable, HEADLESS, '--shared', name, '--interval', str(INTERVAL),
+                                '--output', os.devnull], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    bus = SampleBus(name)
+    deadline = time.monotonic() + 10
+    while bus.owner()[0] != process.pid and time.monotonic() < deadline:
+        time.sleep(0.05)
+    bus.close()
+    return process
+
+
+def _until(condition, timeout, readers):
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        for reader in readers:
+            reader.update()
+        if condition():
+            return time.monotonic() - start
+        time.sleep(INTERVAL / 4)
+    return None
+
+
+def _sampling_cost(samples=20):
+    stats = SystemStats(max_history=MAX_HISTORY)
+    stats.update()
+    times = []
+    for _ in range(samples):
+        time.sleep(0.05)
+        start = time.perf_counter()
+        stats.update()
+        stats.snapshot()
+        times.append((time.perf_counter() - start) * 1000)
+    stats.close()
+    return percentiles(times)['p50_ms']
+
+
+def run():
+    name = f"systemmonitor-bench-{os.getpid()}"
+    writer = _start_writer(name)
+    readers = [SharedStats(name, max_history=MAX_HISTORY, interval=INTERVAL) for _ in range(2)]
+    frozen = None
+    try:
+        times = []
+        deadline = time.monotonic() + FOLLOW_S
+        while time.monotonic() < deadline:
+            time.sleep(INTERVAL)
+            for reader in readers:
+                start = time.perf_counter()
+                reader.update()
+                times.append((time.perf_counter() - start) * 1000)
+        followed = not any(reader.writer or reader.source is not None for reader in readers)
+        mismatch = _same(readers[0].snapshot(), readers[1].snapshot())
+        received = readers[0].received
+
+        writer.kill()
+        writer.wait()
+        takeover_s = _until(lambda: readers[0].writer, 5, readers)
+        head = readers[0].bus.head
+        _until(lambda: False, 1.0, readers)
+        publishing = readers[0].bus.head > head and not readers[1].writer
+
+        stalled_s = recovered = None
+        if hasattr(signal, 'SIGSTOP'):
+            for reader in readers:
+                reader.close()
+            frozen = _start_writer(name)
+            readers = [SharedStats(name, max_history=MAX_HISTORY, interval=INTERVAL)]
+            _until(lambda: False, 1.0, readers)
+            os.kill(frozen.pid, signal.SIGSTOP)
+            stalled_s = _until(lambda: readers[0].writer, SHM_STALE + 5, readers)
+            os.kill(frozen.pid, signal.SIGCONT)
+            time.sleep(INTERVAL * 5)
+            # The thawed writer must have stepped back instead of fighting
+            recovered = readers[0].bus.owner()[0] == os.getpid() and readers[0].writer
+    finally:
+        for reader in readers:
+            reader.close()
+        output = ''
+        for process in (writer, frozen):
+            if process is not None and process.poll() is None:
+                process.terminate()
+                output += process.communicate()[0]
+        bus = SampleBus(name)
+        bus.unlink()
+        bus.close()
+    if recovered:
+        recovered = 'took over sampling' in output
+
+    reader_ms = percentiles(times)['p50_ms']
+    sampling_ms = _sampling_cost()
+    result = {
+        'received': received,
+        'reader_update_p50_ms': reader_ms,
+        'sampling_p50_ms': sampling_ms,
+        'budget_ms': READER_BUDGET_MS,
+        'identical': mismatch is None,
+        'takeover_after_kill_s': takeover_s,
+        'takeover_after_stall_s': stalled_s,
+        'stalled_writer_stepped_back': recovered,
+        'passed': (followed and mismatch is None and received > 0 and reader_ms < READER_BUDGET_MS
+                   and takeover_s is not None and publishing and recovered is not False),
+    }
+    print(f"readers: {received} samples each, update p50 {reader_ms:.3f} ms (sampling here would cost "
+          f"{sampling_ms:.3f} ms, budget {READER_BUDGET_MS} ms), "
+          f"{'identical snapshots' if mismatch is None else f'snapshots differ in {mismatch}'}")
+    print(f"takeover: {takeover_s if takeover_s is not None else -1:.2f} s after kill, "
+          f"{stalled_s if stalled_s is not None else -1:.2f} s after SIGSTOP "
+          f"(stale after {SHM_STALE} s), frozen writer stepped back: {recovered} "
+          f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
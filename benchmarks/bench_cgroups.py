@@ -0,0 +1,62 @@
+# benchmarks/bench_cgroups.py
+#
+# cgroups.py on a fake cgroup v2 tree in a temp directory (a pod limited
+# to 2 CPUs and 1 GiB with the container below it, 200 child cgroups in
+# the container), stepped on a fake clock: the child breakdown reads
+# CGROUP_SCAN_BATCH children per update, and its per-update cost against
+# reading every child each time. Detection, limits and usage on the same
+# tree are checked by tests/test_cgroups.py.
+
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.harness import percentiles
+from tests.fakes import CGROUP_CHILDREN as CHILDREN, FakeClock, add_cgroup_cpu, build_cgroup_tree
+from cgroups import CgroupStats, ChildScanner, find_cgroup
+from constants import CGROUP_SCAN_BATCH
+
+UPDATES = 200
+
+
+def run():
+    base = tempfile.mkdtemp()
+    try:
+        root, app, self_cgroup, dev, _ = build_cgroup_tree(base)
+        clock = FakeClock()
+        stats = CgroupStats(root, find_cgroup(root, self_cgroup), cpu_count=16, sys_dev_block=dev, clock=clock)
+
+        # Children: each update reads a batch, whatever the number of children
+        scanner = ChildScanner(app, stats.cpu_limit, clock=clock)
+        timings = []
+        busy = os.path.join(app, 'svc-123.service')
+        for _ in range(UPDATES):
+            clock.now += 1.0
+            add_cgroup_cpu(busy, 500000)
+            start = time.perf_counter()
+            scanner.update()
+            timings.append((time.perf_counter() - start) * 1000)
+        reads_per_update = scanner.reads / UPDATES
+
+        full = ChildScanner(app, stats.cpu_limit, batch=CHILDREN, clock=clock)
+        full_timings = []
+        for _ in range(20):
+            clock.now += 1.0
+            start = time.perf_counter()
+            full.update()
+            full_timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        shutil.rmtree(base)
+
+    batch_ms = percentiles(timings)['p50_ms']
+    full_ms = percentiles(full_timings)['p50_ms']
+    result = {
+        'children_reads_per_update': reads_per_update,
+        'children_update_p50_ms': batch_ms,
+        'children_full_scan_p50_ms': full_ms,
+        'passed': reads_per_update == CGROUP_SCAN_BATCH and batch_ms < full_ms,
+    }
+    print(f"children: {reads_per_update:.0f} of {CHILDREN} read per update, {batch_ms:.3f} ms p50 "
+          f"(all {CHILDREN}: {full_ms:.3f} ms) -> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
@@ -0,0 +1,157 @@
+# benchmarks/bench_charts.py
+#
+# Compares the blitted persistent-artist renderer with the original
+# clear-and-replot path. Charts are rendered off-screen on Agg so both
+# paths do the full rasterisation work on every update.
+
+import math
+import time
+
+from charts import ChartManager
+from constants import MAX_HISTORY, ROLLUP_TIERS, TIME_RANGES, PER_CORE_HISTORY
+from percore import PerCoreHistory
+from history import HistoryBuffer
+from rollups import RollupTier
+from system_stats import HISTORY_COLUMNS
+
+FRAMES = 200
+HEATMAP_CORES = 128
+
+
+def _feed(history, step):
+    wave = math.sin(step / 5.0)
+    history.append(step, cpu=50 + 40 * wave, ram=60 + 5 * wave, gpu=30 + 20 * wave,
+                   net_up=200 + 150 * wave, net_down=800 + 600 * math.cos(step / 7.0))
+
+
+def _measure(blit, frames):
+    manager = ChartManager(theme='dark', blit=blit)
+    for create in (manager.create_cpu_chart, manager.create_ram_chart,
+                   manager.create_gpu_chart, manager.create_network_chart):
+        create(None, width=3.5, height=0.85)
+
+    history = HistoryBuffer(MAX_HISTORY, ('cpu', 'ram', 'gpu', 'net_up', 'net_down'))
+    for step in range(MAX_HISTORY):
+        _feed(history, step)
+
+    def frame(step):
+        _feed(history, step)
+        manager.update_cpu_chart(history.view('cpu'))
+        manager.update_ram_chart(history.view('ram'))
+        manager.update_gpu_chart(history.view('gpu'))
+        manager.update_network_chart(history.view('net_up'), history.view('net_down'))
+
+    for step in range(10):
+        frame(MAX_HISTORY + step)
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for step in range(frames):
+        frame(MAX_HISTORY + 10 + step)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return {
+        'fps': frames / wall,
+        'cpu_ms_per_update': cpu * 1000 / (frames * 4),
+        'wall_ms_per_frame': wall * 1000 / frames,
+    }
+
+
+def _sample_values(step):
+    wave = math.sin(step / 50.0)
+    return (50 + 40 * wave, 60 + 5 * wave, 30 + 20 * wave, 200 + 150 * wave, 800 + 600 * math.cos(step / 70.0),
+            400 + 300 * abs(wave), 100 + 90 * math.cos(step / 30.0))
+
+
+def _measure_time_range(time_range, frames):
+    # Feeds one sample per simulated second, as the sampler would, with the
+    # raw buffer and every rollup tier pre-filled to capacity
+    manager = ChartManager(theme='dark', blit=True)
+    manager.set_time_range(time_range)
+    for create in (manager.create_cpu_chart, manager.create_ram_chart,
+                   manager.create_gpu_chart, manager.create_network_chart, manager.create_disk_io_chart):
+        create(None, width=3.5, height=0.85)
+
+    raw = HistoryBuffer(MAX_HISTORY, HISTORY_COLUMNS)
+    tiers = {name: RollupTier(name, bucket, capacity, HISTORY_COLUMNS)
+             for name, (bucket, capacity) in ROLLUP_TIERS.items()}
+    tier_name = TIME_RANGES[time_range][1]
+    prefill = max(bucket * capacity for bucket, capacity in ROLLUP_TIERS.values())
+
+    def add(step):
+        values = _sample_values(step)
+        raw.append(float(step), **dict(zip(HISTORY_COLUMNS, values)))
+        for tier in tiers.values():
+            tier.add(float(step), values)
+
+    for step in range(prefill):
+        add(step)
+
+    def frame(step):
+        add(step)
+        source, suffix = (raw, '') if tier_name is None else (tiers[tier_name].history, '_avg')
+        timestamps = source.view('timestamp')
+        manager.update_cpu_chart(source.view('cpu' + suffix), timestamps)
+        manager.update_ram_chart(source.view('ram' + suffix), timestamps)
+        manager.update_gpu_chart(source.view('gpu' + suffix), timestamps)
+        manager.update_network_chart(source.view('net_up' + suffix), source.view('net_down' + suffix), timestamps)
+        manager.update_disk_io_chart(source.view('disk_read' + suffix), source.view('disk_write' + suffix),
+                                     timestamps)
+
+    for step in range(10):
+        frame(prefill + step)
+
+    cpu_start = time.process_time()
+    for step in range(frames):
+        frame(prefill + 10 + step)
+    cpu = time.process_time() - cpu_start
+    return {
+        'points': len(raw) if tier_name is None else len(tiers[tier_name].history),
+        'cpu_ms_per_frame': cpu * 1000 / frames,
+    }
+
+
+def _measure_heatmap(frames, cores=HEATMAP_CORES):
+    manager = ChartManager(theme='dark', blit=True)
+    manager.create_heatmap_chart(None, width=7.5, height=0.85)
+    history = PerCoreHistory(cores, PER_CORE_HISTORY)
+    # Deterministic load pattern: one hot core walking across the rest
+    base = [(core * 37) % 60 for core in range(cores)]
+
+    def sample(step):
+        values = list(base)
+        values[step % cores] = 100
+        history.append(values)
+
+    for step in range(PER_CORE_HISTORY):
+        sample(step)
+    manager.update_heatmap_chart(history.frozen())
+
+    cpu_start = time.process_time()
+    for step in range(frames):
+        sample(PER_CORE_HISTORY + step)
+        manager.update_heatmap_chart(history.frozen())
+    cpu = time.process_time() - cpu_start
+    return {'cores': cores, 'samples': PER_CORE_HISTORY, 'cpu_ms_per_frame': cpu * 1000 / frames}
+
+
+def run(frames=FRAMES):
+    result = {'frames': frames}
+    for name, blit in (('replot', False), ('blit', True)):
+        stats = _measure(blit, frames)
+        result[name] = stats
+        print(f"{name:>6}: {stats['fps']:8.1f} frames/s, {stats['cpu_ms_per_update']:.3f} ms CPU per chart update")
+    result['speedup'] = result['blit']['fps'] / result['replot']['fps']
+    print(f"speedup: {result['speedup']:.1f}x")
+
+    result['time_ranges'] = {}
+    for time_range in TIME_RANGES:
+        stats = _measure_time_range(time_range, frames)
+        result['time_ranges'][time_range] = stats
+        print(f"{time_range:>6} view: {stats['points']:5d} points, {stats['cpu_ms_per_frame']:.3f} ms CPU per frame")
+
+    result['heatmap'] = _measure_heatmap(frames)
+    print(f"heatmap: {result['heatmap']['cores']} cores x {result['heatmap']['samples']} samples, "
+          f"{result['heatmap']['cpu_ms_per_frame']:.3f} ms CPU per frame")
+    return result
@@ -0,0 +1,83 @@
+# benchmarks/bench_collector.py
+#
+# Runs the collector in this process with 100+ agents as local processes
+# (one process of synthetic agents over TCP, real agents over TCP and the
+# Unix socket) and reports the collector's CPU cost at 1 Hz per agent.
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from collector import Collector
+
+SIMULATED_AGENTS = 120
+REAL_AGENTS = 2
+WARMUP_S = 3
+DURATION_S = 10
+CORE_BUDGET_PERCENT = 5.0
+AGENT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'agent.py')
+
+
+def _wait_for(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return condition()
+
+
+def run(agents=SIMULATED_AGENTS, duration=DURATION_S):
+    with tempfile.TemporaryDirectory() as directory:
+        unix_path = os.path.join(directory, 'collector.sock')
+        collector = Collector(port=0, unix_path=unix_path)
+        collector.start()
+        address = f"{collector.host}:{collector.port}"
+        commands = [[sys.executable, AGENT, '--connect', address, '--name', 'sim', '--simulate', str(agents)],
+                    [sys.executable, AGENT, '--connect', address, '--name', 'real-tcp'],
+                    [sys.executable, AGENT, '--unix', unix_path, '--name', 'real-unix']]
+        processes = [subprocess.Popen(command, stdout=subprocess.DEVNULL) for command in commands]
+        expected = agents + REAL_AGENTS
+        try:
+            connected = _wait_for(lambda: len(collector.host_names()) >= expected, WARMUP_S + 10)
+            time.sleep(WARMUP_S)
+
+            samples_start = sum(host.samples for host in collector.hosts.values())
+            batches_start = sum(host.batches for host in collector.hosts.values())
+            wall_start = time.perf_counter()
+            cpu_start = time.process_time()
+            time.sleep(duration)
+            cpu = time.process_time() - cpu_start
+            wall = time.perf_counter() - wall_start
+            samples = sum(host.samples for host in collector.hosts.values()) - samples_start
+            batches = sum(host.batches for host in collector.hosts.values()) - batches_start
+
+            online = sum(1 for host in collector.overview() if host.state == 'online')
+            collector.select('real-unix')
+            selected = _wait_for(lambda: collector.selected == 'real-unix' and collector.latest() is not None
+                                 and collector.latest().ram_total_gb > 0, 5)
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
+            collector.stop()
+
+    core_percent = cpu / wall * 100
+    result = {
+        'agents': expected,
+        'online': online,
+        'samples_per_s': samples / wall,
+        'batches_per_s': batches / wall,
+        'cpu_us_per_sample': cpu * 1e6 / samples if samples else None,
+        'core_percent': core_percent,
+        'budget_percent': CORE_BUDGET_PERCENT,
+        'passed': connected and selected and online == expected and core_percent < CORE_BUDGET_PERCENT,
+    }
+    print(f"collector: {online}/{expected} agents online, {result['samples_per_s']:.0f} samples/s in "
+          f"{result['batches_per_s']:.0f} batches/s, {core_percent:.2f}% of one core "
+          f"(budget {CORE_BUDGET_PERCENT}%), host selection {'ok' if selected else 'FAILED'} "
+          f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
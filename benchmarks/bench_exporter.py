@@ -0,0 +1,68 @@
+# benchmarks/bench_exporter.py
+#
+# Scrapes the /metrics and /history endpoints on localhost from several
+# threads at once and checks every response for a sample comes from a
+# single serialization, i.e. scrapes cost no psutil calls and no re-rendering.
+
+import threading
+import time
+import urllib.request
+
+from exporter import MetricsExporter
+from system_stats import SystemStats
+
+SCRAPERS = 8
+SCRAPES_PER_SCRAPER = 50
+LATENCY_BUDGET_MS = 20.0
+
+
+def _scrape(url, results, timings):
+    for _ in range(SCRAPES_PER_SCRAPER):
+        start = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            results.append((response.status, response.read()))
+        timings.append((time.perf_counter() - start) * 1000)
+
+
+def run(scrapers=SCRAPERS):
+    stats = SystemStats(per_core_history=60, gpu_provider='fake')
+    for _ in range(3):
+        stats.update()
+    exporter = MetricsExporter(0)
+    exporter.start()
+    try:
+        exporter.publish(stats.snapshot())
+        report = {}
+        for path in ('/metrics', '/history'):
+            url = f"http://{exporter.host}:{exporter.port}{path}"
+            results = []
+            timings = []
+            threads = [threading.Thread(target=_scrape, args=(url, results, timings)) for _ in range(scrapers)]
+            wall_start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - wall_start
+            timings.sort()
+            report[path] = {
+                'requests': len(results),
+                'requests_per_s': len(results) / wall,
+                'median_ms': timings[len(timings) // 2],
+                'p99_ms': timings[int(len(timings) * 0.99) - 1],
+                'bytes': len(results[0][1]),
+                'identical': all(result == results[0] and result[0] == 200 for result in results),
+            }
+    finally:
+        exporter.stop()
+        stats.close()
+
+    builds_ok = exporter.builds == len(report)
+    passed = builds_ok and all(entry['identical'] and entry['median_ms'] < LATENCY_BUDGET_MS
+                               for entry in report.values())
+    for path, entry in report.items():
+        print(f"{path}: {entry['requests']} scrapes from {scrapers} threads, {entry['requests_per_s']:.0f} req/s, "
+              f"median {entry['median_ms']:.2f} ms, p99 {entry['p99_ms']:.2f} ms, {entry['bytes']} bytes")
+    print(f"payloads serialized: {exporter.builds} for {len(report)} endpoints "
+          f"-> {'PASS' if passed else 'FAIL'}")
+    return {'endpoints': report, 'builds': exporter.builds, 'passed': passed}
@@ -0,0 +1,115 @@
+# benchmarks/bench_flight.py
+#
+# Flight recorder:
+#
+#   - CPU cost of a real recorder at FLIGHT_RATE on an idle machine and the
+#     p50 of one step() (counters read plus trigger check)
+#   - a synthetic 300 ms CPU spike on a noisy flat load, stepped on a fake
+#     clock: one capture with FLIGHT_PRE seconds before and FLIGHT_POST
+#     after, saved and loaded back, its peak far above the 1 s average the
+#     regular sampler would have shown
+#   - the same noise without a spike triggers nothing
+
+import random
+import tempfile
+import time
+
+from benchmarks.harness import percentiles
+from flight import FlightRecorder, load_capture
+from constants import FLIGHT_RATE, FLIGHT_PRE, FLIGHT_POST
+
+IDLE_S = 5.0
+STEP_CALLS = 200
+CORE_BUDGET_PERCENT = 2.0
+SPIKE_AT_S = 60.0
+SPIKE_S = 0.3
+SYNTHETIC_S = 120.0
+
+
+def _synthetic_counters(spike_at=None, seed=1):
+    # read() replacement: CPU around 15% +-10, network around 200 KB/s
+    # +-50, disk idle, on a clock that moves 1 / FLIGHT_RATE per call
+    random_values = random.Random(seed)
+    interval = 1.0 / FLIGHT_RATE
+    state = {'now': time.time(), 'busy': 0.0, 'total': 0.0, 'received': 0}
+
+    def read():
+        now = state['now'] = state['now'] + interval
+        offset = now - state['start']
+        cpu = 15 + random_values.uniform(-10, 10)
+        if spike_at is not None and spike_at <= offset < spike_at + SPIKE_S:
+            cpu = 95
+        state['busy'] += cpu / 100 * interval
+        state['total'] += interval
+        state['received'] += int((200 + random_values.uniform(-50, 50)) * 1024 * interval)
+        return now, now, state['busy'], state['total'], 0, state['received'], 0, 0
+
+    state['start'] = state['now']
+    return read
+
+
+def _idle_cost():
+    recorder = FlightRecorder()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    recorder.start()
+    time.sleep(IDLE_S)
+    recorder.stop()
+    core_percent = (time.process_time() - cpu_start) / (time.perf_counter() - wall_start) * 100
+
+    times = []
+    for _ in range(STEP_CALLS):
+        start = time.perf_counter()
+        recorder.step()
+        times.append((time.perf_counter() - start) * 1000)
+    return core_percent, percentiles(times)['p50_ms']
+
+
+def run():
+    core_percent, step_ms = _idle_cost()
+
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = FlightRecorder(directory, read=_synthetic_counters(SPIKE_AT_S))
+        for _ in range(int(SYNTHETIC_S * FLIGHT_RATE)):
+            recorder.step()
+        captures = recorder.captures
+        loaded = load_capture(captures[0].path) if captures and captures[0].path else None
+
+    quiet = FlightRecorder(read=_synthetic_counters())
+    for _ in range(int(SYNTHETIC_S * FLIGHT_RATE)):
+        quiet.step()
+
+    captured_s = peak = one_second = 0.0
+    reason = None
+    if captures:
+        capture = captures[0]
+        reason = capture.reason
+        captured_s = len(capture.samples) / capture.rate
+        peak = max(sample[1] for sample in capture.samples)
+        # What a 1 Hz sample over the same second would have reported
+        second = [sample[1] for sample in capture.samples
+                  if capture.trigger_time - 0.5 <= sample[0] < capture.trigger_time + 0.5]
+        one_second = sum(second) / len(second)
+    expected_s = FLIGHT_PRE + FLIGHT_POST
+    round_trip = loaded is not None and len(loaded.samples) == len(captures[0].samples)
+
+    result = {
+        'idle_core_percent': core_percent,
+        'budget_percent': CORE_BUDGET_PERCENT,
+        'step_p50_ms': step_ms,
+        'captures': len(captures),
+        'captured_s': captured_s,
+        'spike_peak_percent': peak,
+        'one_second_average_percent': one_second,
+        'false_triggers': len(quiet.captures),
+        'passed': (core_percent < CORE_BUDGET_PERCENT and len(captures) == 1 and reason.startswith('cpu')
+                   and abs(captured_s - expected_s) <= 2.0 / FLIGHT_RATE and round_trip
+                   and peak > one_second + 30 and not quiet.captures),
+    }
+    print(f"idle: {FLIGHT_RATE} Hz recorder costs {core_percent:.2f}% of one core (budget {CORE_BUDGET_PERCENT}%), "
+          f"step p50 {step_ms:.3f} ms")
+    print(f"spike: {len(captures)} capture(s) ({reason}), {captured_s:.2f} s of {expected_s} s expected, "
+          f"saved and loaded: {round_trip}; peak {peak:.0f}% vs {one_second:.0f}% as a 1 s average")
+    print(f"noise: {len(quiet.captures)} false triggers in {SYNTHETIC_S:.0f} s "
+          f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
@@ -0,0 +1,57 @@
+# benchmarks/bench_gpu.py
+#
+# Exercises the GPU path without a GPU: the per-tick cost of reading two fake
+# devices through the time-bounded wrapper, and how long the sampler is held
+# up when the vendor tool hangs.
+
+import time
+
+from gpu import FakeGpuProvider, TimeBoundedProvider
+from system_stats import SystemStats
+
+READS = 200
+READ_BUDGET_MS = 2.0
+HANG_S = 5.0
+TIMEOUT_S = 0.1
+
+
+def run(reads=READS):
+    fake = FakeGpuProvider(count=2)
+    stats = SystemStats(max_history=1, per_core_history=0, top_processes=0,
+                        gpu_provider=TimeBoundedProvider(fake, TIMEOUT_S))
+    timings = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        stats._update_gpu()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    median = timings[len(timings) // 2]
+    multi_gpu_ok = len(stats.gpus) == 2 and stats.gpu_info[1] == 'Fake GPU 0, Fake GPU 1'
+
+    # A read that hangs: the caller waits TIMEOUT_S, then gets the last good
+    # readings, and no second read is piled up behind the stuck one
+    hung = FakeGpuProvider(count=1, delay=HANG_S)
+    bounded = TimeBoundedProvider(hung, TIMEOUT_S)
+    hang_timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        bounded.read()
+        hang_timings.append((time.perf_counter() - start) * 1000)
+    worst_hang = max(hang_timings)
+    hang_ok = worst_hang < TIMEOUT_S * 1000 * 1.5 and hung.reads == 1 and bounded.timeouts == 5
+    stats.close()
+
+    result = {
+        'reads': reads,
+        'median_ms': median,
+        'max_ms': timings[-1],
+        'budget_ms': READ_BUDGET_MS,
+        'hung_read_max_ms': worst_hang,
+        'hung_reads_started': hung.reads,
+        'passed': median < READ_BUDGET_MS and multi_gpu_ok and hang_ok,
+    }
+    print(f"gpu read (2 fake devices, time-bounded): median {median:.3f} ms, max {timings[-1]:.3f} ms "
+          f"(budget {READ_BUDGET_MS} ms)")
+    print(f"hung provider ({HANG_S:g} s per read, {TIMEOUT_S:g} s budget): worst wait {worst_hang:.1f} ms, "
+          f"{hung.reads} read started for 5 calls -> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
@@ -0,0 +1,42 @@
+# benchmarks/bench_headless.py
+#
+# Runs the headless collector at 1 Hz and reports its CPU cost as a
+# percentage of one core.
+
+import os
+import tempfile
+import time
+
+import headless
+from system_stats import SystemStats
+
+DURATION_S = 10
+CORE_BUDGET_PERCENT = 1.0
+
+
+def run(duration=DURATION_S, interval=1.0):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'samples.jsonl')
+        writer = headless.JsonLinesWriter(path)
+        stats_manager = SystemStats(max_history=1, per_core_history=0, top_processes=0)
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        samples = headless.run(stats_manager, writer, interval, count=int(duration / interval))
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+    core_percent = cpu / wall * 100
+    result = {
+        'samples': samples,
+        'wall_s': wall,
+        'cpu_s': cpu,
+        'cpu_ms_per_sample': cpu * 1000 / samples,
+        'core_percent': core_percent,
+        'budget_percent': CORE_BUDGET_PERCENT,
+        'passed': core_percent < CORE_BUDGET_PERCENT,
+    }
+    print(f"headless @ {1 / interval:g} Hz: {samples} samples in {wall:.1f} s, "
+          f"{result['cpu_ms_per_sample']:.2f} ms CPU/sample, {core_percent:.3f}% of one core "
+          f"(budget {CORE_BUDGET_PERCENT}%) -> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
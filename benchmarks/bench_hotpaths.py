@@ -0,0 +1,143 @@
+# benchmarks/bench_hotpaths.py
+#
+# Latency percentiles and allocations for the per-tick hot paths, with
+# psutil replaced by a deterministic fake:
+#
+#   - every SystemStats collector, a full update() and snapshot()
+#   - every ChartManager.update_*_chart on the Agg backend
+#   - one SystemMonitorUI frame (update_display plus the chart flush it schedules)
+#
+# plus RSS growth over a long run of complete ticks. Run with
+# `python -m benchmarks hotpaths --json results.json` and compare two
+# commits with --compare.
+
+import os
+
+from benchmarks.bench_sampler import _make_ui
+from benchmarks.fake_psutil import FakePsutil, installed
+from benchmarks.harness import measure, rss_growth, format_latency
+from tests.fakes import render
+from charts import ChartManager
+from constants import MAX_HISTORY, DEFAULT_TIME_RANGE
+from gpu import FakeGpuProvider
+from io_rates import WholeDisks
+from system_stats import SystemStats
+
+CALLS = 500
+SNAPSHOTS = 32
+LONG_RUN_TICKS = 1000
+RSS_GROWTH_BUDGET_KB = 4096
+
+
+class _SnapshotCycle:
+    # Stands in for the Sampler: hands out a different snapshot every call
+    def __init__(self, stats_manager, snapshots):
+        self.stats_manager = stats_manager
+        self.snapshots = snapshots
+        self.index = 0
+
+    def set_time_range(self, time_range):
+        pass
+
+    def latest(self):
+        snapshot = self.snapshots[self.index % len(self.snapshots)]
+        self.index += 1
+        return snapshot
+
+
+def _make_stats():
+    stats = SystemStats(max_history=MAX_HISTORY, gpu_provider=FakeGpuProvider(count=2))
+    # Not a directory, so every fake disk counts as a whole disk
+    stats.whole_disks = WholeDisks(sys_block=os.devnull)
+    return stats
+
+
+def _full_update(stats):
+    # Every collector due, as on the ticks where the slow ones line up
+    for collector in stats.scheduler.collectors.values():
+        collector.next_due = None
+    stats.update()
+
+
+def _make_charts():
+    manager = ChartManager(theme='dark', blit=True)
+    manager.set_time_range(DEFAULT_TIME_RANGE)
+    for create in (manager.create_cpu_chart, manager.create_ram_chart, manager.create_gpu_chart,
+                   manager.create_network_chart, manager.create_disk_io_chart, manager.create_heatmap_chart):
+        create(None, width=3.5, height=0.85)
+    return manager
+
+
+def _chart_updates(manager, source):
+    def snapshot():
+        return source.latest()
+    return {
+        'update_cpu_chart': lambda: _call(manager.update_cpu_chart, snapshot(), 'cpu_history'),
+        'update_ram_chart': lambda: _call(manager.update_ram_chart, snapshot(), 'ram_history'),
+        'update_gpu_chart': lambda: _call(manager.update_gpu_chart, snapshot(), 'gpu_history'),
+        'update_network_chart': lambda: _call(manager.update_network_chart, snapshot(), 'net_up_history',
+                                              'net_down_history'),
+        'update_disk_io_chart': lambda: _call(manager.update_disk_io_chart, snapshot(), 'disk_read_history',
+                                              'disk_write_history'),
+        'update_heatmap_chart': lambda: manager.update_heatmap_chart(snapshot().per_core_history),
+    }
+
+
+def _call(update, snapshot, *fields):
+    update(*(getattr(snapshot, field) for field in fields), snapshot.history_timestamps)
+
+
+def run(calls=CALLS, long_run_ticks=LONG_RUN_TICKS):
+    result = {'collectors': {}, 'charts': {}}
+    with installed(FakePsutil()):
+        stats = _make_stats()
+        for _ in range(MAX_HISTORY):
+            _full_update(stats)
+
+        print("collectors (fake psutil):")
+        for name, collector in stats.scheduler.collectors.items():
+            result['collectors'][name] = measure(collector.function, calls)
+            print('  ' + format_latency(f"_update_{name}", result['collectors'][name]))
+        result['update'] = measure(lambda: _full_update(stats), calls)
+        result['snapshot'] = measure(lambda: stats.snapshot(DEFAULT_TIME_RANGE), calls)
+        print('  ' + format_latency('update (all collectors due)', result['update']))
+        print('  ' + format_latency('snapshot', result['snapshot']))
+
+        snapshots = []
+        for _ in range(SNAPSHOTS):
+            _full_update(stats)
+            snapshots.append(stats.snapshot(DEFAULT_TIME_RANGE))
+        source = _SnapshotCycle(stats, snapshots)
+
+        print("charts (Agg, blit):")
+        manager = _make_charts()
+        for name, update in _chart_updates(manager, source).items():
+            result['charts'][name] = measure(update, calls)
+            print('  ' + format_latency(name, result['charts'][name]))
+
+        ui, root = _make_ui(source, _make_charts())
+        try:
+            if root is not None:
+                while ui.pending_charts:
+                    root.update()
+            result['ui_tick'] = measure(lambda: render(ui), calls)
+            print('  ' + format_latency('update_display', result['ui_tick']))
+
+            def tick():
+                _full_update(stats)
+                source.snapshots[source.index % SNAPSHOTS] = stats.snapshot(DEFAULT_TIME_RANGE)
+                render(ui)
+
+            result['long_run'] = rss_growth(tick, long_run_ticks)
+        finally:
+            if root is not None:
+                root.destroy()
+        stats.close()
+
+    long_run = result['long_run']
+    result['passed'] = long_run['rss_growth_kb'] < RSS_GROWTH_BUDGET_KB
+    print(f"long run: {long_run['calls']} full ticks in {long_run['seconds']:.1f} s, RSS "
+          f"{long_run['rss_before_mb']:.1f} -> {long_run['rss_after_mb']:.1f} MB "
+          f"({long_run['rss_growth_kb']:+.0f} KB, budget {RSS_GROWTH_BUDGET_KB} KB) "
+          f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
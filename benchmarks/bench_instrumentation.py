@@ -0,0 +1,80 @@
+# benchmarks/bench_instrumentation.py
+#
+# Cost of the --debug instrumentation: a full SystemStats.update() with it
+# off and on (fake psutil), the per-call price of a timed wrapper, and a
+# check that a disabled Instrumentation leaves methods untouched and that
+# an enabled one reports every collector as JSON.
+
+import json
+import time
+
+from benchmarks.bench_hotpaths import _make_stats, _full_update
+from benchmarks.fake_psutil import FakePsutil, installed
+from benchmarks.harness import measure, format_latency
+from constants import MAX_HISTORY
+from instrumentation import Instrumentation
+
+CALLS = 500
+WRAPPER_CALLS = 200000
+# Extra time one timed call may add
+WRAPPER_BUDGET_US = 5.0
+
+
+def _noop():
+    pass
+
+
+def _wrapper_overhead_us(calls=WRAPPER_CALLS):
+    instrumentation = Instrumentation(enabled=True)
+    timed = instrumentation._timed('noop', _noop)
+    timings = []
+    for function in (_noop, timed):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        timings.append(time.perf_counter() - start)
+    return (timings[1] - timings[0]) / calls * 1e6
+
+
+def _update_cost(enabled, calls):
+    instrumentation = Instrumentation(enabled=enabled)
+    stats = _make_stats()
+    stats.scheduler.instrumentation = instrumentation
+    instrumentation.wrap(stats, 'stats', ('update', 'snapshot'))
+    for _ in range(MAX_HISTORY):
+        _full_update(stats)
+    result = measure(lambda: _full_update(stats), calls)
+    result['collectors'] = sorted(stats.scheduler.collectors)
+    stats.close()
+    return result, instrumentation
+
+
+def run(calls=CALLS):
+    result = {}
+    with installed(FakePsutil()):
+        result['update_disabled'], _ = _update_cost(False, calls)
+        result['update_enabled'], enabled = _update_cost(True, calls)
+    print('  ' + format_latency('update, instrumentation off', result['update_disabled']))
+    print('  ' + format_latency('update, instrumentation on', result['update_enabled']))
+
+    result['wrapper_overhead_us'] = _wrapper_overhead_us()
+    print(f"timed wrapper: {result['wrapper_overhead_us']:.2f} us per call (budget {WRAPPER_BUDGET_US} us)")
+
+    untouched = Instrumentation(enabled=False)
+    stats = _make_stats()
+    update = stats.update
+    untouched.wrap(stats, 'stats', ('update',))
+    result['disabled_untouched'] = stats.update == update and not untouched.timers()
+    stats.close()
+
+    report = json.loads(json.dumps(enabled.report()))
+    collectors = {name for name in report['timers'] if name.startswith('collector.')}
+    expected = {f"collector.{name}" for name in result['update_enabled']['collectors']}
+    result['all_collectors_reported'] = collectors == expected and 'stats.update' in report['timers']
+    print(f"report: {len(report['timers'])} timers, {len(collectors)} collectors, "
+          f"own CPU {report['cpu_percent']:.1f}%, RSS {report['rss_mb']:.0f} MB")
+
+    result['passed'] = (result['wrapper_overhead_us'] < WRAPPER_BUDGET_US and result['disabled_untouched']
+                        and result['all_collectors_reported'])
+    print(f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
@@ -0,0 +1,68 @@
+# benchmarks/bench_processes.py
+#
+# Times ProcessMonitor.update() against a fake process table of a few
+# thousand entries, checks that static details are read only once per
+# process, and compares the heap top-N with a full sort.
+
+import heapq
+import random
+import time
+from operator import itemgetter
+
+from processes import ProcessMonitor
+from benchmarks.fake_psutil import FakeProcess, FakeProcessTable
+
+PROCESSES = 5000
+TICKS = 20
+CHURN = 50  # processes replaced per tick
+TOP_N = 10
+UPDATE_BUDGET_MS = 50.0  # median; includes generating the fake table
+
+def run(processes=PROCESSES, ticks=TICKS, churn=CHURN, top_n=TOP_N):
+    random.seed(0)
+    table = FakeProcessTable(processes)
+    clock = [0.0]
+    monitor = ProcessMonitor(top_n=top_n, process_iter=table.process_iter, clock=lambda: clock[0])
+    FakeProcess.static_reads = 0
+
+    timings = []
+    for _ in range(ticks):
+        table.churn(churn)
+        clock[0] += 1.0
+        start = time.perf_counter()
+        monitor.update()
+        timings.append((time.perf_counter() - start) * 1000)
+    # The first tick fills the cache; after that only new processes are read
+    expected_reads = processes + churn * ticks
+    cache_ok = FakeProcess.static_reads <= expected_reads
+
+    rows = [(random.random() * 100, random.randint(1, 1 << 30), pid) for pid in range(processes)]
+    start = time.perf_counter()
+    for _ in range(100):
+        heapq.nlargest(top_n, rows, key=itemgetter(0))
+    heap_ms = (time.perf_counter() - start) * 10
+    start = time.perf_counter()
+    for _ in range(100):
+        sorted(rows, key=itemgetter(0), reverse=True)[:top_n]
+    sort_ms = (time.perf_counter() - start) * 10
+
+    steady = sorted(timings[1:])
+    worst = steady[-1]
+    result = {
+        'processes': processes,
+        'median_ms': steady[len(steady) // 2],
+        'max_ms': worst,
+        'first_tick_ms': timings[0],
+        'static_reads': FakeProcess.static_reads,
+        'expected_static_reads': expected_reads,
+        'heap_top_n_ms': heap_ms,
+        'sort_top_n_ms': sort_ms,
+        'budget_ms': UPDATE_BUDGET_MS,
+        'passed': cache_ok and steady[len(steady) // 2] < UPDATE_BUDGET_MS,
+    }
+    print(f"process table ({processes} processes, {churn} new/tick): first tick {timings[0]:.1f} ms, "
+          f"median {result['median_ms']:.1f} ms (budget {UPDATE_BUDGET_MS} ms), max {worst:.1f} ms")
+    print(f"  static reads: {FakeProcess.static_reads} (expected <= {expected_reads}); "
+          f"top-{top_n}: heap {heap_ms:.2f} ms vs full sort {sort_ms:.2f} ms "
+          f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
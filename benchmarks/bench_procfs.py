@@ -0,0 +1,59 @@
+# benchmarks/bench_procfs.py
+#
+# procfs.py against psutil: per-sample cost of the four per-tick reads
+# (CPU per core, memory, network per NIC, disk per device) on this
+# machine, both ways, with the allocation peak of each. That both agree
+# on recorded /proc snapshots (fixtures/proc) is checked by
+# tests/test_procfs.py.
+#
+# Skipped (passed=None) where /proc cannot be opened (not Linux).
+
+import psutil
+
+from benchmarks.harness import measure
+from procfs import open_procfs
+from system_stats import SystemStats
+
+CALLS = 500
+
+
+def _psutil_sample():
+    psutil.cpu_percent(interval=None, percpu=True)
+    psutil.virtual_memory()
+    psutil.net_io_counters(pernic=True)
+    psutil.disk_io_counters(perdisk=True)
+
+
+def _procfs_sample(proc):
+    def sample():
+        proc.cpu_percent(percpu=True)
+        proc.virtual_memory()
+        proc.net_io_counters()
+        proc.disk_io_counters()
+    return sample
+
+
+def run(calls=CALLS):
+    proc = open_procfs()
+    if proc is None:
+        print("procfs: /proc not available here, fast path not used")
+        return {'passed': None}
+    baseline = measure(_psutil_sample, calls)
+    fast = measure(_procfs_sample(proc), calls)
+    proc.close()
+    stats = SystemStats(max_history=1, per_core_history=0, top_processes=0, gpu_provider='none')
+    in_use = stats.proc is not None
+    stats.close()
+
+    speedup = baseline['p50_ms'] / fast['p50_ms']
+    result = {
+        'psutil': baseline,
+        'procfs': fast,
+        'speedup': speedup,
+        'system_stats_uses_procfs': in_use,
+        'passed': in_use and fast['p50_ms'] < baseline['p50_ms'],
+    }
+    print(f"per sample (CPU per core, memory, NICs, disks): psutil p50 {baseline['p50_ms']:.3f} ms, "
+          f"peak {baseline['alloc_peak_kb']:.1f} KB; procfs p50 {fast['p50_ms']:.3f} ms, "
+          f"peak {fast['alloc_peak_kb']:.1f} KB ({speedup:.1f}x) -> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
@@ -0,0 +1,118 @@
+# benchmarks/bench_render.py
+#
+# The UI render scheduler, on the display-less UI stub fed by a synthetic
+# replay:
+#
+#   - label config() calls per tick with changing values and with values
+#     that format the same (only changed texts are configured)
+#   - a hidden window (Unmap) draws nothing while sampling continues, and
+#     showing it again (Map) catches up with exactly one redraw per chart
+#   - slow charts are spread over several idle slots, each within the
+#     frame budget plus at most one chart
+
+import time
+import tkinter as tk
+
+from replay import ReplaySampler, ReplayStats, decode_frame, synthetic_frames
+from tests.fakes import NullChartManager, detached_ui, render
+from constants import MAX_HISTORY, CHART_FRAME_BUDGET
+
+TICKS = 60
+HIDDEN_TICKS = 30
+SLOW_CHART_S = 0.005
+
+
+class CountingLabel:
+    configs = 0
+
+    def config(self, **kwargs):
+        CountingLabel.configs += 1
+
+
+class CountingChartManager(NullChartManager):
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def _draw(self, *args, **kwargs):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+    update_cpu_chart = update_ram_chart = update_gpu_chart = _draw
+    update_network_chart = update_disk_io_chart = update_heatmap_chart = _draw
+
+
+class _Event:
+    def __init__(self, widget, kind, state=None):
+        self.widget = widget
+        self.type = kind
+        self.state = state
+
+
+def _setup(delay=0.0):
+    frames = (decode_frame(values) for values in synthetic_frames(seconds=3600, rate=1, cores=8))
+    sampler = ReplaySampler(ReplayStats(max_history=MAX_HISTORY), frames)
+    charts = CountingChartManager(delay)
+    ui = detached_ui(sampler, charts, label=CountingLabel)
+    return ui, sampler, charts
+
+
+def _label_configs(ui, tick):
+    CountingLabel.configs = 0
+    for _ in range(TICKS):
+        tick()
+        render(ui)
+    return CountingLabel.configs / TICKS
+
+
+def run():
+    ui, sampler, charts = _setup()
+    changing = _label_configs(ui, sampler.sample_once)
+    # Same values in a new snapshot object, as a sampler publishes when nothing moved
+    unchanged = _label_configs(ui, lambda: sampler._publish(sampler.latest()._replace()))
+
+    ui.root.run_idle()
+    ui._on_visibility_change(_Event(ui.root, tk.EventType.Unmap))
+    CountingLabel.configs = charts.calls = 0
+    hidden_ms = 0.0
+    for _ in range(HIDDEN_TICKS):
+        sampler.sample_once()
+        start = time.perf_counter()
+        ui.update_display()
+        hidden_ms += (time.perf_counter() - start) * 1000 / HIDDEN_TICKS
+    ui.root.run_idle()
+    hidden_work = CountingLabel.configs + charts.calls
+    ui._on_visibility_change(_Event(ui.root, tk.EventType.Map))
+    ui.root.run_idle()
+    catch_up_calls = charts.calls
+    caught_up = ui._last_snapshot is sampler.latest()
+
+    ui, sampler, charts = _setup(SLOW_CHART_S)
+    sampler.sample_once()
+    ui.update_display()
+    slots = []
+    while ui.root.idle:
+        start = time.perf_counter()
+        ui.root.idle.pop(0)()
+        slots.append((time.perf_counter() - start) * 1000)
+    slot_limit = CHART_FRAME_BUDGET + SLOW_CHART_S * 1000 * 1.5
+
+    result = {
+        'label_configs_per_tick_changing': changing,
+        'label_configs_per_tick_unchanged': unchanged,
+        'hidden_tick_ms': hidden_ms,
+        'hidden_work': hidden_work,
+        'catch_up_chart_calls': catch_up_calls,
+        'budget_slots': len(slots),
+        'budget_slot_max_ms': max(slots),
+        'passed': (unchanged == 0 and changing < len(ui.labels) and hidden_work == 0 and caught_up
+                   and catch_up_calls == 6 and charts.calls == 6 and len(slots) > 1 and max(slots) < slot_limit),
+    }
+    print(f"labels: {changing:.1f} of {len(ui.labels)} configured per tick, {unchanged:.1f} when values repeat")
+    print(f"hidden: {HIDDEN_TICKS} ticks at {hidden_ms:.3f} ms, {hidden_work} label/chart calls; "
+          f"restore: {catch_up_calls} chart redraws, latest snapshot shown: {caught_up}")
+    print(f"budget: 6 charts of {SLOW_CHART_S * 1000:.0f} ms in {len(slots)} idle slots, longest {max(slots):.1f} ms "
+          f"(limit {slot_limit:.1f} ms: {CHART_FRAME_BUDGET} ms budget + one chart) "
+          f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
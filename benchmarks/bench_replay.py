@@ -0,0 +1,108 @@
+# benchmarks/bench_replay.py
+#
+# Record and replay: a fake-psutil run recorded to a replay file must come
+# back as identical snapshots (values, histories, heatmap, rolling stats),
+# and a synthetic 100 Hz trace is pushed through ReplaySampler, the UI and
+# the Agg charts as fast as possible to measure per-frame rendering cost.
+
+import os
+import tempfile
+import time
+
+from benchmarks.bench_hotpaths import _make_stats, _make_charts, _full_update
+from benchmarks.bench_sampler import _make_ui
+from benchmarks.fake_psutil import FakePsutil, installed
+from benchmarks.harness import percentiles
+from tests.fakes import render
+from constants import MAX_HISTORY
+from replay import Recorder, ReplaySampler, ReplayStats, read_frames, synthetic_frames
+
+RECORDED_SAMPLES = 300
+SYNTHETIC_SECONDS = 30
+SYNTHETIC_RATE = 100
+# Stored bytes per recorded sample
+FRAME_BUDGET_BYTES = 1024
+
+
+def _same(recorded, replayed):
+    for field in recorded._fields:
+        a, b = getattr(recorded, field), getattr(replayed, field)
+        if isinstance(a, memoryview):
+            a, b = a.tolist(), b.tolist()
+        elif hasattr(a, 'tolist'):
+            a, b = a.tolist(), b.tolist()
+        if a != b:
+            return field
+    return None
+
+
+def _round_trip(path):
+    snapshots = []
+    recorder = Recorder(path)
+    with installed(FakePsutil()):
+        stats = _make_stats()
+        for _ in range(RECORDED_SAMPLES):
+            _full_update(stats)
+            snapshot = stats.snapshot()
+            snapshots.append(snapshot)
+            recorder.record(snapshot)
+        stats.close()
+    recorder.close()
+
+    replay = ReplayStats(max_history=MAX_HISTORY)
+    mismatch = None
+    replayed = 0
+    for frame, recorded in zip(read_frames(path), snapshots):
+        replay.apply(frame)
+        replayed += 1
+        mismatch = _same(recorded, replay.snapshot())
+        if mismatch:
+            break
+    return replayed, mismatch, os.path.getsize(path)
+
+
+def _stress(path):
+    recorder = Recorder(path)
+    for frame in synthetic_frames(SYNTHETIC_SECONDS, SYNTHETIC_RATE):
+        recorder.record_frame(frame)
+    recorder.close()
+
+    stats = ReplayStats(max_history=MAX_HISTORY)
+    sampler = ReplaySampler(stats, read_frames(path), speed=0)
+    ui, root = _make_ui(sampler, _make_charts())
+    timings = []
+    try:
+        if root is not None:
+            while ui.pending_charts:
+                root.update()
+        while True:
+            start = time.perf_counter()
+            if sampler.sample_once() is None:
+                break
+            render(ui)
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        if root is not None:
+            root.destroy()
+    return percentiles(timings)
+
+
+def run():
+    result = {}
+    with tempfile.TemporaryDirectory() as directory:
+        replayed, mismatch, size = _round_trip(os.path.join(directory, 'recorded.smrp'))
+        result['frames'] = replayed
+        result['bytes_per_frame'] = size / replayed
+        result['identical'] = mismatch is None and replayed == RECORDED_SAMPLES
+        print(f"round trip: {replayed} samples, {result['bytes_per_frame']:.0f} B/sample, "
+              f"{'identical snapshots' if mismatch is None else f'first difference in {mismatch}'}")
+
+        result['stress'] = _stress(os.path.join(directory, 'synthetic.smrp'))
+        stress = result['stress']
+        print(f"synthetic {SYNTHETIC_RATE} Hz trace, as fast as possible: {stress['calls']} frames, replay + "
+              f"update_display p50 {stress['p50_ms']:.3f} ms, p99 {stress['p99_ms']:.3f} ms, "
+              f"{1000 / stress['mean_ms']:.0f} frames/s")
+
+    result['passed'] = result['identical'] and result['bytes_per_frame'] < FRAME_BUDGET_BYTES
+    print(f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
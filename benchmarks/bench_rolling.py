@@ -0,0 +1,79 @@
+# benchmarks/bench_rolling.py
+#
+# Rolling statistics: per-sample cost of RollingStats.add() over the
+# default windows against recomputing min/max/mean/p95 from an hour of
+# history every tick, and the p95 error against an exact sort.
+
+import math
+import random
+import time
+from collections import deque
+
+from constants import ROLLING_WINDOWS, ROLLING_QUANTILE, ROLLING_QUANTILE_ACCURACY
+from rolling import RollingStats
+from system_stats import HISTORY_COLUMNS
+from benchmarks.harness import measure, format_latency
+
+CALLS = 2000
+# Per-sample cost that still leaves the 1 s tick untouched
+ADD_BUDGET_MS = 0.5
+
+
+def _sample(rng):
+    return (rng.random() * 100, rng.random() * 100, rng.random() * 100, rng.expovariate(1 / 200),
+            rng.expovariate(1 / 2000), rng.expovariate(1 / 500), rng.expovariate(1 / 500))
+
+
+def _rescan(history, now):
+    # What the UI would do without RollingStats
+    result = {}
+    for name, seconds in ROLLING_WINDOWS.items():
+        window = [sample for sample in history if sample[0] > now - seconds]
+        for index in range(1, len(HISTORY_COLUMNS) + 1):
+            values = sorted(sample[index] for sample in window)
+            result[name, index] = (values[0], values[-1], sum(values) / len(values),
+                                   values[max(math.ceil(ROLLING_QUANTILE * len(values)), 1) - 1])
+    return result
+
+
+def run(calls=CALLS):
+    rng = random.Random(0)
+    longest = max(ROLLING_WINDOWS.values())
+    rolling = RollingStats(HISTORY_COLUMNS, ROLLING_WINDOWS)
+    history = deque(maxlen=longest)
+    clock = [0.0]
+
+    def add():
+        clock[0] += 1.0
+        sample = _sample(rng)
+        history.append((clock[0], *sample))
+        rolling.add(clock[0], sample)
+
+    # Fill the longest window first: steady state is what matters
+    for _ in range(longest):
+        add()
+    result = {'add': measure(add, calls)}
+    result['add_and_summary'] = measure(lambda: (add(), rolling.summary()), calls)
+    result['rescan'] = measure(lambda: _rescan(history, clock[0]), max(calls // 20, 20), warmup=2)
+    for name in ('add', 'add_and_summary', 'rescan'):
+        print('  ' + format_latency(name, result[name]))
+
+    exact = _rescan(history, clock[0])
+    summary = rolling.summary()
+    worst = 0.0
+    exact_extremes = True
+    for (name, index), (low, high, mean, p95) in exact.items():
+        stats = summary[name][HISTORY_COLUMNS[index - 1]]
+        exact_extremes = exact_extremes and stats.min == low and stats.max == high and math.isclose(
+            stats.mean, mean, rel_tol=1e-9)
+        worst = max(worst, abs(stats.p95 - p95) / p95 if p95 else 0.0)
+    result['p95_worst_relative_error'] = worst
+    result['exact_min_max_mean'] = exact_extremes
+    print(f"p95 worst relative error {worst:.2%} (sketch accuracy {ROLLING_QUANTILE_ACCURACY:.0%}), "
+          f"min/max/mean exact: {exact_extremes}")
+
+    result['passed'] = (result['add_and_summary']['p50_ms'] < ADD_BUDGET_MS and exact_extremes
+                        and worst <= ROLLING_QUANTILE_ACCURACY)
+    print(f"add + summary p50 {result['add_and_summary']['p50_ms']:.3f} ms (budget {ADD_BUDGET_MS} ms) "
+          f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
@@ -0,0 +1,90 @@
+# benchmarks/bench_scheduler.py
+#
+# Checks the collector scheduler: on a simulated hour of jittery ticks each
+# collector runs at its own cadence, an over-budget collector is backed off,
+# and the real Sampler loop does not accumulate drift.
+
+import random
+import time
+
+from constants import COLLECTOR_INTERVALS, COLLECTOR_MAX_BACKOFF
+from sampler import Sampler
+from scheduler import CollectorScheduler
+
+SIMULATED_SECONDS = 3600
+JITTER_S = 0.02
+DRIFT_RUN_S = 3.0
+DRIFT_INTERVAL_S = 0.1
+
+
+class _NullStats:
+    def update(self, max_history=None):
+        pass
+
+    def snapshot(self, time_range=None):
+        return time.monotonic()
+
+
+def _cadence():
+    random.seed(0)
+    clock = [0.0]
+    scheduler = CollectorScheduler(clock=lambda: clock[0])
+    counts = {name: 0 for name in COLLECTOR_INTERVALS}
+    for name, interval in COLLECTOR_INTERVALS.items():
+        scheduler.add(name, lambda name=name: counts.__setitem__(name, counts[name] + 1), interval)
+
+    for tick in range(SIMULATED_SECONDS):
+        # The sampler wakes at (or a little after) each second
+        clock[0] = tick + random.random() * JITTER_S
+        scheduler.run_due()
+
+    expected = {name: SIMULATED_SECONDS // interval for name, interval in COLLECTOR_INTERVALS.items()}
+    return counts, expected
+
+
+def _backoff():
+    clock = [0.0]
+    scheduler = CollectorScheduler(clock=lambda: clock[0])
+    # 5 ms per run against a 0.01 s period: 50% of the period, far over budget
+    scheduler.add('slow', lambda: time.sleep(0.005), 0.01)
+    for tick in range(200):
+        clock[0] = tick * 0.01
+        scheduler.run_due()
+    return scheduler.stats()['slow'][1] / 0.01
+
+
+def _drift():
+    sampler = Sampler(_NullStats(), interval=DRIFT_INTERVAL_S)
+    ticks = []
+    sampler.add_listener(ticks.append)
+    sampler.start()
+    time.sleep(DRIFT_RUN_S)
+    sampler.stop()
+    # Distance of the last tick from its ideal slot, origin + k * interval
+    origin = ticks[0]
+    last = ticks[-1]
+    slots = round((last - origin) / DRIFT_INTERVAL_S)
+    return len(ticks), last - origin - slots * DRIFT_INTERVAL_S
+
+
+def run():
+    counts, expected = _cadence()
+    backoff = _backoff()
+    ticks, drift = _drift()
+
+    cadence_ok = all(abs(counts[name] - expected[name]) <= 1 for name in expected)
+    backoff_ok = backoff == COLLECTOR_MAX_BACKOFF
+    drift_ok = abs(drift) < DRIFT_INTERVAL_S / 2
+    result = {
+        'runs': counts,
+        'expected_runs': expected,
+        'backoff': backoff,
+        'drift_ms': drift * 1000,
+        'passed': cadence_ok and backoff_ok and drift_ok,
+    }
+    print(f"cadence over {SIMULATED_SECONDS} s: " +
+          ', '.join(f"{name} {counts[name]}/{expected[name]}" for name in expected))
+    print(f"over-budget collector backed off to {backoff:g}x its period (max {COLLECTOR_MAX_BACKOFF}x)")
+    print(f"sampler drift after {ticks} ticks at {DRIFT_INTERVAL_S} s: {drift * 1000:.2f} ms "
+          f"-> {'PASS' if result['passed'] else 'FAIL'}")
+    return result
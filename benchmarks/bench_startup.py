@@ -0,0 +1,92 @@
+# benchmarks/bench_startup.py
+#
+# Cold-start timings, each in a fresh interpreter and measured from the
+# moment it is launched. With a display it runs `main.py --startup-report` per chart
+# backend (time to first window, first data, all charts built). Without one
+# it times the same startup path minus Tk: imports, first snapshot from the
+# Sampler, and the deferred first chart build, and checks that matplotlib is
+# not loaded before that build and pyplot never is.
+
+import json
+import os
+import subprocess
+import sys
+import time
+import tkinter as tk
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_DATA_BUDGET_MS = 1000.0
+
+_HEADLESS_STARTUP = r'''
+import json, os, sys, time
+
+def age():
+    return (time.time() - float(os.environ['SYSTEMMONITOR_LAUNCHED_AT'])) * 1000
+
+timings = {}
+from system_stats import SystemStats
+from sampler import Sampler
+import ui
+from main import create_chart_manager
+manager = create_chart_manager('matplotlib')
+timings['imports'] = age()
+matplotlib_before_chart = 'matplotlib' in sys.modules
+
+sampler = Sampler(SystemStats(), interval=1.0)
+sampler.start()
+while sampler.latest() is None:
+    time.sleep(0.005)
+timings['first data'] = age()
+
+manager.create_cpu_chart(None, width=3.5, height=0.85)
+timings['first chart'] = age()
+sampler.stop()
+print(json.dumps({'timings': timings, 'matplotlib_before_chart': matplotlib_before_chart,
+                  'pyplot': 'matplotlib.pyplot' in sys.modules}))
+'''
+
+
+def _has_display():
+    try:
+        tk.Tk().destroy()
+        return True
+    except tk.TclError:
+        return False
+
+
+def _launch(args):
+    env = dict(os.environ, SYSTEMMONITOR_LAUNCHED_AT=repr(time.time()))
+    return subprocess.run([sys.executable] + args, cwd=ROOT, env=env, capture_output=True, text=True,
+                          timeout=60).stdout
+
+
+def _run_gui(backend):
+    output = _launch(['main.py', '--startup-report', '--charts', backend])
+    timings = {}
+    for line in output.splitlines():
+        name, _, value = line.rpartition(': ')
+        if value.endswith(' ms'):
+            timings[name] = float(value[:-3])
+    return timings
+
+
+def run():
+    if _has_display():
+        results = {backend: _run_gui(backend) for backend in ('matplotlib', 'canvas')}
+        for backend, timings in results.items():
+            print(f"{backend:>10}: " + ', '.join(f"{name} {ms:.0f} ms" for name, ms in timings.items()))
+        passed = all(timings.get('first data', float('inf')) < FIRST_DATA_BUDGET_MS for timings in results.values())
+        print(f"first data budget {FIRST_DATA_BUDGET_MS:.0f} ms -> {'PASS' if passed else 'FAIL'}")
+        return {'display': True, 'backends': results, 'passed': passed}
+
+    output = _launch(['-c', _HEADLESS_STARTUP])
+    result = json.loads(output.strip().splitlines()[-1])
+    timings = result['timings']
+    lazy_ok = not result['matplotlib_before_chart'] and not result['pyplot']
+    passed = lazy_ok and timings['first data'] < FIRST_DATA_BUDGET_MS
+    print("no display, startup without Tk: " + ', '.join(f"{name} {ms:.0f} ms" for name, ms in timings.items()))
+    print(f"matplotlib loaded before first chart: {result['matplotlib_before_chart']}, "
+          f"pyplot loaded: {result['pyplot']} (first data budget {FIRST_DATA_BUDGET_MS:.0f} ms) "
+          f"-> {'PASS' if passed else 'FAIL'}")
+    result.update({'display': False, 'passed': passed})
+    return result
@@ -0,0 +1,47 @@
+# benchmarks/bench_tsdb.py
+#
+# Writes 24 h of 1 Hz samples into a temporary store, then times range
+# queries that should seek straight to the right blocks.
+
+import math
+import os
+import tempfile
+import time
+
+from tsdb import TimeSeriesStore, STORE_COLUMNS
+
+HOURS = 24
+
+
+def _directory_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def run(hours=HOURS):
+    samples = hours * 3600
+    start = 1_700_000_000.0
+    result = {'samples': samples}
+    with tempfile.TemporaryDirectory() as directory:
+        store = TimeSeriesStore(directory, STORE_COLUMNS, retention_seconds=hours * 3600 * 2)
+        write_start = time.perf_counter()
+        for i in range(samples):
+            wave = math.sin(i / 30.0)
+            store.append(start + i, cpu=50 + 40 * wave, ram=60 + wave, gpu=0, disk=40,
+                         net_up=100 + 90 * wave, net_down=1000 * abs(wave))
+        store.close()
+        result['append_us'] = (time.perf_counter() - write_start) * 1e6 / samples
+        result['bytes_per_sample'] = _directory_size(directory) / samples
+
+        reader = store.reader()
+        end = start + samples
+        for label, seconds in (('last_1m', 60), ('last_1h', 3600), ('last_24h', 24 * 3600)):
+            query_start = time.perf_counter()
+            timestamps, values = reader.query('cpu', end - seconds, end)
+            elapsed = (time.perf_counter() - query_start) * 1000
+            result[label] = {'rows': len(values), 'ms': elapsed}
+        reader.close()
+
+    print(f"append: {result['append_us']:.1f} us/sample, {result['bytes_per_sample']:.1f} bytes/sample on disk")
+    for label in ('last_1m', 'last_1h', 'last_24h'):
+        print(f"query {label}: {result[label]['rows']} rows in {result[label]['ms']:.2f} ms")
+    return result
@@ -0,0 +1,162 @@
+# benchmarks/fake_psutil.py
+#
+# Deterministic stand-in for the parts of psutil SystemStats uses, so
+# collector benchmarks measure our code rather than the machine they run on.
+# installed() swaps it into the modules that import psutil.
+
+import random
+from collections import namedtuple
+from contextlib import contextmanager
+
+import psutil
+
+import io_rates
+import processes
+import system_stats
+
+svmem = namedtuple('svmem', ['total', 'available', 'percent', 'used', 'free'])
+snetio = namedtuple('snetio', ['bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv', 'errin', 'errout',
+                               'dropin', 'dropout'])
+sdiskio = namedtuple('sdiskio', ['read_count', 'write_count', 'read_bytes', 'write_bytes', 'read_time',
+                                 'write_time'])
+sdiskpart = namedtuple('sdiskpart', ['device', 'mountpoint', 'fstype', 'opts'])
+sdiskusage = namedtuple('sdiskusage', ['total', 'used', 'free', 'percent'])
+pcputimes = namedtuple('pcputimes', ['user', 'system'])
+pmem = namedtuple('pmem', ['rss', 'vms'])
+
+GB = 1024 ** 3
+
+
+class FakeProcess:
+    static_reads = 0
+
+    def __init__(self, pid, create_time, rng):
+        self.pid = pid
+        self.create_time = create_time
+        self.cpu_total = 0.0
+        self.rss = rng.randint(1, 2048) * 1024 ** 2
+        self.info = None
+        self._rng = rng
+
+    @contextmanager
+    def oneshot(self):
+        yield
+
+    def name(self):
+        FakeProcess.static_reads += 1
+        return f"proc-{self.pid}"
+
+    def cmdline(self):
+        return [f"/usr/bin/proc-{self.pid}", '--flag']
+
+    def username(self):
+        return 'user'
+
+    def tick(self):
+        self.cpu_total += self._rng.random() * 0.05
+        self.info = {
+            'pid': self.pid,
+            'create_time': self.create_time,
+            'cpu_times': pcputimes(self.cpu_total * 0.7, self.cpu_total * 0.3),
+            'memory_info': pmem(self.rss, self.rss * 2),
+        }
+
+
+class FakeProcessTable:
+    def __init__(self, count, seed=0):
+        self._rng = random.Random(seed)
+        self.next_pid = 1
+        self.processes = [self._spawn() for _ in range(count)]
+
+    def _spawn(self):
+        process = FakeProcess(self.next_pid, float(self.next_pid), self._rng)
+        self.next_pid += 1
+        return process
+
+    def churn(self, count):
+        for _ in range(count):
+            self.processes[self._rng.randrange(len(self.processes))] = self._spawn()
+
+    def process_iter(self, attrs=None, ad_value=None):
+        for process in self.processes:
+            process.tick()
+            yield process
+
+
+class FakePsutil:
+    # Counters advance by a fixed pattern on every read; no randomness
+    # outside the seeded process table
+    NoSuchProcess = psutil.NoSuchProcess
+    AccessDenied = psutil.AccessDenied
+    ZombieProcess = psutil.ZombieProcess
+
+    def __init__(self, cores=8, nics=3, disks=4, mounts=3, processes=300, churn=2, seed=0):
+        self.cores = cores
+        self.nics = [f"eth{index}" for index in range(nics)]
+        self.disks = [f"disk{index}" for index in range(disks)]
+        self.mounts = ['/'] + [f"/mnt/volume{index}" for index in range(1, mounts)]
+        self.table = FakeProcessTable(processes, seed)
+        self.churn = churn
+        self._step = 0
+        self._net = {name: [0, 0] for name in self.nics}
+        self._disk = {name: [0, 0, 0, 0] for name in self.disks}
+
+    def cpu_percent(self, interval=None, percpu=False):
+        self._step += 1
+        percents = [float((self._step * 7 + core * 13) % 100) for core in range(self.cores)]
+        return percents if percpu else sum(percents) / len(percents)
+
+    def virtual_memory(self):
+        used = (4 + self._step % 8) * GB
+        return svmem(16 * GB, 16 * GB - used, used * 100 / (16 * GB), used, 16 * GB - used)
+
+    def net_io_counters(self, pernic=False, nowrap=True):
+        for index, name in enumerate(self.nics):
+            counters = self._net[name]
+            counters[0] += 1000 * (index + 1)
+            counters[1] += 5000 * (index + 1)
+        counters = {name: snetio(sent, received, 0, 0, 0, 0, 0, 0) for name, (sent, received) in self._net.items()}
+        if pernic:
+            return counters
+        return snetio(*(sum(values) for values in zip(*counters.values())))
+
+    def disk_io_counters(self, perdisk=False, nowrap=True):
+        for index, name in enumerate(self.disks):
+            counters = self._disk[name]
+            counters[0] += 10 + index
+            counters[1] += 20 + index
+            counters[2] += 4096 * (10 + index)
+            counters[3] += 4096 * (20 + index)
+        counters = {name: sdiskio(reads, writes, read_bytes, write_bytes, 0, 0)
+                    for name, (reads, writes, read_bytes, write_bytes) in self._disk.items()}
+        if perdisk:
+            return counters
+        return sdiskio(*(sum(values) for values in zip(*counters.values())))
+
+    def disk_partitions(self, all=False):
+        return [sdiskpart(f"/dev/{disk}", mount, 'ext4', 'rw') for disk, mount in zip(self.disks, self.mounts)]
+
+    def disk_usage(self, path):
+        used = (100 + len(path)) * GB
+        return sdiskusage(500 * GB, used, 500 * GB - used, used * 100 / (500 * GB))
+
+    def process_iter(self, attrs=None, ad_value=None):
+        self.table.churn(self.churn)
+        return self.table.process_iter(attrs, ad_value)
+
+
+@contextmanager
+def installed(fake):
+    modules = (system_stats, io_rates, processes)
+    saved = [module.psutil for module in modules]
+    for module in modules:
+        module.psutil = fake
+    # SystemStats would otherwise read the real /proc instead of the fake
+    open_procfs = system_stats.open_procfs
+    system_stats.open_procfs = lambda: None
+    try:
+        yield fake
+    finally:
+        for module, original in zip(modules, saved):
+            module.psutil = original
+        system_stats.open_procfs = open_procfs
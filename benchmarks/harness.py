@@ -0,0 +1,92 @@
+# benchmarks/harness.py
+#
+# Measurement helpers shared by the benchmarks: latency percentiles,
+# tracemalloc allocation figures and RSS growth over long runs.
+
+import gc
+import time
+import tracemalloc
+
+import psutil
+
+ALLOCATION_CALLS = 200
+
+
+def percentiles(timings_ms):
+    ordered = sorted(timings_ms)
+    count = len(ordered)
+
+    def pick(fraction):
+        return ordered[min(int(count * fraction), count - 1)]
+
+    return {
+        'calls': count,
+        'mean_ms': sum(ordered) / count,
+        'p50_ms': pick(0.50),
+        'p90_ms': pick(0.90),
+        'p99_ms': pick(0.99),
+        'max_ms': ordered[-1],
+    }
+
+
+def allocations(function, calls=ALLOCATION_CALLS):
+    # A separate pass: tracing slows every allocation down, so it must not
+    # share a run with the latency timings
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        peak = 0
+        for _ in range(calls):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            function()
+            _, call_peak = tracemalloc.get_traced_memory()
+            peak = max(peak, call_peak - before)
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'alloc_peak_kb': peak / 1024,
+        'retained_bytes_per_call': (end - start) / calls,
+    }
+
+
+def measure(function, calls=1000, warmup=50):
+    for _ in range(warmup):
+        function()
+    timings = []
+    gc.collect()
+    for _ in range(calls):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    result = percentiles(timings)
+    result.update(allocations(function, min(calls, ALLOCATION_CALLS)))
+    return result
+
+
+def rss_growth(function, calls):
+    # Resident set size before and after many calls; steady-state code
+    # should level off after its buffers fill
+    process = psutil.Process()
+    gc.collect()
+    before = process.memory_info().rss
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    after = process.memory_info().rss
+    return {
+        'calls': calls,
+        'seconds': elapsed,
+        'rss_before_mb': before / 1024 ** 2,
+        'rss_after_mb': after / 1024 ** 2,
+        'rss_growth_kb': (after - before) / 1024,
+    }
+
+
+def format_latency(name, result):
+    return (f"{name:<28} p50 {result['p50_ms']:8.3f} ms  p90 {result['p90_ms']:8.3f} ms  "
+            f"p99 {result['p99_ms']:8.3f} ms  peak alloc {result['alloc_peak_kb']:8.1f} KB  "
+            f"retained {result['retained_bytes_per_call']:7.0f} B/call")
@@ -0,0 +1,295 @@
+# canvas_charts.py
+#
+# Chart backend that draws directly on a tk.Canvas. Same interface as
+# charts.ChartManager but without matplotlib: each series is one polyline
+# item whose coordinates are updated in place with coords().
+
+import tkinter as tk
+
+from chart_utils import nice_ceiling, downsample_series, pool_max
+from constants import THEMES, CHART_COLORS, MAX_HISTORY, TIME_RANGES, PER_CORE_HISTORY
+
+DPI = 100
+PAD_LEFT = 30
+PAD_RIGHT = 6
+PAD_TOP = 6
+PAD_BOTTOM = 14
+GRID_FRACTIONS = (0.0, 0.25, 0.5, 0.75, 1.0)
+# Heatmap colour stops (percent, RGB), close to matplotlib's 'inferno'
+HEATMAP_STOPS = (
+    (0, (0, 0, 4)),
+    (25, (87, 16, 110)),
+    (50, (188, 55, 84)),
+    (75, (249, 142, 9)),
+    (100, (252, 255, 164)),
+)
+HEATMAP_PIXELS_PER_COLUMN = 2
+
+
+def _heatmap_palette():
+    # One colour per uint8 value; everything above 100 clamps to the top stop
+    palette = []
+    for value in range(256):
+        value = min(value, 100)
+        for (low, low_rgb), (high, high_rgb) in zip(HEATMAP_STOPS, HEATMAP_STOPS[1:]):
+            if value <= high:
+                t = (value - low) / (high - low)
+                rgb = [round(a + (b - a) * t) for a, b in zip(low_rgb, high_rgb)]
+                break
+        palette.append('#%02x%02x%02x' % tuple(rgb))
+    return palette
+
+
+class _CanvasChart:
+    def __init__(self, canvas, ylabel, ylim, series, width, height):
+        self.canvas = canvas
+        self.ylabel = ylabel
+        self.ylim = ylim  # None means autoscaled (network and disk I/O charts)
+        self.series = series
+        self.top = ylim[1] if ylim is not None else 1.0
+        self.width = width
+        self.height = height
+        self.lines = []
+        self.line_visible = []
+        self.grid_lines = []
+        self.tick_labels = []
+        self.xy = [((), ()) for _ in series]
+        self.downsampled = {}
+        self.photo = None
+        self.matrix = None
+
+
+class CanvasChartManager:
+    def __init__(self, theme='dark', max_history=MAX_HISTORY):
+        self.theme = theme
+        self.max_history = max_history
+        self.charts = {}
+        self.cpu_canvas = None
+        self.ram_canvas = None
+        self.gpu_canvas = None
+        self.network_canvas = None
+        self.disk_io_canvas = None
+        self.heatmap_canvas = None
+        self.time_range = None
+        self._palette = None
+
+    def create_cpu_chart(self, parent, width=6, height=2.5):
+        self.cpu_canvas = self._create_chart('cpu', parent, width, height, 'CPU %', (0, 100), ['cpu'])
+        return self.cpu_canvas
+
+    def create_ram_chart(self, parent, width=6, height=2.5):
+        self.ram_canvas = self._create_chart('ram', parent, width, height, 'RAM %', (0, 100), ['ram'])
+        return self.ram_canvas
+
+    def create_gpu_chart(self, parent, width=6, height=2.5):
+        self.gpu_canvas = self._create_chart('gpu', parent, width, height, 'GPU %', (0, 100), ['gpu'])
+        return self.gpu_canvas
+
+    def create_network_chart(self, parent, width=6, height=2.5):
+        self.network_canvas = self._create_chart('network', parent, width, height, 'KB/s', None,
+                                                 ['net_up', 'net_down'])
+        return self.network_canvas
+
+    def create_disk_io_chart(self, parent, width=6, height=2.5):
+        self.disk_io_canvas = self._create_chart('disk_io', parent, width, height, 'Disk KB/s', None,
+                                                 ['disk_read', 'disk_write'])
+        return self.disk_io_canvas
+
+    def create_heatmap_chart(self, parent, width=6, height=2.5):
+        theme_colors = THEMES[self.theme]
+        pixel_width = int(width * DPI)
+        pixel_height = int(height * DPI)
+        palette = _heatmap_palette()
+        # Pre-joined runs of each colour, one entry per pixel of a column
+        self._palette = [' '.join([color] * HEATMAP_PIXELS_PER_COLUMN) for color in palette]
+
+        canvas = tk.Canvas(parent, width=pixel_width, height=pixel_height, bg=theme_colors['chart_bg'],
+                           highlightthickness=0)
+        canvas.pack(fill='both', expand=True)
+        chart = _CanvasChart(canvas, 'Cores', None, [], pixel_width, pixel_height)
+        chart.photo = tk.PhotoImage(width=1, height=1)
+        chart.image_item = canvas.create_image(PAD_LEFT, PAD_TOP, anchor='nw', image=chart.photo)
+        chart.axis_label = canvas.create_text(0, 0, text='Cores', anchor='w', font=('Arial', 7),
+                                              fill=theme_colors['chart_fg'])
+
+        canvas.bind('<Configure>', lambda event, chart=chart: self._on_resize(chart, event))
+        self._layout(chart)
+        self.charts['heatmap'] = chart
+        self.heatmap_canvas = canvas
+        return canvas
+
+    def update_heatmap_chart(self, matrix):
+        chart = self.charts.get('heatmap')
+        if chart is None or matrix is None or not matrix.size:
+            return
+        chart.matrix = matrix
+        self._draw_heatmap(chart)
+
+    def _draw_heatmap(self, chart):
+        matrix = chart.matrix
+        if matrix is None:
+            return
+        x0, y0, x1, y1 = self._plot_area(chart)
+        plot_width = int(x1 - x0)
+        plot_height = int(y1 - y0)
+        cores, samples = matrix.shape
+
+        # The x-axis spans PER_CORE_HISTORY seconds, newest sample on the right
+        columns = max(int(plot_width * min(samples, PER_CORE_HISTORY) / PER_CORE_HISTORY)
+                      // HEATMAP_PIXELS_PER_COLUMN, 1)
+        pooled = pool_max(matrix, plot_height, columns)
+        rows, columns = pooled.shape
+        row_height = max(plot_height // rows, 1)
+
+        palette = self._palette
+        lines = ['{' + ' '.join([palette[value] for value in row]) + '}' for row in pooled.tolist()]
+        data = ' '.join(line for line in lines for _ in range(row_height))
+        chart.photo.put(data, to=(max(plot_width - columns * HEATMAP_PIXELS_PER_COLUMN, 0), 0))
+        chart.canvas.itemconfigure(chart.axis_label, text=f"Cores 0-{cores - 1}")
+
+    def update_cpu_chart(self, data, timestamps=None):
+        self._update_chart('cpu', (data,), timestamps)
+
+    def update_gpu_chart(self, data, timestamps=None):
+        self._update_chart('gpu', (data,), timestamps)
+
+    def update_ram_chart(self, data, timestamps=None):
+        self._update_chart('ram', (data,), timestamps)
+
+    def update_network_chart(self, up_data, down_data, timestamps=None):
+        self._update_chart('network', (up_data, down_data), timestamps)
+
+    def update_disk_io_chart(self, read_data, write_data, timestamps=None):
+        self._update_chart('disk_io', (read_data, write_data), timestamps)
+
+    def set_theme(self, theme):
+        self.theme = theme
+
+    def set_time_range(self, time_range):
+        self.time_range = time_range
+        for chart in self.charts.values():
+            chart.downsampled.clear()
+
+    def _create_chart(self, key, parent, width, height, ylabel, ylim, series):
+        theme_colors = THEMES[self.theme]
+        colors = CHART_COLORS[self.theme]
+        pixel_width = int(width * DPI)
+        pixel_height = int(height * DPI)
+
+        canvas = tk.Canvas(parent, width=pixel_width, height=pixel_height, bg=theme_colors['chart_bg'],
+                           highlightthickness=0)
+        canvas.pack(fill='both', expand=True)
+        chart = _CanvasChart(canvas, ylabel, ylim, series, pixel_width, pixel_height)
+
+        for _ in GRID_FRACTIONS:
+            chart.grid_lines.append(canvas.create_line(0, 0, 0, 0, fill=theme_colors['chart_grid']))
+            chart.tick_labels.append(canvas.create_text(0, 0, text='', anchor='e', font=('Arial', 6),
+                                                        fill=theme_colors['chart_fg']))
+        chart.axis_label = canvas.create_text(0, 0, text=ylabel, anchor='w', font=('Arial', 7),
+                                              fill=theme_colors['chart_fg'])
+        for name in series:
+            chart.lines.append(canvas.create_line(0, 0, 0, 0, fill=colors[name], width=2, state='hidden'))
+            chart.line_visible.append(False)
+
+        canvas.bind('<Configure>', lambda event, chart=chart: self._on_resize(chart, event))
+        self._layout(chart)
+        self.charts[key] = chart
+        return canvas
+
+    def _on_resize(self, chart, event):
+        if (event.width, event.height) == (chart.width, chart.height):
+            return
+        chart.width = event.width
+        chart.height = event.height
+        self._layout(chart)
+
+    def _plot_area(self, chart):
+        return PAD_LEFT, PAD_TOP, max(chart.width - PAD_RIGHT, PAD_LEFT + 1), \
+            max(chart.height - PAD_BOTTOM, PAD_TOP + 1)
+
+    def _layout(self, chart):
+        canvas = chart.canvas
+        x0, y0, x1, y1 = self._plot_area(chart)
+        if chart.photo is not None:
+            chart.photo.blank()
+            chart.photo.configure(width=int(x1 - x0), height=int(y1 - y0))
+            canvas.coords(chart.image_item, x0, y0)
+            canvas.coords(chart.axis_label, x0, chart.height - PAD_BOTTOM / 2)
+            self._draw_heatmap(chart)
+            return
+        for fraction, grid_line, tick_label in zip(GRID_FRACTIONS, chart.grid_lines, chart.tick_labels):
+            y = y1 - (y1 - y0) * fraction
+            canvas.coords(grid_line, x0, y, x1, y)
+            canvas.coords(tick_label, x0 - 3, y)
+        canvas.coords(chart.axis_label, x0, chart.height - PAD_BOTTOM / 2)
+        self._relabel(chart)
+        self._redraw_lines(chart)
+
+    def _relabel(self, chart):
+        for fraction, tick_label in zip(GRID_FRACTIONS, chart.tick_labels):
+            chart.canvas.itemconfigure(tick_label, text=f"{chart.top * fraction:g}")
+
+    def _update_chart(self, key, series_data, timestamps=None):
+        chart = self.charts.get(key)
+        if chart is None:
+            return
+        chart.xy = self._series_xy(chart, series_data, timestamps)
+
+        if chart.ylim is None:
+            peak = max((max(y) for x, y in chart.xy if len(y)), default=0.0)
+            top = nice_ceiling(peak)
+            if top != chart.top:
+                chart.top = top
+                self._relabel(chart)
+
+        self._redraw_lines(chart)
+
+    def _series_xy(self, chart, series_data, timestamps):
+        if timestamps is None or self.time_range is None or not len(timestamps):
+            return [(range(len(data)), data) for data in series_data]
+
+        unit = TIME_RANGES[self.time_range][2]
+        x0, _, x1, _ = self._plot_area(chart)
+        max_points = max(int(x1 - x0) // 2, 3)
+        series = []
+        for index, data in enumerate(series_data):
+            # Rollup tiers only change once per bucket, so reuse the last result
+            key = (len(data), timestamps[0], timestamps[-1], max_points)
+            cached = chart.downsampled.get(index)
+            if cached is None or cached[0] != key:
+                cached = (key, downsample_series(timestamps, data, unit, max_points))
+                chart.downsampled[index] = cached
+            series.append(cached[1])
+        return series
+
+    def _x_range(self, chart):
+        if self.time_range is not None:
+            span, _, unit, _ = TIME_RANGES[self.time_range]
+            return -span / unit, 0.0
+        count = max(len(y) for x, y in chart.xy)
+        return 0.0, float(max(self.max_history - 1, count - 1, 1))
+
+    def _redraw_lines(self, chart):
+        canvas = chart.canvas
+        x0, y0, x1, y1 = self._plot_area(chart)
+        top = chart.top
+        x_min, x_max = self._x_range(chart)
+        x_scale = (x1 - x0) / (x_max - x_min)
+        y_scale = (y1 - y0) / top
+
+        for index, (line, (xs, ys)) in enumerate(zip(chart.lines, chart.xy)):
+            if len(ys) < 2:
+                if chart.line_visible[index]:
+                    canvas.itemconfigure(line, state='hidden')
+                    chart.line_visible[index] = False
+                continue
+
+            coords = []
+            for x, y in zip(xs, ys):
+                coords.append(x0 + (x - x_min) * x_scale)
+                coords.append(y1 - min(y, top) * y_scale)
+            canvas.coords(line, coords)
+
+            if not chart.line_visible[index]:
+                canvas.itemconfigure(line, state='normal')
+                chart.line_visible[index] = True
@@ -0,0 +1,281 @@
+# cgroups.py
+#
+# Container-aware accounting on cgroup v2. Inside a container psutil sees
+# the host: every CPU and all of its RAM. CgroupStats reads the
+# container's own cgroup instead:
+#
+#   cpu.stat (usage_usec)          CPU % of the quota in cpu.max, or of the
+#                                  CPUs in cpuset.cpus.effective
+#   memory.current / memory.max    used / limit, less the reclaimable page
+#                                  cache (inactive_file in memory.stat) as
+#                                  `docker stats` shows it
+#   io.stat                        bytes and I/Os per device
+#
+# Limits set higher up the tree apply too, so the tightest one between the
+# cgroup and the root counts. With children=True, the direct child cgroups
+# (services under system.slice, containers in a pod) get a CPU / memory
+# breakdown: a batch of them is read per update, so a slice with hundreds
+# of services costs the same each tick.
+#
+# Every path is relative to `root`, so a fake tree in a temp directory
+# stands in for /sys/fs/cgroup.
+
+import os
+import time
+from collections import namedtuple
+
+from procfs import DiskCounters
+from constants import CGROUP_SCAN_BATCH, CGROUP_RESCAN, CGROUP_ROWS
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+PROC_SELF_CGROUP = '/proc/self/cgroup'
+# MAJ:MIN -> device symlinks, for the names in io.stat
+SYS_DEV_BLOCK = '/sys/dev/block'
+
+CgroupChild = namedtuple('CgroupChild', ['name', 'cpu_percent', 'memory_bytes'])
+# cpu_limit in CPUs; memory_limit in bytes, None without one
+CgroupUsage = namedtuple('CgroupUsage', ['path', 'cpu_limit', 'memory_limit', 'children'])
+
+
+def _read_line(path):
+    with open(path, encoding='ascii') as cgroup_file:
+        return cgroup_file.read().strip()
+
+
+def _read_keyed(path):
+    # "key value" lines (cpu.stat, memory.stat) -> {key: int}
+    values = {}
+    with open(path, encoding='ascii') as cgroup_file:
+        for line in cgroup_file:
+            key, _, value = line.partition(' ')
+            if value:
+                values[key] = int(value)
+    return values
+
+
+def parse_cpuset(text):
+    # "0-3,6" -> 5
+    count = 0
+    for part in text.split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        count += int(last or first) - int(first) + 1
+    return count
+
+
+def _ancestors(root, path):
+    # The cgroup's directory and each parent up to root
+    parts = [part for part in path.split('/') if part]
+    for depth in range(len(parts), -1, -1):
+        yield os.path.join(root, *parts[:depth])
+
+
+def read_cpu_limit(root, path, cpu_count):
+    # CPUs the cgroup may use: the smallest cpu.max quota on the way up,
+    # capped by its cpuset
+    limit = float(cpu_count)
+    for directory in _ancestors(root, path):
+        try:
+            quota, _, period = _read_line(os.path.join(directory, 'cpu.max')).partition(' ')
+            if quota != 'max':
+                limit = min(limit, int(quota) / int(period or 100000))
+        except (OSError, ValueError):
+            pass
+    try:
+        cpus = parse_cpuset(_read_line(os.path.join(root, path, 'cpuset.cpus.effective')))
+        if cpus:
+            limit = min(limit, cpus)
+    except (OSError, ValueError):
+        pass
+    return limit
+
+
+def read_memory_limit(root, path):
+    # Smallest memory.max on the way up; None when nothing is limited
+    limit = None
+    for directory in _ancestors(root, path):
+        try:
+            value = _read_line(os.path.join(directory, 'memory.max'))
+            if value != 'max':
+                limit = int(value) if limit is None else min(limit, int(value))
+        except (OSError, ValueError):
+            pass
+    return limit
+
+
+def find_cgroup(root=CGROUP_ROOT, proc_self_cgroup=PROC_SELF_CGROUP):
+    # This process's cgroup relative to root ('' for root itself), or None
+    # where root is not a cgroup v2 (unified) hierarchy
+    if not os.path.exists(os.path.join(root, 'cgroup.controllers')):
+        return None
+    try:
+        with open(proc_self_cgroup, encoding='utf-8') as cgroup_file:
+            lines = cgroup_file.read().splitlines()
+    except OSError:
+        return ''
+    for line in lines:
+        if line.startswith('0::'):
+            path = line[3:].strip('/')
+            # In a cgroup namespace the path is "/" already; without one a
+            # container sees a host path that is not mounted inside it
+            return path if os.path.isdir(os.path.join(root, path)) else ''
+    return None
+
+
+class ChildScanner:
+    # Direct child cgroups, batch of them read per update() round-robin;
+    # the directory is listed again every rescan seconds. Each child's CPU %
+    # is over the time since it was last read, of the parent's CPU limit
+    def __init__(self, directory, cpu_limit, batch=CGROUP_SCAN_BATCH, rescan=CGROUP_RESCAN, rows=CGROUP_ROWS,
+                 clock=time.monotonic):
+        self.directory = directory
+        self.cpu_limit = cpu_limit
+        self.batch = batch
+        self.rescan = rescan
+        self.rows = rows
+        self._clock = clock
+        self.names = []
+        self.cursor = 0
+        self.listed_at = None
+        self.reads = 0
+        self._previous = {}
+        self.usage = {}
+        self.top = ()
+
+    def update(self):
+        now = self._clock()
+        if self.listed_at is None or now - self.listed_at >= self.rescan:
+            self._list(now)
+        for _ in range(min(self.batch, len(self.names))):
+            self.cursor %= len(self.names)
+            self._read(self.names[self.cursor], now)
+            self.cursor += 1
+        self.top = tuple(sorted(self.usage.values(), key=lambda child: (child.cpu_percent, child.memory_bytes),
+                                reverse=True)[:self.rows])
+        return self.top
+
+    def _list(self, now):
+        self.listed_at = now
+        try:
+            with os.scandir(self.directory) as entries:
+                names = sorted(entry.name for entry in entries if entry.is_dir(follow_symlinks=False))
+        except OSError as e:
+            print(f"Cgroup scan error: {e}")
+            names = []
+        self.names = names
+        present = set(names)
+        for gone in [name for name in self._previous if name not in present]:
+            del self._previous[gone]
+            self.usage.pop(gone, None)
+
+    def _read(self, name, now):
+        directory = os.path.join(self.directory, name)
+        self.reads += 1
+        try:
+            usage = _read_keyed(os.path.join(directory, 'cpu.stat'))['usage_usec']
+        except (OSError, KeyError, ValueError):
+            # Removed since the listing, or no cpu controller
+            self._previous.pop(name, None)
+            self.usage.pop(name, None)
+            return
+        try:
+            memory = int(_read_line(os.path.join(directory, 'memory.current')))
+        except (OSError, ValueError):
+            memory = 0
+        previous = self._previous.get(name)
+        self._previous[name] = (usage, now)
+        cpu = 0.0
+        if previous is not None and now > previous[1]:
+            cpu = max(usage - previous[0], 0) / ((now - previous[1]) * 1e6 * self.cpu_limit) * 100
+        self.usage[name] = CgroupChild(name, round(cpu, 1), memory)
+
+
+class CgroupStats:
+    def __init__(self, root=CGROUP_ROOT, path='', children=False, cpu_count=None, sys_dev_block=SYS_DEV_BLOCK,
+                 clock=time.monotonic):
+        self.root = root
+        self.path = path.strip('/')
+        self.directory = os.path.join(root, self.path)
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+        self.cpu_limit = read_cpu_limit(root, self.path, self.cpu_count)
+        self.memory_limit = read_memory_limit(root, self.path)
+        self.sys_dev_block = sys_dev_block
+        self._clock = clock
+        self._cpu = None
+        self._device_names = {}
+        self.children = ChildScanner(self.directory, self.cpu_limit, clock=clock) if children else None
+
+    def limited(self):
+        # Whether host-wide numbers would mislead
+        return self.cpu_limit < self.cpu_count or self.memory_limit is not None
+
+    def cpu_percent(self):
+        # Utilisation of cpu_limit since the previous call, 0.0 on the first
+        usage = _read_keyed(os.path.join(self.directory, 'cpu.stat'))['usage_usec']
+        now = self._clock()
+        previous, self._cpu = self._cpu, (usage, now)
+        if previous is None or now <= previous[1]:
+            return 0.0
+        share = max(usage - previous[0], 0) / ((now - previous[1]) * 1e6 * self.cpu_limit)
+        return round(min(share, 1.0) * 100, 1)
+
+    def memory_used(self):
+        # Bytes charged to the cgroup less inactive page cache; the root
+        # cgroup has no memory.current and raises OSError
+        current = int(_read_line(os.path.join(self.directory, 'memory.current')))
+        try:
+            inactive = _read_keyed(os.path.join(self.directory, 'memory.stat')).get('inactive_file', 0)
+        except (OSError, ValueError):
+            inactive = 0
+        return max(current - inactive, 0)
+
+    def io_counters(self):
+        # {device: DiskCounters}, like procfs.ProcStats.disk_io_counters()
+        counters = {}
+        with open(os.path.join(self.directory, 'io.stat'), encoding='ascii') as io_file:
+            for line in io_file:
+                device, *fields = line.split()
+                values = dict(field.split('=', 1) for field in fields if '=' in field)
+                counters[self._device_name(device)] = DiskCounters(
+                    int(values.get('rios', 0)), int(values.get('wios', 0)),
+                    int(values.get('rbytes', 0)), int(values.get('wbytes', 0)))
+        return counters
+
+    def _device_name(self, device):
+        name = self._device_names.get(device)
+        if name is None:
+            try:
+                name = os.path.basename(os.readlink(os.path.join(self.sys_dev_block, device)))
+            except OSError:
+                name = device
+            self._device_names[device] = name
+        return name
+
+    def update_children(self):
+        return self.children.update() if self.children is not None else ()
+
+    def usage(self):
+        return CgroupUsage('/' + self.path, self.cpu_limit, self.memory_limit,
+                           self.children.top if self.children is not None else ())
+
+
+def open_cgroup(mode='auto', path=None, children=False, root=CGROUP_ROOT, proc_self_cgroup=PROC_SELF_CGROUP):
+    # mode 'on': account this process's cgroup (or path, relative to root);
+    # 'auto': only when it has a CPU or memory limit, or children were
+    # asked for; 'off': never. -> CgroupStats or None
+    if mode == 'off':
+        return None
+    if path is None:
+        path = find_cgroup(root, proc_self_cgroup)
+        if path is None:
+            if mode == 'on':
+                print(f"Cgroup error: {root} is not a cgroup v2 hierarchy")
+            return None
+    elif not os.path.isdir(os.path.join(root, path.strip('/'))):
+        print(f"Cgroup error: no cgroup {path} under {root}")
+        return None
+    stats = CgroupStats(root, path, children)
+    if mode == 'auto' and not children and not stats.limited():
+        return None
+    return stats
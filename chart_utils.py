@@ -0,0 +1,125 @@
+# chart_utils.py
+#
+# Helpers shared by the matplotlib and tk.Canvas chart backends. Must not
+# import matplotlib; NumPy is used when available.
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def nice_ceiling(value):
+    # Round the peak (plus headroom) up to 1/2/5 x 10^n so an autoscaled axis
+    # only changes when the data crosses a step
+    if value <= 0:
+        return 1.0
+    value *= 1.1
+    magnitude = 10 ** math.floor(math.log10(value))
+    for step in (1, 2, 5, 10):
+        if step * magnitude >= value:
+            return float(step * magnitude)
+    return float(10 * magnitude)
+
+
+def lttb(x, y, threshold):
+    # Largest-Triangle-Three-Buckets: keeps the first and last point and, from
+    # each of threshold - 2 equal buckets in between, the point forming the
+    # largest triangle with the previously kept point and the next bucket's
+    # average. Bucket averages come from one cumulative sum and each bucket's
+    # areas are a single array expression; only the bucket loop stays in Python.
+    count = len(x)
+    if threshold < 3 or count <= threshold:
+        return x, y
+    if np is None:
+        return _lttb_python(x, y, threshold)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.intp)
+    starts = edges[:-1]
+    ends = edges[1:]
+
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = ends - starts
+    x_avgs = (x_sums[ends] - x_sums[starts]) / sizes
+    y_avgs = (y_sums[ends] - y_sums[starts]) / sizes
+    # Each bucket looks ahead to the next bucket's average; the last one to the final point
+    next_x = np.append(x_avgs[1:], x[-1])
+    next_y = np.append(y_avgs[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = count - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = starts[bucket], ends[bucket]
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - next_x[bucket]) * (y[start:end] - py) - (px - x[start:end]) * (next_y[bucket] - py))
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return x[selected], y[selected]
+
+
+def _lttb_python(x, y, threshold):
+    count = len(x)
+    bucket_size = (count - 2) / (threshold - 2)
+    out_x = [x[0]]
+    out_y = [y[0]]
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, count)
+        if end >= count - 1:
+            avg_x, avg_y = x[-1], y[-1]
+        else:
+            span = next_end - end
+            avg_x = sum(x[end:next_end]) / span
+            avg_y = sum(y[end:next_end]) / span
+        px, py = x[previous], y[previous]
+        best_area = -1.0
+        for index in range(start, end):
+            area = abs((px - avg_x) * (y[index] - py) - (px - x[index]) * (avg_y - py))
+            if area > best_area:
+                best_area = area
+                previous = index
+        out_x.append(x[previous])
+        out_y.append(y[previous])
+    out_x.append(x[-1])
+    out_y.append(y[-1])
+    return out_x, out_y
+
+
+def downsample_series(timestamps, values, unit, max_points):
+    # x is time relative to the newest sample, in `unit` seconds (<= 0)
+    if np is not None:
+        timestamps = np.asarray(timestamps)
+        x = (timestamps - timestamps[-1]) / unit
+        y = np.asarray(values, dtype=float)
+    else:
+        last = timestamps[-1]
+        x = [(timestamp - last) / unit for timestamp in timestamps]
+        y = list(values)
+    return lttb(x, y, max_points)
+
+
+def pool_max(matrix, rows, columns):
+    # Max-pools a 2-D array (NumPy required) to at most rows x columns so a
+    # single hot core or a one-sample spike stays visible. Surplus old columns
+    # are dropped; rows are padded with zeros to a whole number of groups.
+    height, width = matrix.shape
+    if width > columns > 0:
+        factor = -(-width // columns)
+        usable = width - width % factor
+        matrix = matrix[:, width - usable:].reshape(height, usable // factor, factor).max(axis=2)
+    if height > rows > 0:
+        factor = -(-height // rows)
+        padding = -height % factor
+        if padding:
+            matrix = np.concatenate((matrix, np.zeros((padding, matrix.shape[1]), dtype=matrix.dtype)))
+        matrix = matrix.reshape(-1, factor, matrix.shape[1]).max(axis=1)
+    return matrix
@@ -1,151 +1,210 @@
 # charts.py
+#
+# Matplotlib is imported on the first chart build, not with this module, so
+# the window can appear before it loads. pyplot is never imported.
 
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+import numpy as np
+
+from chart_utils import nice_ceiling, downsample_series, pool_max
+from constants import MAX_HISTORY, TIME_RANGES, PER_CORE_HISTORY
+
+
+def _figure(width, height):
+    from matplotlib.figure import Figure
+    return Figure(figsize=(width, height), dpi=100)
+
+
+class _Chart:
+    def __init__(self, fig, ax, canvas, ylabel, ylim, series):
+        self.fig = fig
+        self.ax = ax
+        self.canvas = canvas
+        self.ylabel = ylabel
+        self.ylim = ylim  # None means autoscaled (network and disk I/O charts)
+        self.series = series
+        self.artists = []
+        self.background = None
+        self.downsampled = {}
+
+    def as_tuple(self):
+        return self.fig, self.ax, self.canvas
 
 
 class ChartManager:
-    def __init__(self, theme='dark'):
+    # blit=True keeps one Line2D per series, updates it with set_data and
+    # redraws only the data layer over a cached background. blit=False is the
+    # original clear-and-replot path, kept for comparison and as a fallback.
+    def __init__(self, theme='dark', blit=True, max_history=MAX_HISTORY):
         self.theme = theme
+        self.blit = blit
+        self.max_history = max_history
+        self.charts = {}
         self.cpu_canvas = None
         self.ram_canvas = None
         self.gpu_canvas = None
         self.network_canvas = None
+        self.disk_io_canvas = None
+        self.heatmap_canvas = None
+        self.time_range = None
+        self._x = np.arange(max_history, dtype=float)
 
     def create_cpu_chart(self, parent, width=6, height=2.5):
-        fig = Figure(figsize=(width, height), dpi=100)
-        ax = fig.add_subplot(111)
-        ax.set_ylim(0, 100)
-        ax.set_ylabel('CPU %', fontsize=8)
-        ax.set_xlabel('Seconds', fontsize=8)
-        fig.patch.set_facecolor(self._get_chart_bg())
-        ax.set_facecolor(self._get_chart_bg())
-        ax.tick_params(colors=self._get_chart_fg(), labelsize=7)
-        ax.spines['bottom'].set_color(self._get_chart_grid())
-        ax.spines['left'].set_color(self._get_chart_grid())
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.grid(True, alpha=0.3, color=self._get_chart_grid())
-        fig.subplots_adjust(left=0.08, right=0.98, top=0.95, bottom=0.12)
-        
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.get_tk_widget().pack(fill='both', expand=True)
-        self.cpu_canvas = (fig, ax, canvas)
-        return canvas
+        chart = self._create_chart('cpu', parent, width, height, 'CPU %', (0, 100),
+                                   [('CPU', self._get_cpu_color())])
+        self.cpu_canvas = chart.as_tuple()
+        return chart.canvas
 
     def create_ram_chart(self, parent, width=6, height=2.5):
-        fig = Figure(figsize=(width, height), dpi=100)
-        ax = fig.add_subplot(111)
-        ax.set_ylim(0, 100)
-        ax.set_ylabel('RAM %', fontsize=8)
-        ax.set_xlabel('Seconds', fontsize=8)
-        fig.patch.set_facecolor(self._get_chart_bg())
-        ax.set_facecolor(self._get_chart_bg())
-        ax.tick_params(colors=self._get_chart_fg(), labelsize=7)
-        ax.spines['bottom'].set_color(self._get_chart_grid())
-        ax.spines['left'].set_color(self._get_chart_grid())
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.grid(True, alpha=0.3, color=self._get_chart_grid())
-        fig.subplots_adjust(left=0.08, right=0.98, top=0.95, bottom=0.12)
-        
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.get_tk_widget().pack(fill='both', expand=True)
-        self.ram_canvas = (fig, ax, canvas)
-        return canvas
+        chart = self._create_chart('ram', parent, width, height, 'RAM %', (0, 100),
+                                   [('RAM', self._get_ram_color())])
+        self.ram_canvas = chart.as_tuple()
+        return chart.canvas
 
     def create_gpu_chart(self, parent, width=6, height=2.5):
-        fig = Figure(figsize=(width, height), dpi=100)
+        chart = self._create_chart('gpu', parent, width, height, 'GPU %', (0, 100),
+                                   [('GPU', self._get_gpu_color())])
+        self.gpu_canvas = chart.as_tuple()
+        return chart.canvas
+
+    def create_network_chart(self, parent, width=6, height=2.5):
+        chart = self._create_chart('network', parent, width, height, 'Speed (KB/s)', None,
+                                   [('Upload', self._get_net_up_color()),
+                                    ('Download', self._get_net_down_color())])
+        self.network_canvas = chart.as_tuple()
+        return chart.canvas
+
+    def create_disk_io_chart(self, parent, width=6, height=2.5):
+        chart = self._create_chart('disk_io', parent, width, height, 'Disk (KB/s)', None,
+                                   [('Read', self._get_disk_read_color()),
+                                    ('Write', self._get_disk_write_color())])
+        self.disk_io_canvas = chart.as_tuple()
+        return chart.canvas
+
+    def create_heatmap_chart(self, parent, width=6, height=2.5):
+        fig = _figure(width, height)
         ax = fig.add_subplot(111)
-        ax.set_ylim(0, 100)
-        ax.set_ylabel('GPU %', fontsize=8)
-        ax.set_xlabel('Seconds', fontsize=8)
         fig.patch.set_facecolor(self._get_chart_bg())
-        ax.set_facecolor(self._get_chart_bg())
-        ax.tick_params(colors=self._get_chart_fg(), labelsize=7)
-        ax.spines['bottom'].set_color(self._get_chart_grid())
-        ax.spines['left'].set_color(self._get_chart_grid())
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.grid(True, alpha=0.3, color=self._get_chart_grid())
-        fig.subplots_adjust(left=0.08, right=0.98, top=0.95, bottom=0.12)
-        
-        canvas = FigureCanvasTkAgg(fig, master=parent)
-        canvas.get_tk_widget().pack(fill='both', expand=True)
-        self.gpu_canvas = (fig, ax, canvas)
+        self._style_axes(ax, 'Core', None)
+        ax.grid(False)
+        fig.subplots_adjust(left=0.08, right=0.98, top=0.95, bottom=0.2)
+
+        canvas = self._make_canvas(fig, parent)
+        chart = _Chart(fig, ax, canvas, 'Core', None, [])
+        # Core 0 at the top, newest sample on the right
+        chart.extent = (-1, 0, 0.5, -0.5)
+        image = ax.imshow(np.zeros((1, 1), dtype=np.uint8), aspect='auto', cmap='inferno', vmin=0, vmax=100,
+                          interpolation='nearest', extent=chart.extent, animated=self.blit)
+        ax.set_xlim(-PER_CORE_HISTORY, 0)
+        ax.set_ylim(0.5, -0.5)
+        # Growing the image extent must not rescale the axes, so only a change
+        # in core count needs a full redraw
+        ax.set_autoscale_on(False)
+        chart.artists.append(image)
+        if self.blit:
+            canvas.mpl_connect('draw_event', lambda event, chart=chart: self._on_draw(chart))
+
+        self.charts['heatmap'] = chart
+        self.heatmap_canvas = chart.as_tuple()
         return canvas
 
-    def create_network_chart(self, parent, width=6, height=2.5):
-        fig = Figure(figsize=(width, height), dpi=100)
+    def update_heatmap_chart(self, matrix):
+        # matrix is cores x samples (one sample per second), newest last
+        chart = self.charts.get('heatmap')
+        if chart is None or matrix is None or not matrix.size:
+            return
+        ax = chart.ax
+        image = chart.artists[0]
+        cores, samples = matrix.shape
+        image.set_data(pool_max(matrix, int(ax.bbox.height), int(ax.bbox.width)))
+
+        needs_redraw = chart.background is None or not self.blit
+        extent = (-samples, 0, cores - 0.5, -0.5)
+        if extent != chart.extent:
+            chart.extent = extent
+            image.set_extent(extent)
+            if tuple(ax.get_ylim()) != (cores - 0.5, -0.5):
+                ax.set_ylim(cores - 0.5, -0.5)
+                needs_redraw = True
+
+        if needs_redraw:
+            chart.canvas.draw_idle()
+        else:
+            self._blit_artists(chart)
+
+    def update_cpu_chart(self, data, timestamps=None):
+        self._update_chart('cpu', (data,), timestamps)
+
+    def update_gpu_chart(self, data, timestamps=None):
+        self._update_chart('gpu', (data,), timestamps)
+
+    def update_ram_chart(self, data, timestamps=None):
+        self._update_chart('ram', (data,), timestamps)
+
+    def update_network_chart(self, up_data, down_data, timestamps=None):
+        self._update_chart('network', (up_data, down_data), timestamps)
+
+    def update_disk_io_chart(self, read_data, write_data, timestamps=None):
+        self._update_chart('disk_io', (read_data, write_data), timestamps)
+
+    def set_theme(self, theme):
+        self.theme = theme
+
+    def set_time_range(self, time_range):
+        # Switches the x-axis to time relative to the newest sample; series
+        # passed with timestamps are downsampled to the axes' pixel width
+        self.time_range = time_range
+        for chart in self.charts.values():
+            self._apply_time_range(chart)
+            chart.downsampled.clear()
+            chart.background = None
+            chart.canvas.draw_idle()
+
+    def _apply_time_range(self, chart):
+        if self.time_range is None:
+            return
+        span, _, unit, label = TIME_RANGES[self.time_range]
+        chart.ax.set_xlim(-span / unit, 0)
+        chart.ax.set_xlabel(label, fontsize=8)
+
+    def _create_chart(self, key, parent, width, height, ylabel, ylim, series):
+        fig = _figure(width, height)
         ax = fig.add_subplot(111)
-        ax.set_ylabel('Speed (KB/s)', fontsize=8)
-        ax.set_xlabel('Seconds', fontsize=8)
         fig.patch.set_facecolor(self._get_chart_bg())
-        ax.set_facecolor(self._get_chart_bg())
-        ax.tick_params(colors=self._get_chart_fg(), labelsize=7)
-        ax.spines['bottom'].set_color(self._get_chart_grid())
-        ax.spines['left'].set_color(self._get_chart_grid())
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.grid(True, alpha=0.3, color=self._get_chart_grid())
+        self._style_axes(ax, ylabel, ylim)
         fig.subplots_adjust(left=0.08, right=0.98, top=0.95, bottom=0.12)
-        
+
+        canvas = self._make_canvas(fig, parent)
+        chart = _Chart(fig, ax, canvas, ylabel, ylim, series)
+
+        if self.blit:
+            ax.set_xlim(0, max(self.max_history - 1, 1))
+            self._apply_time_range(chart)
+            if ylim is None:
+                ax.set_ylim(0, 1)
+            for label, color in series:
+                line, = ax.plot([], [], color=color, linewidth=2, label=label, animated=True)
+                chart.artists.append(line)
+            if len(series) > 1:
+                ax.legend(loc='upper left', fontsize=7, framealpha=0.9)
+            canvas.mpl_connect('draw_event', lambda event, chart=chart: self._on_draw(chart))
+
+        self.charts[key] = chart
+        return chart
+
+    def _make_canvas(self, fig, parent):
+        # parent=None renders off-screen on plain Agg (benchmarks, exports)
+        if parent is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            return FigureCanvasAgg(fig)
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         canvas = FigureCanvasTkAgg(fig, master=parent)
         canvas.get_tk_widget().pack(fill='both', expand=True)
-        self.network_canvas = (fig, ax, canvas)
         return canvas
 
-    def update_cpu_chart(self, data):
-        if self.cpu_canvas is None:
-            return
-        fig, ax, canvas = self.cpu_canvas
-        ax.clear()
-        ax.set_ylim(0, 100)
-        ax.set_ylabel('CPU %', fontsize=8)
-        ax.set_xlabel('Seconds', fontsize=8)
-        ax.set_facecolor(self._get_chart_bg())
-        ax.tick_params(colors=self._get_chart_fg(), labelsize=7)
-        ax.spines['bottom'].set_color(self._get_chart_grid())
-        ax.spines['left'].set_color(self._get_chart_grid())
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.grid(True, alpha=0.3, color=self._get_chart_grid())
-        
-        if data:
-            ax.plot(range(len(data)), data, color=self._get_cpu_color(), linewidth=2)
-        
-        canvas.draw_idle()
-
-    def update_gpu_chart(self, data):
-        if self.gpu_canvas is None:
-            return
-        fig, ax, canvas = self.gpu_canvas
-        ax.clear()
-        ax.set_ylim(0, 100)
-        ax.set_ylabel('GPU %', fontsize=8)
-        ax.set_xlabel('Seconds', fontsize=8)
-        ax.set_facecolor(self._get_chart_bg())
-        ax.tick_params(colors=self._get_chart_fg(), labelsize=7)
-        ax.spines['bottom'].set_color(self._get_chart_grid())
-        ax.spines['left'].set_color(self._get_chart_grid())
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.grid(True, alpha=0.3, color=self._get_chart_grid())
-        
-        if data:
-            ax.plot(range(len(data)), data, color=self._get_gpu_color(), linewidth=2)
-        
-        canvas.draw_idle()
-
-    def update_ram_chart(self, data):
-        if self.ram_canvas is None:
-            return
-        fig, ax, canvas = self.ram_canvas
-        ax.clear()
-        ax.set_ylim(0, 100)
-        ax.set_ylabel('RAM %', fontsize=8)
+    def _style_axes(self, ax, ylabel, ylim):
+        if ylim is not None:
+            ax.set_ylim(*ylim)
+        ax.set_ylabel(ylabel, fontsize=8)
         ax.set_xlabel('Seconds', fontsize=8)
         ax.set_facecolor(self._get_chart_bg())
         ax.tick_params(colors=self._get_chart_fg(), labelsize=7)
@@ -154,39 +213,94 @@ class ChartManager:
         ax.spines['top'].set_visible(False)
         ax.spines['right'].set_visible(False)
         ax.grid(True, alpha=0.3, color=self._get_chart_grid())
-        
-        if data:
-            ax.plot(range(len(data)), data, color=self._get_ram_color(), linewidth=2)
-        
-        canvas.draw_idle()
-
-    def update_network_chart(self, up_data, down_data):
-        if self.network_canvas is None:
+
+    def _update_chart(self, key, series_data, timestamps=None):
+        chart = self.charts.get(key)
+        if chart is None:
             return
-        fig, ax, canvas = self.network_canvas
+        series = self._series_xy(chart, series_data, timestamps)
+        if self.blit:
+            self._update_blit(chart, series)
+        else:
+            self._update_replot(chart, series)
+
+    def _series_xy(self, chart, series_data, timestamps):
+        if timestamps is None or self.time_range is None or not len(timestamps):
+            series = []
+            for data in series_data:
+                y = np.asarray(data)
+                x = self._x[:len(y)] if len(y) <= len(self._x) else np.arange(len(y), dtype=float)
+                series.append((x, y))
+            return series
+
+        unit = TIME_RANGES[self.time_range][2]
+        # One point per two pixels looks the same as full density and halves
+        # the rasterisation cost of noisy long-range series
+        max_points = max(int(chart.ax.bbox.width) // 2, 3)
+        series = []
+        for index, data in enumerate(series_data):
+            # Rollup tiers only change once per bucket, so reuse the last result
+            key = (len(data), timestamps[0], timestamps[-1], max_points)
+            cached = chart.downsampled.get(index)
+            if cached is None or cached[0] != key:
+                cached = (key, downsample_series(timestamps, data, unit, max_points))
+                chart.downsampled[index] = cached
+            series.append(cached[1])
+        return series
+
+    def _update_replot(self, chart, series):
+        ax = chart.ax
         ax.clear()
-        ax.set_ylabel('Speed (KB/s)', fontsize=8)
-        ax.set_xlabel('Seconds', fontsize=8)
-        ax.set_facecolor(self._get_chart_bg())
-        ax.tick_params(colors=self._get_chart_fg(), labelsize=7)
-        ax.spines['bottom'].set_color(self._get_chart_grid())
-        ax.spines['left'].set_color(self._get_chart_grid())
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.grid(True, alpha=0.3, color=self._get_chart_grid())
-        
-        if up_data:
-            ax.plot(range(len(up_data)), up_data, color=self._get_net_up_color(), linewidth=2, label='Upload')
-        if down_data:
-            ax.plot(range(len(down_data)), down_data, color=self._get_net_down_color(), linewidth=2, label='Download')
-        
-        if up_data or down_data:
+        self._style_axes(ax, chart.ylabel, chart.ylim)
+        self._apply_time_range(chart)
+
+        plotted = False
+        for (label, color), (x, y) in zip(chart.series, series):
+            if len(y):
+                ax.plot(x, y, color=color, linewidth=2, label=label)
+                plotted = True
+
+        if plotted and len(chart.series) > 1:
             ax.legend(loc='upper left', fontsize=7, framealpha=0.9)
-        
-        canvas.draw_idle()
 
-    def set_theme(self, theme):
-        self.theme = theme
+        chart.canvas.draw_idle()
+
+    def _update_blit(self, chart, series):
+        ax = chart.ax
+        needs_redraw = chart.background is None
+
+        if self.time_range is None:
+            count = max(len(y) for x, y in series)
+            if count - 1 > ax.get_xlim()[1]:
+                ax.set_xlim(0, count - 1)
+                needs_redraw = True
+
+        if chart.ylim is None:
+            peak = max((float(np.max(y)) for x, y in series if len(y)), default=0.0)
+            top = nice_ceiling(peak)
+            if top != ax.get_ylim()[1]:
+                ax.set_ylim(0, top)
+                needs_redraw = True
+
+        for line, (x, y) in zip(chart.artists, series):
+            line.set_data(x, y)
+
+        if needs_redraw:
+            # Full draw; _on_draw re-caches the background and draws the lines
+            chart.canvas.draw_idle()
+        else:
+            self._blit_artists(chart)
+
+    def _on_draw(self, chart):
+        chart.background = chart.canvas.copy_from_bbox(chart.ax.bbox)
+        self._blit_artists(chart)
+
+    def _blit_artists(self, chart):
+        canvas = chart.canvas
+        canvas.restore_region(chart.background)
+        for line in chart.artists:
+            chart.ax.draw_artist(line)
+        canvas.blit(chart.ax.bbox)
 
     def _get_chart_bg(self):
         from constants import THEMES
@@ -216,6 +330,14 @@ class ChartManager:
         from constants import CHART_COLORS
         return CHART_COLORS[self.theme]['net_down']
 
+    def _get_disk_read_color(self):
+        from constants import CHART_COLORS
+        return CHART_COLORS[self.theme]['disk_read']
+
+    def _get_disk_write_color(self):
+        from constants import CHART_COLORS
+        return CHART_COLORS[self.theme]['disk_write']
+
     def _get_gpu_color(self):
         from constants import CHART_COLORS
         return CHART_COLORS[self.theme]['gpu']
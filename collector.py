@@ -0,0 +1,276 @@
+# collector.py
+#
+# Receives samples from many agents (agent.py) on one asyncio loop, over TCP
+# and/or a Unix socket, and acts as the UI's Sampler for whichever host is
+# selected.
+#
+# Per batch the collector only unpacks the frames and appends them to the
+# host's bounded raw history; building snapshots (histories, rollups,
+# rolling stats) is done for the selected host alone. Selecting another host
+# replays its raw history into a fresh ReplayStats, so its charts start
+# populated.
+#
+# Usage: python collector.py [--port PORT] [--host HOST] [--unix PATH]
+#        (prints a one-line summary of connected hosts every few seconds)
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+import remote
+from replay import ReplayStats
+from sampler import Sampler
+from constants import MAX_HISTORY, REMOTE_HOST, REMOTE_CREDITS, REMOTE_HISTORY, REMOTE_STALE
+
+HostSummary = namedtuple('HostSummary', ['name', 'state', 'age', 'cpu_percent', 'ram_percent', 'net_up_kb',
+                                         'net_down_kb', 'disk_read_kb', 'disk_write_kb'])
+
+_FIELD = {field: index for index, field in enumerate(remote.FRAME_FIELDS)}
+STARTUP_TIMEOUT = 5.0
+
+
+class RemoteHost:
+    def __init__(self, name, history=REMOTE_HISTORY):
+        self.name = name
+        self.gpu_name = "No GPU"
+        self.interval = 1.0
+        self.frames = deque(maxlen=history)
+        self.connected = False
+        self.last_seen = None
+        self.samples = 0
+        self.batches = 0
+
+    def frame(self, values):
+        # A remote.FRAME tuple as the frame dict ReplayStats.apply() expects
+        frame = dict(zip(remote.FRAME_FIELDS, values))
+        frame.update(gpu_name=self.gpu_name, gpus=(), mounts=(), nic_rates=(), disk_rates=(), core_stats=None,
+                     top_cpu_processes=(), top_memory_processes=(), per_core=None)
+        return frame
+
+    def summary(self, now):
+        age = now - self.last_seen if self.last_seen is not None else None
+        if not self.connected:
+            state = 'offline'
+        elif age is None or age > max(REMOTE_STALE, 3 * self.interval):
+            state = 'stale'
+        else:
+            state = 'online'
+        latest = self.frames[-1] if self.frames else None
+        values = [latest[_FIELD[field]] if latest is not None else 0.0
+                  for field in ('cpu_percent', 'ram_percent', 'net_up_kb', 'net_down_kb', 'disk_read_kb',
+                                'disk_write_kb')]
+        return HostSummary(self.name, state, age, *values)
+
+
+class Collector(Sampler):
+    def __init__(self, port=None, host=REMOTE_HOST, unix_path=None, max_history=MAX_HISTORY,
+                 credits=REMOTE_CREDITS, clock=time.monotonic):
+        super().__init__(None, max_history=max_history)
+        self.port = port
+        self.host = host
+        self.unix_path = unix_path
+        self.credits = credits
+        self.hosts = {}
+        self.selected = None
+        self._clock = clock
+        self._hosts_lock = threading.Lock()
+        self._loop = None
+        self._servers = []
+        self._connections = {}
+        self._ready = threading.Event()
+        self._error = None
+
+    # Sampler interface: start/stop run the asyncio loop; latest() is inherited
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='Collector', daemon=True)
+        self._thread.start()
+        self._ready.wait(STARTUP_TIMEOUT)
+        if self._error is not None:
+            raise self._error
+
+    def stop(self, timeout=2.0):
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(lambda: asyncio.ensure_future(self._shutdown()))
+            self._thread.join(timeout)
+        self._thread = None
+        if self.unix_path and os.path.exists(self.unix_path):
+            os.unlink(self.unix_path)
+
+    def sample_once(self):
+        return self.latest()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._listen())
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _shutdown(self):
+        # Closing the sockets ends every handler at its next read
+        for server in self._servers:
+            server.close()
+        for writer in self._connections.values():
+            writer.close()
+        if self._connections:
+            await asyncio.wait(list(self._connections), timeout=1.0)
+        self._loop.stop()
+
+    async def _listen(self):
+        if self.port is not None:
+            server = await asyncio.start_server(self._handle, self.host, self.port)
+            # Port 0 picks a free port; report the real one
+            self.port = server.sockets[0].getsockname()[1]
+            self._servers.append(server)
+        if self.unix_path:
+            if os.path.exists(self.unix_path):
+                os.unlink(self.unix_path)
+            self._servers.append(await asyncio.start_unix_server(self._handle, self.unix_path))
+
+    # Host selection and overview, called from the Tk thread
+
+    def host_names(self):
+        with self._hosts_lock:
+            return sorted(self.hosts)
+
+    def overview(self):
+        with self._hosts_lock:
+            hosts = list(self.hosts.values())
+        now = self._clock()
+        return [host.summary(now) for host in sorted(hosts, key=lambda host: host.name)]
+
+    def select(self, name):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._select, name)
+        else:
+            self._select(name)
+
+    def _select(self, name):
+        host = self.hosts.get(name)
+        if host is None:
+            return
+        self.selected = name
+        self.stats_manager = ReplayStats(max_history=self.max_history, per_core_history=0)
+        for values in host.frames:
+            self.stats_manager.apply(host.frame(values))
+        if host.frames:
+            self._publish(self.stats_manager.snapshot(self.time_range))
+        else:
+            with self._lock:
+                self._snapshot = None
+
+    # Connections
+
+    async def _handle(self, reader, writer):
+        host = None
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            kind, length = remote.parse_header(await reader.readexactly(remote.HEADER.size))
+            if kind != remote.HELLO:
+                raise remote.ProtocolError(f"expected hello, got message type {kind}")
+            hello = json.loads(await reader.readexactly(length))
+            host = self._register(hello)
+            writer.write(remote.message(remote.CREDIT, remote.CREDIT_PAYLOAD.pack(self.credits)))
+            processed = 0
+            while True:
+                kind, length = remote.parse_header(await reader.readexactly(remote.HEADER.size))
+                payload = await reader.readexactly(length)
+                if kind != remote.BATCH:
+                    continue
+                self._receive(host, remote.unpack_batch(payload))
+                # Top credits up in bulk: one small write per half window
+                processed += 1
+                if processed * 2 >= self.credits:
+                    writer.write(remote.message(remote.CREDIT, remote.CREDIT_PAYLOAD.pack(processed)))
+                    processed = 0
+        except asyncio.IncompleteReadError:
+            pass
+        except (OSError, ValueError, remote.ProtocolError) as e:
+            print(f"Collector: {host.name if host else 'agent'} disconnected: {e}")
+        finally:
+            if host is not None:
+                host.connected = False
+            del self._connections[task]
+            writer.close()
+
+    def _register(self, hello):
+        name = str(hello.get('name') or 'unknown')
+        with self._hosts_lock:
+            host = self.hosts.get(name)
+            if host is None:
+                host = self.hosts[name] = RemoteHost(name)
+        host.gpu_name = str(hello.get('gpu_name') or "No GPU")
+        host.interval = float(hello.get('interval') or 1.0)
+        host.connected = True
+        if self.selected is None:
+            self._select(name)
+        return host
+
+    def _receive(self, host, frames):
+        host.frames.extend(frames)
+        host.samples += len(frames)
+        host.batches += 1
+        host.last_seen = self._clock()
+        if host.name == self.selected:
+            stats = self.stats_manager
+            for values in frames:
+                stats.apply(host.frame(values))
+            self._publish(stats.snapshot(self.time_range))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='System Monitor collector (no UI)')
+    parser.add_argument('--port', type=int, help='TCP port for agents')
+    parser.add_argument('--host', default=REMOTE_HOST, help='interface for --port')
+    parser.add_argument('--unix', metavar='PATH', help='Unix socket for agents')
+    parser.add_argument('--report-interval', type=float, default=5.0, help='seconds between summaries')
+    args = parser.parse_args(argv)
+    if args.port is None and not args.unix:
+        parser.error('give --port and/or --unix')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    collector = Collector(args.port, args.host, args.unix)
+    collector.start()
+    print(f"Collector listening on {f'{args.host}:{collector.port}' if args.port is not None else ''} "
+          f"{args.unix or ''}".strip(), flush=True)
+    last_samples = 0
+    last_cpu = time.process_time()
+    last_time = time.monotonic()
+    try:
+        while True:
+            time.sleep(args.report_interval)
+            hosts = collector.overview()
+            samples = sum(collector.hosts[summary.name].samples for summary in hosts)
+            now, cpu = time.monotonic(), time.process_time()
+            online = sum(1 for summary in hosts if summary.state == 'online')
+            print(f"{online}/{len(hosts)} hosts online, {(samples - last_samples) / (now - last_time):.0f} "
+                  f"samples/s, collector CPU {(cpu - last_cpu) / (now - last_time) * 100:.1f}%", flush=True)
+            last_samples, last_cpu, last_time = samples, cpu, now
+    except KeyboardInterrupt:
+        pass
+    finally:
+        collector.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,7 @@ THEMES = {
         'chart_fg': '#e0e0e0',
         'border': '#404040',
         'section_bg': '#252525',
+        'alert': '#ff6b6b',
     },
     'light': {
         'bg': '#f5f5f5',
@@ -22,6 +23,7 @@ THEMES = {
         'chart_fg': '#1a1a1a',
         'border': '#d0d0d0',
         'section_bg': '#fafafa',
+        'alert': '#c0392b',
     }
 }
 
@@ -32,6 +34,8 @@ CHART_COLORS = {
         'gpu': '#a78bfa',
         'net_up': '#45b7d1',
         'net_down': '#f7dc6f',
+        'disk_read': '#82e0aa',
+        'disk_write': '#f1948a',
     },
     'light': {
         'cpu': '#e74c3c',
@@ -39,8 +43,121 @@ CHART_COLORS = {
         'gpu': '#8b5cf6',
         'net_up': '#3498db',
         'net_down': '#f39c12',
+        'disk_read': '#27ae60',
+        'disk_write': '#c0392b',
     }
 }
 
 UPDATE_INTERVAL = 1000
+# Milliseconds of chart drawing per idle slot before the rest is left for the next one
+CHART_FRAME_BUDGET = 12
 MAX_HISTORY = 60
+# Samples of per-core CPU kept for the core heatmap
+PER_CORE_HISTORY = 3600
+# Rows in the process table
+TOP_PROCESSES = 8
+# Seconds between runs of each SystemStats collector
+COLLECTOR_INTERVALS = {
+    'cpu': 1,
+    'ram': 1,
+    'network': 1,
+    'disk_io': 1,
+    'gpu': 5,
+    'disk': 30,  # filesystem usage (statvfs per mount)
+    'processes': 3,
+    'cgroups': 2,  # child cgroup breakdown (--cgroup-children)
+}
+# Interface the optional /metrics endpoint binds to (--metrics-port)
+EXPORTER_HOST = '127.0.0.1'
+# GPU provider: 'auto' (NVML, then GPUtil), 'nvml', 'gputil', 'fake' or 'none'
+GPU_PROVIDER = 'auto'
+# Filesystems left out of disk usage (besides read-only mounts)
+SKIPPED_FILESYSTEMS = ('squashfs', 'overlay', 'iso9660', 'udf', 'tmpfs', 'devtmpfs', 'ramfs')
+# Mounts named in the disk label: the system one first, then the fullest
+DISK_LABEL_MOUNTS = 3
+# Linux: read CPU, RAM, network and disk counters from /proc directly (procfs.py)
+# rather than through psutil; other platforms always use psutil
+PROCFS_FAST_PATH = True
+# cgroup v2 accounting (cgroups.py): 'auto' uses the process's cgroup when it
+# has a CPU or memory limit (a container), 'on' always, 'off' never
+CGROUP_MODE = 'auto'
+# Child cgroups read per 'cgroups' tick, seconds between directory
+# listings, and rows in the UI's breakdown
+CGROUP_SCAN_BATCH = 8
+CGROUP_RESCAN = 30
+CGROUP_ROWS = 8
+# Longest a GPU read may block the sampler before the last reading is reused
+GPU_READ_TIMEOUT = 0.5
+# A collector whose average cost exceeds this fraction of its period has the
+# period doubled, up to COLLECTOR_MAX_BACKOFF times the configured one
+COLLECTOR_BUDGET = 0.05
+COLLECTOR_MAX_BACKOFF = 8
+
+# 'matplotlib' or 'canvas' (plain tk.Canvas, no matplotlib import)
+CHART_BACKEND = 'matplotlib'
+
+# Rollup tiers kept next to the raw history: name -> (bucket seconds, buckets kept)
+ROLLUP_TIERS = {
+    '10s': (10, 360),
+    '1m': (60, 1440),
+}
+
+# Chart time ranges: label -> (span seconds, rollup tier or None for raw
+# samples, x-axis unit in seconds, x-axis label)
+TIME_RANGES = {
+    '1 min': (60, None, 1, 'Seconds'),
+    '1 h': (3600, '10s', 60, 'Minutes'),
+    '24 h': (86400, '1m', 3600, 'Hours'),
+}
+DEFAULT_TIME_RANGE = '1 min'
+# With --debug, seconds between self-instrumentation reports on stderr
+DEBUG_LOG_INTERVAL = 10
+# Rolling min/max/mean/p95 windows shown next to each section's value
+ROLLING_WINDOWS = {
+    '1 min': 60,
+    '5 min': 300,
+    '1 h': 3600,
+}
+DEFAULT_ROLLING_WINDOW = '1 min'
+ROLLING_QUANTILE = 0.95
+# Relative error of the rolling p95 (log-bucket histogram)
+ROLLING_QUANTILE_ACCURACY = 0.02
+# Default seconds before an alert rule may fire again ("cooldown" per rule)
+ALERT_COOLDOWN = 300
+# Flight recorder (--flight): samples per second of the cheap counters,
+# seconds kept before a trigger and recorded after it
+FLIGHT_RATE = 20
+FLIGHT_PRE = 10
+FLIGHT_POST = 10
+# Triggers: CPU this many points, or network this many KB/s, above the
+# average of the last FLIGHT_BASELINE seconds
+FLIGHT_CPU_JUMP = 40
+FLIGHT_NET_JUMP = 10240
+FLIGHT_BASELINE = 5
+# Captures listed in the UI (files on disk are never deleted)
+FLIGHT_KEEP = 20
+# Frames per compressed block in --record files
+REPLAY_BLOCK_FRAMES = 60
+# Multi-host mode (agent.py -> main.py --collect / collector.py)
+REMOTE_HOST = '127.0.0.1'
+# Batches an agent may have in flight before the collector acknowledges them
+REMOTE_CREDITS = 8
+# Raw samples kept per remote host, replayed into the charts when it is selected
+REMOTE_HISTORY = 600
+# A host that has sent nothing for this many seconds is shown as stale
+REMOTE_STALE = 5
+# Visible rows of the host overview grid (it scrolls beyond that)
+HOST_ROWS = 6
+# Agents send what they have sampled at most this often (seconds)
+AGENT_BATCH_INTERVAL = 1.0
+# Samples an agent queues while the collector is slow or unreachable
+AGENT_QUEUE = 600
+AGENT_RECONNECT_MAX = 30
+# Shared-memory sample bus (--shared): segment name, samples kept, bytes per sample
+SHM_NAME = 'systemmonitor'
+SHM_SLOTS = 300
+SHM_SLOT_BYTES = 8192
+# Process command lines are cut to this many characters on the bus
+SHM_CMDLINE_CHARS = 160
+# A bus writer that has not published for this many seconds is taken over
+SHM_STALE = 5
@@ -0,0 +1,244 @@
+# exporter.py
+#
+# Optional local HTTP endpoint for scrapers:
+#
+#   /metrics   latest snapshot in Prometheus text format
+#   /history   the snapshot's history columns as JSON; with an on-disk
+#              store, /history?seconds=N answers from it instead (earlier
+#              sessions included, all STORE_COLUMNS)
+#
+# Scrapes never touch psutil. publish() (a Sampler listener, or a headless
+# listener) only swaps in the new snapshot; each payload is serialized at
+# most once per snapshot, on the first request that needs it, and every
+# other request gets the same bytes.
+
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from tsdb import RETENTION_SECONDS
+from constants import EXPORTER_HOST
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+JSON_CONTENT_TYPE = 'application/json'
+HISTORY_FIELDS = (
+    ('cpu', 'cpu_history'),
+    ('ram', 'ram_history'),
+    ('gpu', 'gpu_history'),
+    ('net_up', 'net_up_history'),
+    ('net_down', 'net_down_history'),
+    ('disk_read', 'disk_read_history'),
+    ('disk_write', 'disk_write_history'),
+)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    return repr(float(value))
+
+
+class _MetricsText:
+    def __init__(self):
+        self.lines = []
+
+    def gauge(self, name, help_text, samples):
+        # samples: iterable of (labels dict or None, value)
+        self.lines.append(f"# HELP systemmonitor_{name} {help_text}")
+        self.lines.append(f"# TYPE systemmonitor_{name} gauge")
+        for labels, value in samples:
+            if labels:
+                label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+                self.lines.append(f"systemmonitor_{name}{{{label_text}}} {_format_value(value)}")
+            else:
+                self.lines.append(f"systemmonitor_{name} {_format_value(value)}")
+
+    def encode(self):
+        return ('\n'.join(self.lines) + '\n').encode('utf-8')
+
+
+def render_metrics(snapshot):
+    text = _MetricsText()
+    text.gauge('sample_timestamp_seconds', 'Unix time of the sample.', [(None, snapshot.timestamp)])
+    text.gauge('cpu_percent', 'CPU utilisation, all cores.', [(None, snapshot.cpu_percent)])
+    if snapshot.per_core_history is not None and snapshot.per_core_history.shape[1]:
+        latest = snapshot.per_core_history[:, -1].tolist()
+        text.gauge('cpu_core_percent', 'CPU utilisation per core.',
+                   [({'core': core}, value) for core, value in enumerate(latest)])
+    text.gauge('memory_used_bytes', 'RAM in use.', [(None, snapshot.ram_used_gb * 1024 ** 3)])
+    text.gauge('memory_total_bytes', 'Total RAM.', [(None, snapshot.ram_total_gb * 1024 ** 3)])
+    text.gauge('memory_percent', 'RAM in use, percent.', [(None, snapshot.ram_percent)])
+
+    gpu_labels = [{'gpu': gpu.index, 'name': gpu.name} for gpu in snapshot.gpus]
+    text.gauge('gpu_load_percent', 'GPU utilisation per device.',
+               [(labels, gpu.load_percent) for labels, gpu in zip(gpu_labels, snapshot.gpus)])
+    text.gauge('gpu_memory_used_bytes', 'GPU memory in use per device.',
+               [(labels, gpu.memory_used_mb * 1024 ** 2) for labels, gpu in zip(gpu_labels, snapshot.gpus)])
+    text.gauge('gpu_temperature_celsius', 'GPU temperature per device.',
+               [(labels, gpu.temperature) for labels, gpu in zip(gpu_labels, snapshot.gpus)
+                if gpu.temperature is not None])
+
+    mount_labels = [{'mountpoint': mount.mountpoint, 'device': mount.device, 'fstype': mount.fstype}
+                    for mount in snapshot.mounts]
+    text.gauge('filesystem_size_bytes', 'Filesystem size.',
+               [(labels, mount.total_gb * 1024 ** 3) for labels, mount in zip(mount_labels, snapshot.mounts)])
+    text.gauge('filesystem_used_bytes', 'Filesystem space in use.',
+               [(labels, mount.used_gb * 1024 ** 3) for labels, mount in zip(mount_labels, snapshot.mounts)])
+    text.gauge('filesystem_used_percent', 'Filesystem space in use, percent.',
+               [(labels, mount.percent) for labels, mount in zip(mount_labels, snapshot.mounts)])
+
+    text.gauge('network_transmit_bytes_per_second', 'Upload rate per interface.',
+               [({'interface': nic.name}, nic.up_kb * 1024) for nic in snapshot.nic_rates])
+    text.gauge('network_receive_bytes_per_second', 'Download rate per interface.',
+               [({'interface': nic.name}, nic.down_kb * 1024) for nic in snapshot.nic_rates])
+    text.gauge('disk_read_bytes_per_second', 'Read throughput per disk.',
+               [({'disk': disk.name}, disk.read_kb * 1024) for disk in snapshot.disk_rates])
+    text.gauge('disk_write_bytes_per_second', 'Write throughput per disk.',
+               [({'disk': disk.name}, disk.write_kb * 1024) for disk in snapshot.disk_rates])
+    text.gauge('disk_reads_per_second', 'Read operations per disk.',
+               [({'disk': disk.name}, disk.read_iops) for disk in snapshot.disk_rates])
+    text.gauge('disk_writes_per_second', 'Write operations per disk.',
+               [({'disk': disk.name}, disk.write_iops) for disk in snapshot.disk_rates])
+
+    text.gauge('processes', 'Number of processes.', [(None, snapshot.process_count)])
+    return text.encode()
+
+
+def render_history(snapshot):
+    # Whatever history the snapshot carries: raw samples, or the rollup tier
+    # of the time range selected in the UI
+    history = {'timestamps': list(snapshot.history_timestamps)}
+    for key, field in HISTORY_FIELDS:
+        history[key] = list(getattr(snapshot, field))
+    return json.dumps(history, separators=(',', ':')).encode('utf-8')
+
+
+def render_store_history(reader, seconds, now=None):
+    # The last `seconds` of every stored column, read from disk
+    history = {}
+    for column in reader.columns():
+        timestamps, values = reader.latest(column, seconds, now)
+        history.setdefault('timestamps', list(timestamps))
+        history[column] = list(values)
+    return json.dumps(history, separators=(',', ':')).encode('utf-8')
+
+
+def parse_seconds(text):
+    # ?seconds= value -> seconds to read, capped at what a store keeps;
+    # ValueError unless a finite number above 0
+    seconds = float(text)
+    if not math.isfinite(seconds) or seconds <= 0:
+        raise ValueError(text)
+    return min(seconds, RETENTION_SECONDS)
+
+
+RENDERERS = {
+    '/metrics': (render_metrics, PROMETHEUS_CONTENT_TYPE),
+    '/history': (render_history, JSON_CONTENT_TYPE),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    exporter = None
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        if path not in RENDERERS:
+            self._send(404, b'not found\n', 'text/plain; charset=utf-8')
+            return
+        seconds = parse_qs(query).get('seconds')
+        if path == '/history' and seconds and self.exporter.store is not None:
+            try:
+                seconds = parse_seconds(seconds[0])
+            except ValueError:
+                self._send(400, b'seconds must be a number above 0\n', 'text/plain; charset=utf-8')
+                return
+            payload = self.exporter.store_history(seconds)
+            self._send(200, payload, JSON_CONTENT_TYPE)
+            return
+        payload = self.exporter.payload(path)
+        if payload is None:
+            self._send(503, b'no sample yet\n', 'text/plain; charset=utf-8')
+            return
+        self._send(200, payload, RENDERERS[path][1])
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter:
+    def __init__(self, port, host=EXPORTER_HOST, store=None):
+        self.host = host
+        self.port = port
+        # tsdb.TimeSeriesReader for /history?seconds=N; its segment cache is
+        # not thread-safe, so requests take turns
+        self.store = store
+        self._store_lock = threading.Lock()
+        self.builds = 0
+        self._snapshot = None
+        self._payloads = {}
+        # _lock guards the snapshot and cached payloads and is only held for
+        # a swap, so publish() never waits on a render; _render_lock lets
+        # one request serialize while concurrent ones wait for its bytes
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def publish(self, snapshot):
+        # Cheap enough for the sampler thread: no serialization here
+        with self._lock:
+            self._snapshot = snapshot
+            self._payloads = {}
+
+    def payload(self, path):
+        with self._lock:
+            payload = self._payloads.get(path)
+        if payload is not None:
+            return payload
+        with self._render_lock:
+            with self._lock:
+                snapshot = self._snapshot
+                payload = self._payloads.get(path)
+            if payload is not None or snapshot is None:
+                return payload
+            payload = RENDERERS[path][0](snapshot)
+            with self._lock:
+                self.builds += 1
+                # A newer sample may have been published meanwhile
+                if self._snapshot is snapshot:
+                    self._payloads[path] = payload
+            return payload
+
+    def store_history(self, seconds):
+        with self._store_lock:
+            return render_store_history(self.store, seconds)
+
+    def start(self):
+        handler = type('Handler', (_Handler,), {'exporter': self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        # Port 0 picks a free port; report the real one
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='MetricsExporter', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+        if self.store is not None:
+            self.store.close()
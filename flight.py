@@ -0,0 +1,287 @@
+# flight.py
+#
+# Flight recorder for spikes that 1 Hz sampling averages away. A thread
+# reads a few cheap system-wide counters (CPU times, total network and
+# disk bytes; straight from /proc via procfs.py on Linux) FLIGHT_RATE
+# times a second into a ring holding the last FLIGHT_PRE seconds. When CPU
+# jumps cpu_jump points above its recent average, or network traffic
+# net_jump KB/s above it, recording carries on for FLIGHT_POST seconds and
+# the whole window is saved as a JSON capture:
+#
+#   {"version": 1, "reason": "cpu +52 pts", "trigger_time": ..., "rate": 20,
+#    "columns": ["timestamp", "cpu_percent", ...], "samples": [[...], ...]}
+#
+# Captures are listed in the UI ("Spikes" menu) and open as zoomed charts;
+# `python flight.py view FILE` does the same outside the UI. Nothing per
+# process or per core is read at the high rate.
+#
+# Usage: python flight.py list DIR
+#        python flight.py view FILE
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+import psutil
+
+from io_rates import WholeDisks
+from procfs import open_procfs
+from sampler import advance_deadline
+from constants import (FLIGHT_RATE, FLIGHT_PRE, FLIGHT_POST, FLIGHT_CPU_JUMP, FLIGHT_NET_JUMP, FLIGHT_BASELINE,
+                       FLIGHT_KEEP)
+
+VERSION = 1
+COLUMNS = ('timestamp', 'cpu_percent', 'net_up_kb', 'net_down_kb', 'disk_read_kb', 'disk_write_kb')
+# --flight without a directory
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.systemmonitor', 'flight')
+Capture = namedtuple('Capture', ['path', 'reason', 'trigger_time', 'rate', 'samples'])
+_whole_disks = WholeDisks()
+
+
+def read_counters(proc=None):
+    # -> (timestamp, monotonic time, CPU busy time, CPU total time, bytes
+    # sent, bytes received, bytes read, bytes written); proc is an open
+    # procfs.ProcStats. Rates and the capture length run on the monotonic
+    # time, so an NTP step cannot bend them; the wall timestamp is only
+    # what the capture stores
+    if proc is not None:
+        busy, total = proc.cpu_times()[0]
+        nics = proc.net_io_counters().values()
+        return (time.time(), time.monotonic(), busy, total, sum(nic.bytes_sent for nic in nics), sum(nic.bytes_recv for nic in nics),
+                *_disk_bytes(proc.disk_io_counters()))
+    times = psutil.cpu_times()
+    # Guest time is already counted in user time (as psutil.cpu_percent does)
+    total = sum(times) - getattr(times, 'guest', 0.0) - getattr(times, 'guest_nice', 0.0)
+    idle = times.idle + getattr(times, 'iowait', 0.0)
+    # nowrap bookkeeping is not needed (step() drops negative deltas), and
+    # the per-disk form skips the sysfs checks of the summed one
+    net = psutil.net_io_counters(nowrap=False)
+    disks = psutil.disk_io_counters(perdisk=True, nowrap=False) or {}
+    return (time.time(), time.monotonic(), total - idle, total, net.bytes_sent, net.bytes_recv, *_disk_bytes(disks))
+
+
+def _disk_bytes(disks):
+    # (read, written) bytes over whole disks only
+    names = _whole_disks.filter(disks)
+    read_bytes = write_bytes = 0
+    for name, disk in disks.items():
+        if names is None or name in names:
+            read_bytes += disk.read_bytes
+            write_bytes += disk.write_bytes
+    return read_bytes, write_bytes
+
+
+class FlightRecorder:
+    def __init__(self, directory=None, rate=FLIGHT_RATE, pre_seconds=FLIGHT_PRE, post_seconds=FLIGHT_POST,
+                 cpu_jump=FLIGHT_CPU_JUMP, net_jump=FLIGHT_NET_JUMP, keep=FLIGHT_KEEP, read=None):
+        self.directory = directory
+        self.rate = rate
+        self.post_seconds = post_seconds
+        self.cpu_jump = cpu_jump
+        self.net_jump = net_jump
+        self.keep = keep
+        # read() -> a read_counters() tuple; by default read_counters() over
+        # this recorder's own /proc files (psutil where there are none)
+        self.read = read
+        self.proc = open_procfs() if read is None else None
+        self.ring = deque(maxlen=max(int(pre_seconds * rate), 1))
+        # Recent averages the triggers compare against
+        self.alpha = 1.0 / max(FLIGHT_BASELINE * rate, 1)
+        self.cpu_baseline = None
+        self.net_baseline = None
+        self.previous = None
+        self.recording = None
+        self.reason = None
+        self.trigger_time = None
+        self.end_time = None
+        # Finished captures, newest last; replaced, never mutated, so the
+        # Tk thread can read it while the recorder thread appends
+        self.captures = ()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.read is None and self.proc is None:
+            self.proc = open_procfs()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='FlightRecorder', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                return
+            self._thread = None
+        if self.proc is not None:
+            self.proc.close()
+            self.proc = None
+
+    def _run(self):
+        interval = 1.0 / self.rate
+        next_tick = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                print(f"Flight recorder error: {e}")
+            now = time.monotonic()
+            next_tick = advance_deadline(next_tick, interval, now)
+            self._stop_event.wait(next_tick - now)
+
+    def step(self):
+        reading = self.read() if self.read is not None else read_counters(self.proc)
+        previous, self.previous = self.previous, reading
+        if previous is None or reading[1] <= previous[1]:
+            return
+        seconds = reading[1] - previous[1]
+        total = reading[3] - previous[3]
+        cpu = min(max((reading[2] - previous[2]) / total * 100, 0.0), 100.0) if total > 0 else 0.0
+        # Counters can reset (interface down, driver reload): never negative
+        rates = [max(reading[index] - previous[index], 0) / 1024 / seconds for index in (4, 5, 6, 7)]
+        sample = (reading[0], cpu, *rates)
+
+        if self.recording is not None:
+            self.recording.append(sample)
+            if reading[1] >= self.end_time:
+                self._finish()
+        else:
+            self.ring.append(sample)
+            # Only with a full pre-trigger window (also after each capture)
+            if len(self.ring) == self.ring.maxlen:
+                reason = self._trigger(cpu, rates[0] + rates[1])
+                if reason:
+                    self.recording = list(self.ring)
+                    self.reason = reason
+                    self.trigger_time = sample[0]
+                    # Monotonic, like the deltas
+                    self.end_time = reading[1] + self.post_seconds
+        self._update_baseline(cpu, rates[0] + rates[1])
+
+    def _trigger(self, cpu, net):
+        if cpu - self.cpu_baseline >= self.cpu_jump:
+            return f"cpu +{cpu - self.cpu_baseline:.0f} pts"
+        if net - self.net_baseline >= self.net_jump:
+            return f"network +{net - self.net_baseline:.0f} KB/s"
+        return None
+
+    def _update_baseline(self, cpu, net):
+        if self.cpu_baseline is None:
+            self.cpu_baseline, self.net_baseline = cpu, net
+        else:
+            self.cpu_baseline += (cpu - self.cpu_baseline) * self.alpha
+            self.net_baseline += (net - self.net_baseline) * self.alpha
+
+    def _finish(self):
+        path = None
+        if self.directory:
+            stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.trigger_time))
+            path = os.path.join(self.directory, f"flight-{stamp}.json")
+            try:
+                save_capture(path, self.reason, self.trigger_time, self.rate, self.recording)
+            except OSError as e:
+                print(f"Flight recorder error: {e}")
+                path = None
+        capture = Capture(path, self.reason, self.trigger_time, self.rate, tuple(self.recording))
+        self.captures = (self.captures + (capture,))[-self.keep:]
+        print(f"Flight recorder: {self.reason}, {len(self.recording) / self.rate:.1f} s captured"
+              f"{f' to {path}' if path else ''}", file=sys.stderr, flush=True)
+        self.recording = None
+        self.ring.clear()
+
+
+def save_capture(path, reason, trigger_time, rate, samples):
+    with open(path, 'w', encoding='utf-8') as capture_file:
+        json.dump({'version': VERSION, 'reason': reason, 'trigger_time': trigger_time, 'rate': rate,
+                   'columns': COLUMNS, 'samples': [[round(value, 3) for value in sample] for sample in samples]},
+                  capture_file, separators=(',', ':'))
+
+
+def load_capture(path):
+    # -> Capture; raises ValueError on a file that is not one
+    try:
+        with open(path, encoding='utf-8') as capture_file:
+            data = json.load(capture_file)
+        columns = [data['columns'].index(column) for column in COLUMNS]
+        samples = tuple(tuple(sample[index] for index in columns) for sample in data['samples'])
+        return Capture(path, data['reason'], data['trigger_time'], data['rate'], samples)
+    except (OSError, ValueError, KeyError, TypeError, IndexError) as e:
+        raise ValueError(f"cannot read flight capture {path}: {e}") from None
+
+
+def show_capture(root, capture, theme='dark'):
+    # Zoomed CPU / network / disk charts of one capture in a new window;
+    # drawn on tk.Canvas so it works with either chart backend
+    import tkinter as tk
+    from canvas_charts import CanvasChartManager
+    from constants import THEMES
+
+    theme_colors = THEMES[theme]
+    window = tk.Toplevel(root, bg=theme_colors['bg'])
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(capture.trigger_time))
+    window.title(f"Spike {stamp}")
+    samples = capture.samples
+    before = sum(1 for sample in samples if sample[0] < capture.trigger_time) / capture.rate
+    tk.Label(window, text=f"{stamp}  {capture.reason}  |  {len(samples) / capture.rate:.1f} s at "
+                          f"{capture.rate:g} Hz, trigger after {before:.1f} s",
+             font=('Arial', 10, 'bold'), bg=theme_colors['bg'], fg=theme_colors['fg']).pack(anchor='w', padx=8,
+                                                                                          pady=6)
+    manager = CanvasChartManager(theme=theme, max_history=len(samples))
+    columns = list(zip(*samples)) or [()] * len(COLUMNS)
+    for create in (manager.create_cpu_chart, manager.create_network_chart, manager.create_disk_io_chart):
+        frame = tk.Frame(window, bg=theme_colors['bg'])
+        frame.pack(fill='both', expand=True, padx=8, pady=(0, 8))
+        create(frame, width=8, height=1.6)
+    manager.update_cpu_chart(columns[1])
+    manager.update_network_chart(columns[2], columns[3])
+    manager.update_disk_io_chart(columns[4], columns[5])
+    return window
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='System Monitor flight recorder captures')
+    parser.add_argument('command', choices=('list', 'view'))
+    parser.add_argument('path', help='directory (list) or capture file (view)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        try:
+            names = sorted(name for name in os.listdir(args.path) if name.endswith('.json'))
+        except OSError as e:
+            print(f"ERROR: {e}")
+            return 1
+        for name in names:
+            try:
+                capture = load_capture(os.path.join(args.path, name))
+            except ValueError as e:
+                print(f"{name}: {e}")
+                continue
+            peak = max((sample[1] for sample in capture.samples), default=0.0)
+            print(f"{name}: {capture.reason}, {len(capture.samples) / capture.rate:.1f} s, CPU peak {peak:.0f}%")
+        return 0
+
+    try:
+        capture = load_capture(args.path)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+    window = show_capture(root, capture)
+    window.protocol('WM_DELETE_WINDOW', root.destroy)
+    root.mainloop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
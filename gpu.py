@@ -0,0 +1,192 @@
+# gpu.py
+#
+# GPU providers. Each one resolves its devices once and returns a tuple of
+# GpuReading per read(); TimeBoundedProvider wraps any of them so a slow or
+# hung vendor tool can never block the sampler thread.
+
+import math
+import threading
+import time
+from collections import namedtuple
+
+from constants import GPU_READ_TIMEOUT
+
+GpuReading = namedtuple('GpuReading', ['index', 'name', 'load_percent', 'memory_used_mb', 'memory_total_mb',
+                                       'temperature'])
+
+
+class GpuProvider:
+    # No GPU: reads nothing
+    name = 'none'
+
+    def read(self):
+        return ()
+
+    def close(self):
+        pass
+
+
+class NvmlProvider(GpuProvider):
+    # NVIDIA Management Library via nvidia-ml-py (pynvml). Initialised once;
+    # device handles and names are resolved in the constructor and reused,
+    # so a read is a few in-process library calls per device.
+    name = 'nvml'
+
+    def __init__(self):
+        import pynvml
+        self._nvml = pynvml
+        pynvml.nvmlInit()
+        self._devices = []
+        for index in range(pynvml.nvmlDeviceGetCount()):
+            handle = pynvml.nvmlDeviceGetHandleByIndex(index)
+            name = pynvml.nvmlDeviceGetName(handle)
+            if isinstance(name, bytes):
+                name = name.decode('utf-8', 'replace')
+            self._devices.append((index, handle, name))
+        # Last error printed per (device, reading), so a failing one is
+        # reported once rather than every read
+        self._errors = {}
+
+    def read(self):
+        nvml = self._nvml
+        readings = []
+        for index, handle, name in self._devices:
+            try:
+                load = nvml.nvmlDeviceGetUtilizationRates(handle).gpu
+                memory = nvml.nvmlDeviceGetMemoryInfo(handle)
+                self._errors.pop((index, 'load'), None)
+            except nvml.NVMLError as e:
+                # e.g. GPU fell off the bus; report the others
+                self._report(index, name, 'load', e)
+                continue
+            try:
+                temperature = float(nvml.nvmlDeviceGetTemperature(handle, nvml.NVML_TEMPERATURE_GPU))
+                self._errors.pop((index, 'temperature'), None)
+            except nvml.NVMLError as e:
+                # Some boards (and vGPUs) have no sensor; keep their load
+                self._report(index, name, 'temperature', e)
+                temperature = None
+            readings.append(GpuReading(index, name, float(load), memory.used / (1024 ** 2),
+                                       memory.total / (1024 ** 2), temperature))
+        return tuple(readings)
+
+    def _report(self, index, name, reading, error):
+        message = str(error)
+        if self._errors.get((index, reading)) != message:
+            self._errors[(index, reading)] = message
+            print(f"GPU {index} ({name}) NVML {reading} error: {message}")
+
+    def close(self):
+        try:
+            self._nvml.nvmlShutdown()
+        except self._nvml.NVMLError as e:
+            print(f"NVML shutdown error: {e}")
+
+
+class GPUtilProvider(GpuProvider):
+    # Fallback when pynvml is missing. Every getGPUs() runs nvidia-smi in a
+    # subprocess, so it is slow; rely on the GPU cadence and the time budget.
+    name = 'gputil'
+
+    def __init__(self):
+        import GPUtil
+        self._gputil = GPUtil
+
+    def read(self):
+        return tuple(GpuReading(gpu.id, gpu.name, gpu.load * 100, gpu.memoryUsed, gpu.memoryTotal,
+                                gpu.temperature)
+                     for gpu in self._gputil.getGPUs())
+
+
+class FakeGpuProvider(GpuProvider):
+    # Synthetic devices for machines without a GPU. delay makes each read
+    # take that long, to exercise the time budget.
+    name = 'fake'
+
+    def __init__(self, count=2, delay=0.0, clock=time.monotonic):
+        self.count = count
+        self.delay = delay
+        self._clock = clock
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        if self.delay:
+            time.sleep(self.delay)
+        now = self._clock()
+        readings = []
+        for index in range(self.count):
+            load = 50 + 45 * math.sin(now / 10.0 + index)
+            readings.append(GpuReading(index, f"Fake GPU {index}", load, 8192 * load / 100, 8192.0,
+                                       40 + load / 2))
+        return tuple(readings)
+
+
+class TimeBoundedProvider(GpuProvider):
+    # Runs the wrapped provider's read() on a worker thread and waits at most
+    # `timeout` seconds for it. On timeout the previous readings are returned
+    # and no new read is started until the stuck one returns, so a hung
+    # driver costs one thread, not one per tick.
+    def __init__(self, provider, timeout=GPU_READ_TIMEOUT):
+        self.provider = provider
+        self.name = provider.name
+        self.timeout = timeout
+        self.timeouts = 0
+        self._readings = ()
+        self._last_error = None
+        self._done = None
+        self._worker = None
+
+    def read(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._done = threading.Event()
+            self._worker = threading.Thread(target=self._read, args=(self._done,), name='GpuRead', daemon=True)
+            self._worker.start()
+        if not self._done.wait(self.timeout):
+            self.timeouts += 1
+        return self._readings
+
+    def _read(self, done):
+        try:
+            self._readings = self.provider.read()
+            self._last_error = None
+        except Exception as e:
+            # Print each distinct failure once rather than every tick
+            message = f"{type(e).__name__}: {e}"
+            if message != self._last_error:
+                print(f"GPU read error ({self.provider.name}): {message}")
+                self._last_error = message
+        finally:
+            done.set()
+
+    def close(self):
+        if self._worker is not None:
+            self._worker.join(self.timeout)
+        self.provider.close()
+
+
+PROVIDERS = {
+    'nvml': NvmlProvider,
+    'gputil': GPUtilProvider,
+    'fake': FakeGpuProvider,
+    'none': GpuProvider,
+}
+
+
+def create_provider(name='auto', timeout=GPU_READ_TIMEOUT):
+    # 'auto' tries NVML, then GPUtil, then gives up quietly
+    if name == 'none':
+        return GpuProvider()
+    names = ('nvml', 'gputil') if name == 'auto' else (name,)
+    for candidate in names:
+        try:
+            provider = PROVIDERS[candidate]()
+        except ImportError as e:
+            if name != 'auto':
+                print(f"GPU provider '{candidate}' unavailable: {e}")
+            continue
+        except Exception as e:
+            print(f"GPU provider '{candidate}' unavailable: {e}")
+            continue
+        return TimeBoundedProvider(provider, timeout)
+    return GpuProvider()
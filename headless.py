@@ -0,0 +1,274 @@
+# headless.py
+#
+# Display-less collector: runs SystemStats on a drift-free schedule and
+# streams snapshots as JSON lines or CSV. Never imports tkinter or matplotlib.
+#
+# Usage: python headless.py [--format jsonl|csv] [--output FILE] [--interval S]
+
+import argparse
+import csv
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    print("ERROR: psutil is not installed. Install it with: pip install psutil", file=sys.stderr)
+    sys.exit(1)
+
+from system_stats import SystemStats
+from sampler import advance_deadline
+from tsdb import TimeSeriesStore, STORE_COLUMNS
+from gpu import PROVIDERS
+from instrumentation import Instrumentation
+from cgroups import open_cgroup
+from constants import (UPDATE_INTERVAL, GPU_PROVIDER, COLLECTOR_INTERVALS, MAX_HISTORY, EXPORTER_HOST, SHM_NAME,
+                       CGROUP_MODE)
+
+FIELDS = (
+    'timestamp',
+    'cpu_percent',
+    'ram_used_gb',
+    'ram_total_gb',
+    'ram_percent',
+    'gpu_percent',
+    'gpu_name',
+    'disk_percent',
+    'net_up_kb',
+    'net_down_kb',
+    'disk_read_kb',
+    'disk_write_kb',
+    'disk_read_iops',
+    'disk_write_iops',
+)
+
+
+class StreamWriter:
+    # Buffers records and writes them in batches; optionally rotates the
+    # output file once it grows past rotate_bytes (path -> path.1 -> path.2 ...)
+    def __init__(self, path=None, batch_size=10, flush_interval=10.0, rotate_bytes=0, rotate_keep=5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes if path else 0
+        self.rotate_keep = rotate_keep
+        self._records = []
+        self._last_flush = time.monotonic()
+        self._stream = None
+        self._open()
+
+    def _open(self):
+        if self.path is None:
+            self._stream = sys.stdout
+            self._owns_stream = False
+        else:
+            self._stream = open(self.path, 'a', newline='', encoding='utf-8')
+            self._owns_stream = True
+        if self._stream_is_empty():
+            self._write_header()
+
+    def _stream_is_empty(self):
+        if not self._owns_stream:
+            return True
+        return self._stream.tell() == 0
+
+    def _write_header(self):
+        pass
+
+    def write(self, snapshot):
+        self._records.append(tuple(getattr(snapshot, field) for field in FIELDS))
+        if len(self._records) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._records:
+            return
+        self._write_records(self._records)
+        self._records = []
+        self._stream.flush()
+        if self.rotate_bytes and self._stream.tell() >= self.rotate_bytes:
+            self._rotate()
+
+    def _write_records(self, records):
+        raise NotImplementedError
+
+    def _rotate(self):
+        self._stream.close()
+        for index in range(self.rotate_keep - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.rotate_keep > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def close(self):
+        self.flush()
+        if self._owns_stream:
+            self._stream.close()
+
+
+class JsonLinesWriter(StreamWriter):
+    def _write_records(self, records):
+        self._stream.write(''.join(json.dumps(dict(zip(FIELDS, record)), separators=(',', ':')) + '\n'
+                                   for record in records))
+
+
+class CsvWriter(StreamWriter):
+    def _write_header(self):
+        csv.writer(self._stream).writerow(FIELDS)
+
+    def _write_records(self, records):
+        csv.writer(self._stream).writerows(records)
+
+
+WRITERS = {
+    'jsonl': JsonLinesWriter,
+    'csv': CsvWriter,
+}
+
+
+def run(stats_manager, writer, interval, count=None, stop_event=None, listeners=()):
+    stop_event = stop_event or threading.Event()
+    samples = 0
+    next_tick = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            stats_manager.update()
+            snapshot = stats_manager.snapshot()
+            writer.write(snapshot)
+            # A failing store or exporter must not end the collector
+            for listener in listeners:
+                try:
+                    listener(snapshot)
+                except Exception as e:
+                    print(f"Listener error: {e}", file=sys.stderr)
+            samples += 1
+            if count is not None and samples >= count:
+                break
+
+            now = time.monotonic()
+            next_tick = advance_deadline(next_tick, interval, now)
+            stop_event.wait(next_tick - now)
+    finally:
+        writer.close()
+    return samples
+
+
+def collector_intervals(interval):
+    # Collectors on the default 1 s cadence follow --interval; slower ones
+    # never run more often than they would in the UI
+    base = UPDATE_INTERVAL / 1000
+    return {name: interval if period <= base else max(period, interval)
+            for name, period in COLLECTOR_INTERVALS.items()}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='System Monitor headless collector')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='jsonl')
+    parser.add_argument('--output', help='output file (default: stdout)')
+    parser.add_argument('--interval', type=float, default=UPDATE_INTERVAL / 1000, help='seconds between samples')
+    parser.add_argument('--count', type=int, help='stop after this many samples')
+    parser.add_argument('--batch-size', type=int, default=10, help='records per write')
+    parser.add_argument('--flush-interval', type=float, default=10.0, help='max seconds between writes')
+    parser.add_argument('--rotate-bytes', type=int, default=0, help='rotate the output file at this size')
+    parser.add_argument('--rotate-keep', type=int, default=5, help='rotated files to keep')
+    parser.add_argument('--store', metavar='DIR', help='also append samples to an on-disk time-series store')
+    parser.add_argument('--gpu', choices=('auto',) + tuple(PROVIDERS), default=GPU_PROVIDER, help='GPU provider')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='serve Prometheus /metrics and JSON /history on this port')
+    parser.add_argument('--metrics-host', default=EXPORTER_HOST, help='interface for --metrics-port')
+    parser.add_argument('--record', metavar='FILE', help='also record every sample to a replay file')
+    parser.add_argument('--alerts', metavar='FILE', help='JSON alert rules; alerts are logged to stderr')
+    parser.add_argument('--flight', nargs='?', const='', metavar='DIR',
+                        help='save high-rate captures around CPU/network spikes (default DIR ~/.systemmonitor/flight)')
+    parser.add_argument('--cgroup', choices=('auto', 'on', 'off'), default=CGROUP_MODE,
+                        help='CPU, RAM and disk I/O of this cgroup (v2) instead of the host; auto: when it is limited')
+    parser.add_argument('--cgroup-path', metavar='PATH',
+                        help='account this cgroup (relative to /sys/fs/cgroup) instead of our own')
+    parser.add_argument('--shared', nargs='?', const=SHM_NAME, metavar='NAME',
+                        help='read samples from (or publish them to) the shared-memory bus of main.py --shared')
+    parser.add_argument('--debug', action='store_true', help='log collector timings and own CPU/RSS to stderr')
+    args = parser.parse_args(argv)
+    if args.shared and (args.flight is not None or args.cgroup_path or args.cgroup != CGROUP_MODE):
+        parser.error('--flight, --cgroup and --cgroup-path sample this machine directly; they cannot be combined '
+                     'with --shared')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    writer = WRITERS[args.format](args.output, batch_size=args.batch_size, flush_interval=args.flush_interval,
+                                  rotate_bytes=args.rotate_bytes, rotate_keep=args.rotate_keep)
+    listeners = []
+    store = None
+    if args.store:
+        store = TimeSeriesStore(args.store, STORE_COLUMNS)
+        listeners.append(store.append_snapshot)
+    exporter = None
+    if args.metrics_port is not None:
+        from exporter import MetricsExporter
+        exporter = MetricsExporter(args.metrics_port, args.metrics_host,
+                                   store=store.reader() if store is not None else None)
+        listeners.append(exporter.publish)
+        exporter.start()
+
+    recorder = None
+    if args.record:
+        from replay import Recorder
+        recorder = Recorder(args.record)
+        listeners.append(recorder.record)
+    if args.alerts:
+        from alerts import create_alerts
+        try:
+            listeners.append(create_alerts(args.alerts).process)
+        except ValueError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+    instrumentation = Instrumentation(enabled=args.debug)
+    if args.debug:
+        listeners.append(lambda snapshot: instrumentation.log())
+
+    # /history needs a history window; plain streaming keeps a single row
+    if args.shared:
+        # The bus carries full samples for the windows sharing it
+        from shm_bus import SharedStats
+        stats_manager = SharedStats(args.shared, max_history=MAX_HISTORY if exporter is not None else 1,
+                                    per_core_history=0, interval=args.interval,
+                                    collector_intervals=collector_intervals(args.interval), gpu_provider=args.gpu,
+                                    instrumentation=instrumentation)
+    else:
+        flight = None
+        if args.flight is not None:
+            from flight import FlightRecorder, DEFAULT_DIRECTORY
+            flight = FlightRecorder(args.flight or DEFAULT_DIRECTORY)
+        stats_manager = SystemStats(max_history=MAX_HISTORY if exporter is not None else 1, per_core_history=0,
+                                    top_processes=0, collector_intervals=collector_intervals(args.interval),
+                                    gpu_provider=args.gpu, instrumentation=instrumentation, flight=flight,
+                                    cgroup=open_cgroup(args.cgroup, args.cgroup_path))
+    instrumentation.wrap(stats_manager, 'stats', ('update', 'snapshot'))
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    try:
+        run(stats_manager, writer, args.interval, count=args.count, stop_event=stop_event, listeners=listeners)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stats_manager.close()
+        if exporter is not None:
+            exporter.stop()
+        if store is not None:
+            store.close()
+        if recorder is not None:
+            recorder.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# history.py
+
+from array import array
+
+
+# Fixed-capacity, preallocated ring buffer with one float64 column per metric
+# plus a timestamp column. Appends are O(1) and store unboxed doubles.
+#
+# Every sample is written twice, at i and i + capacity, so the most recent
+# samples are always one contiguous slice and can be handed out as zero-copy
+# memoryviews in chronological order.
+class HistoryBuffer:
+    def __init__(self, capacity, columns):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.columns = ('timestamp',) + tuple(columns)
+        self._data = {name: array('d', bytes(8 * 2 * capacity)) for name in self.columns}
+        self._views = {name: memoryview(column) for name, column in self._data.items()}
+        self._index = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, **values):
+        index = self._index
+        mirror = index + self.capacity
+        for name, column in self._data.items():
+            value = timestamp if name == 'timestamp' else values.get(name, 0.0)
+            column[index] = value
+            column[mirror] = value
+        self._index = (index + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def _bounds(self):
+        end = self._index + self.capacity
+        return end - self._count, end
+
+    def view(self, name):
+        # Read-only and zero-copy; reflects later appends
+        start, end = self._bounds()
+        return self._views[name][start:end].toreadonly()
+
+    def frozen(self, name):
+        # Read-only view over a private copy, safe to hand to another thread
+        start, end = self._bounds()
+        return memoryview(self._data[name][start:end]).toreadonly()
+
+    def last(self, name, default=0.0):
+        if self._count == 0:
+            return default
+        return self._data[name][self._index + self.capacity - 1]
+
+    def resize(self, capacity):
+        resized = HistoryBuffer(capacity, self.columns[1:])
+        start, end = self._bounds()
+        start = max(start, end - capacity)
+        for i in range(start, end):
+            resized.append(self._data['timestamp'][i],
+                           **{name: self._data[name][i] for name in self.columns[1:]})
+        return resized
+
+    def clear(self):
+        self._index = 0
+        self._count = 0
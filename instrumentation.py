@@ -0,0 +1,140 @@
+# instrumentation.py
+#
+# Self-instrumentation: how much the monitor itself costs. Timers are plain
+# counters (count, total, max, last) keyed by name, fed by
+# CollectorScheduler for every collector and by wrappers around chart and
+# UI methods. Nothing is wrapped unless instrumentation is enabled, so a
+# normal run pays only an `if` per collector.
+
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+import psutil
+
+from constants import DEBUG_LOG_INTERVAL
+
+TimerStats = namedtuple('TimerStats', ['count', 'mean_ms', 'max_ms', 'last_ms'])
+
+CHART_METHODS = (
+    'update_cpu_chart',
+    'update_ram_chart',
+    'update_gpu_chart',
+    'update_network_chart',
+    'update_disk_io_chart',
+    'update_heatmap_chart',
+)
+# Process CPU% and RSS are re-read at most this often (seconds)
+PROCESS_SAMPLE_INTERVAL = 1.0
+
+
+class Instrumentation:
+    def __init__(self, enabled=False, clock=time.monotonic, log_interval=DEBUG_LOG_INTERVAL):
+        self.enabled = enabled
+        self._clock = clock
+        self.log_interval = log_interval
+        self._next_log = None
+        self._timers = {}
+        self._process = psutil.Process(os.getpid())
+        self._last_process_sample = None
+        self._last_cpu_time = None
+        self.cpu_percent = 0.0
+        self.rss_mb = 0.0
+        self.tk_lag_ms = 0.0
+        self.tk_lag_max_ms = 0.0
+
+    def record(self, name, seconds):
+        timer = self._timers.get(name)
+        if timer is None:
+            self._timers[name] = [1, seconds, seconds, seconds]
+            return
+        timer[0] += 1
+        timer[1] += seconds
+        if seconds > timer[2]:
+            timer[2] = seconds
+        timer[3] = seconds
+
+    def record_lag(self, seconds):
+        # How late a Tk after() callback ran compared with its deadline
+        self.tk_lag_ms = seconds * 1000
+        if self.tk_lag_ms > self.tk_lag_max_ms:
+            self.tk_lag_max_ms = self.tk_lag_ms
+
+    def wrap(self, target, prefix, names):
+        # Replaces target.<name> with a timed version, per instance
+        if not self.enabled:
+            return
+        for name in names:
+            method = getattr(target, name, None)
+            if method is not None:
+                setattr(target, name, self._timed(f"{prefix}.{name}", method))
+
+    def _timed(self, name, function):
+        record = self.record
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - start)
+        return timed
+
+    def sample_process(self):
+        # The monitor's own CPU (all threads, % of one core) and RSS
+        now = self._clock()
+        if self._last_process_sample is not None and now - self._last_process_sample < PROCESS_SAMPLE_INTERVAL:
+            return
+        cpu_time = time.process_time()
+        if self._last_process_sample is not None:
+            self.cpu_percent = (cpu_time - self._last_cpu_time) / (now - self._last_process_sample) * 100
+        self._last_process_sample = now
+        self._last_cpu_time = cpu_time
+        try:
+            self.rss_mb = self._process.memory_info().rss / (1024 ** 2)
+        except psutil.Error as e:
+            print(f"Instrumentation RSS error: {e}")
+
+    def timers(self):
+        return {name: TimerStats(count, total / count * 1000, worst * 1000, last * 1000)
+                for name, (count, total, worst, last) in sorted(self._timers.items())}
+
+    def report(self):
+        # Plain dict, ready for json.dumps
+        self.sample_process()
+        return {
+            'cpu_percent': self.cpu_percent,
+            'rss_mb': self.rss_mb,
+            'tk_lag_ms': self.tk_lag_ms,
+            'tk_lag_max_ms': self.tk_lag_max_ms,
+            'timers': {name: stats._asdict() for name, stats in self.timers().items()},
+        }
+
+    def log(self, stream=None):
+        # One JSON line per log_interval; call as often as convenient
+        if not self.enabled:
+            return
+        now = self._clock()
+        if self._next_log is None:
+            self._next_log = now + self.log_interval
+            return
+        if now < self._next_log:
+            return
+        self._next_log = now + self.log_interval
+        print(json.dumps(self.report(), separators=(',', ':')), file=stream or sys.stderr, flush=True)
+
+    def reset(self):
+        self._timers.clear()
+        self.tk_lag_max_ms = 0.0
+
+    def format_report(self):
+        self.sample_process()
+        lines = [f"self CPU {self.cpu_percent:.1f}% | RSS {self.rss_mb:.0f} MB | "
+                 f"Tk lag {self.tk_lag_ms:.1f} ms (max {self.tk_lag_max_ms:.1f})"]
+        for name, stats in self.timers().items():
+            lines.append(f"{name:<32} {stats.mean_ms:7.3f} ms avg {stats.max_ms:8.3f} max {stats.count:7d} calls")
+        return '\n'.join(lines)
+
@@ -0,0 +1,141 @@
+# io_rates.py
+#
+# Per-device rates from psutil's cumulative counters (per NIC, per disk) and
+# cached usage of every mounted filesystem.
+
+import os
+import time
+from collections import namedtuple
+
+import psutil
+
+from constants import SKIPPED_FILESYSTEMS
+
+# 32-bit counters still show up on some platforms and drivers
+COUNTER_WRAP = 1 << 32
+
+NicRate = namedtuple('NicRate', ['name', 'up_kb', 'down_kb'])
+DiskRate = namedtuple('DiskRate', ['name', 'read_kb', 'write_kb', 'read_iops', 'write_iops'])
+MountUsage = namedtuple('MountUsage', ['mountpoint', 'device', 'fstype', 'total_gb', 'used_gb', 'percent'])
+
+
+def counter_delta(previous, current):
+    # Counters only go up. A drop is either a 32-bit wrap or a reset (NIC
+    # re-created, driver reloaded, device re-attached); a reset returns None
+    # so the interval is skipped instead of producing a huge spike.
+    if current >= previous:
+        return current - previous
+    if previous < COUNTER_WRAP and previous - current > COUNTER_WRAP // 2:
+        return current + COUNTER_WRAP - previous
+    return None
+
+
+class CounterRates:
+    # Rates per device for the given counter fields, normalised by the
+    # monotonic time actually elapsed between reads rather than the nominal
+    # sampling interval. A device seen for the first time reports 0 until it
+    # has a baseline; devices that disappear are dropped.
+    def __init__(self, fields, clock=time.monotonic):
+        self.fields = tuple(fields)
+        self._clock = clock
+        self._previous = {}
+        self._last_time = None
+        self.rates = {}
+
+    def update(self, counters):
+        now = self._clock()
+        elapsed = now - self._last_time if self._last_time is not None else 0.0
+        self._last_time = now
+
+        previous = self._previous
+        current = {}
+        rates = {}
+        zero = (0.0,) * len(self.fields)
+        for name, sample in counters.items():
+            values = tuple(getattr(sample, field) for field in self.fields)
+            current[name] = values
+            last = previous.get(name)
+            if last is None or elapsed <= 0:
+                rates[name] = zero
+                continue
+            row = []
+            for before, after in zip(last, values):
+                delta = counter_delta(before, after)
+                row.append(delta / elapsed if delta is not None else 0.0)
+            rates[name] = tuple(row)
+
+        self._previous = current
+        self.rates = rates
+        return rates
+
+    def totals(self, names=None):
+        sums = [0.0] * len(self.fields)
+        for name, row in self.rates.items():
+            if names is not None and name not in names:
+                continue
+            for index, value in enumerate(row):
+                sums[index] += value
+        return sums
+
+
+class WholeDisks:
+    # perdisk=True on Linux lists partitions next to their disk (sda, sda1),
+    # so summing every entry counts I/O twice. /sys/block only has whole
+    # devices; elsewhere every entry is a disk.
+    def __init__(self, sys_block='/sys/block'):
+        self.sys_block = sys_block
+        self._known = set()
+        self._disks = None
+
+    def filter(self, names):
+        if not os.path.isdir(self.sys_block):
+            return None
+        if self._disks is None or not self._known.issuperset(names):
+            self._known = set(names)
+            self._disks = set(os.listdir(self.sys_block))
+        return self._disks
+
+
+class FilesystemUsage:
+    # disk_usage() is a statvfs per mount and can block on network
+    # filesystems; SystemStats only refreshes it on the slow 'disk' cadence
+    # (COLLECTOR_INTERVALS) and serves the cached mounts in between.
+    def __init__(self):
+        self.mounts = ()
+
+    def update(self):
+        mounts = []
+        try:
+            partitions = psutil.disk_partitions(all=False)
+        except OSError as e:
+            print(f"Disk partitions error: {e}")
+            partitions = []
+        for partition in partitions:
+            # Snap / container images and read-only media are always full
+            # and say nothing about free space
+            if partition.fstype in SKIPPED_FILESYSTEMS or 'ro' in partition.opts.split(','):
+                continue
+            try:
+                usage = psutil.disk_usage(partition.mountpoint)
+            except OSError:
+                # Empty card reader, unmounted network share, no permission...
+                continue
+            mounts.append(MountUsage(partition.mountpoint, partition.device, partition.fstype,
+                                     usage.total / (1024 ** 3), usage.used / (1024 ** 3), usage.percent))
+        if not mounts:
+            try:
+                usage = psutil.disk_usage(os.sep)
+                mounts.append(MountUsage(os.sep, '', '', usage.total / (1024 ** 3), usage.used / (1024 ** 3),
+                                         usage.percent))
+            except OSError as e:
+                print(f"Disk usage error: {e}")
+        self.mounts = tuple(mounts)
+        return self.mounts
+
+    def root(self):
+        # The system mount ('/' or the drive holding the OS), else the first
+        root = os.path.splitdrive(os.path.abspath(os.sep))[0] + os.sep
+        for mount in self.mounts:
+            if os.path.normcase(mount.mountpoint) == os.path.normcase(root):
+                return mount
+        return self.mounts[0] if self.mounts else None
@@ -1,8 +1,16 @@
 # main.py
 
+import os
+import time
+
+# For --startup-report: when the process was launched (a launcher such as
+# benchmarks/bench_startup.py may pass it in), else when this module started
+STARTED_AT = float(os.environ.get('SYSTEMMONITOR_LAUNCHED_AT', time.time()))
+
+import argparse
+import importlib.util
 import tkinter as tk
 import sys
-import os
 
 try:
     import psutil
@@ -10,21 +18,100 @@ except ImportError:
     print("ERROR: psutil is not installed. Install it with: pip install psutil")
     sys.exit(1)
 
-try:
-    import matplotlib
-    import matplotlib.pyplot as plt
-except ImportError:
-    print("ERROR: matplotlib is not installed. Install it with: pip install matplotlib")
-    sys.exit(1)
-
 from system_stats import SystemStats
 from ui import SystemMonitorUI
-from charts import ChartManager
-from constants import UPDATE_INTERVAL
+from sampler import Sampler, advance_deadline
+from tsdb import TimeSeriesStore, STORE_COLUMNS
+from gpu import PROVIDERS
+from instrumentation import Instrumentation, CHART_METHODS
+from cgroups import open_cgroup
+from constants import (UPDATE_INTERVAL, MAX_HISTORY, CHART_BACKEND, GPU_PROVIDER, EXPORTER_HOST, REMOTE_HOST,
+                       SHM_NAME, CGROUP_MODE)
+
+# Until the first sample arrives, poll for it this often (ms)
+FIRST_DATA_POLL = 50
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='System Monitor')
+    parser.add_argument('--charts', choices=('matplotlib', 'canvas'), default=CHART_BACKEND,
+                        help='chart backend; canvas draws on tk.Canvas without matplotlib')
+    parser.add_argument('--store', metavar='DIR', help='keep history in an on-disk time-series store')
+    parser.add_argument('--gpu', choices=('auto',) + tuple(PROVIDERS), default=GPU_PROVIDER,
+                        help='GPU provider; fake simulates two GPUs')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='serve Prometheus /metrics and JSON /history on this port')
+    parser.add_argument('--metrics-host', default=EXPORTER_HOST, help='interface for --metrics-port')
+    parser.add_argument('--startup-report', action='store_true',
+                        help='print time to first window / first data / all charts, then exit')
+    parser.add_argument('--alerts', metavar='FILE', help='JSON alert rules (see alerts.py)')
+    parser.add_argument('--debug', action='store_true',
+                        help='time collectors, charts and Tk callbacks; show them in a debug panel and on stderr')
+    parser.add_argument('--record', metavar='FILE', help='record every sample to a replay file')
+    parser.add_argument('--replay', metavar='FILE', help='play a recorded (or synthetic) trace instead of sampling')
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                        help='replay pace: 1 = as recorded, N = N times faster, 0 = as fast as possible')
+    parser.add_argument('--flight', nargs='?', const='', metavar='DIR',
+                        help='sample cheap counters at high rate and save the seconds around CPU/network spikes '
+                             '(default DIR ~/.systemmonitor/flight)')
+    parser.add_argument('--cgroup', choices=('auto', 'on', 'off'), default=CGROUP_MODE,
+                        help='CPU, RAM and disk I/O of this cgroup (v2) instead of the host; auto: when it is limited')
+    parser.add_argument('--cgroup-path', metavar='PATH',
+                        help='account this cgroup (relative to /sys/fs/cgroup, e.g. system.slice) instead')
+    parser.add_argument('--cgroup-children', action='store_true',
+                        help='CPU and memory of each child cgroup (e.g. per systemd service)')
+    parser.add_argument('--shared', nargs='?', const=SHM_NAME, metavar='NAME',
+                        help='share one sampler with other windows and headless.py through shared memory')
+    parser.add_argument('--collect', type=int, metavar='PORT',
+                        help='show hosts running agent.py (which connect to this TCP port) instead of this machine')
+    parser.add_argument('--collect-host', default=REMOTE_HOST, help='interface for --collect')
+    parser.add_argument('--collect-unix', metavar='PATH', help='also (or only) accept agents on this Unix socket')
+    parser.add_argument('--ui-interval', type=int, default=UPDATE_INTERVAL, metavar='MS',
+                        help='milliseconds between display refreshes (lower it to stress-test a fast replay)')
+    args = parser.parse_args(argv)
+    if args.flight is not None and (args.replay or args.shared or args.collect is not None or args.collect_unix):
+        parser.error('--flight samples this process\'s machine directly; it cannot be combined with '
+                     '--replay, --shared or --collect')
+    if (args.cgroup_path or args.cgroup_children) and (args.replay or args.shared or args.collect is not None
+                                                       or args.collect_unix):
+        parser.error('--cgroup-path and --cgroup-children cannot be combined with --replay, --shared or --collect')
+    if args.replay:
+        # Refuse a missing or foreign file here rather than open a window
+        # that never gets a sample
+        from replay import ReplayError, check_file
+        try:
+            check_file(args.replay)
+        except (OSError, ReplayError) as e:
+            parser.error(f"--replay: {e}")
+    return args
+
+
+def create_chart_manager(backend, theme='dark'):
+    if backend == 'canvas':
+        from canvas_charts import CanvasChartManager
+        return CanvasChartManager(theme=theme, max_history=MAX_HISTORY)
+
+    # Only check it is installed; charts.py imports it on the first chart
+    if importlib.util.find_spec('matplotlib') is None:
+        print("ERROR: matplotlib is not installed. Install it with: pip install matplotlib")
+        print("       or start with --charts canvas")
+        sys.exit(1)
+
+    from charts import ChartManager
+    return ChartManager(theme=theme, max_history=MAX_HISTORY)
+
+
+def _startup_age():
+    return time.time() - STARTED_AT
 
 
 def main():
+    args = parse_args()
     root = tk.Tk()
+    startup = {}
+    if args.startup_report:
+        root.bind('<Map>', lambda event: event.widget is root and startup.setdefault('first window', _startup_age()),
+                  add='+')
     
     # İkonu ayarla - PyInstaller için mutlak yol
     if getattr(sys, 'frozen', False):
@@ -38,21 +125,123 @@ def main():
         root.iconbitmap(icon_path)
     root.title('System Monitor')
     
-    stats_manager = SystemStats()
-    chart_manager = ChartManager(theme='dark')
-    ui = SystemMonitorUI(root, stats_manager, chart_manager)
+    instrumentation = Instrumentation(enabled=args.debug)
+    hosts = None
+    flight = None
+    if args.flight is not None:
+        from flight import FlightRecorder, DEFAULT_DIRECTORY
+        flight = FlightRecorder(args.flight or DEFAULT_DIRECTORY)
+    if args.collect is not None or args.collect_unix:
+        from collector import Collector
+        sampler = hosts = Collector(args.collect, args.collect_host, args.collect_unix, max_history=MAX_HISTORY)
+        stats_manager = None
+    elif args.replay:
+        from replay import ReplayStats, ReplaySampler, read_frames
+        stats_manager = ReplayStats(max_history=MAX_HISTORY)
+        instrumentation.wrap(stats_manager, 'stats', ('apply', 'snapshot'))
+        sampler = ReplaySampler(stats_manager, read_frames(args.replay), speed=args.replay_speed)
+    elif args.shared:
+        from shm_bus import SharedStats
+        stats_manager = SharedStats(args.shared, max_history=MAX_HISTORY, interval=UPDATE_INTERVAL / 1000,
+                                    gpu_provider=args.gpu, instrumentation=instrumentation)
+        instrumentation.wrap(stats_manager, 'stats', ('update', 'snapshot'))
+        sampler = Sampler(stats_manager, interval=UPDATE_INTERVAL / 1000, max_history=MAX_HISTORY)
+    else:
+        stats_manager = SystemStats(max_history=MAX_HISTORY, gpu_provider=args.gpu,
+                                    instrumentation=instrumentation, flight=flight,
+                                    cgroup=open_cgroup(args.cgroup, args.cgroup_path, args.cgroup_children))
+        instrumentation.wrap(stats_manager, 'stats', ('update', 'snapshot'))
+        sampler = Sampler(stats_manager, interval=UPDATE_INTERVAL / 1000, max_history=MAX_HISTORY)
+    recorder = None
+    if args.record:
+        from replay import Recorder
+        recorder = Recorder(args.record)
+        sampler.add_listener(recorder.record)
+    store = None
+    if args.store:
+        store = TimeSeriesStore(args.store, STORE_COLUMNS)
+        sampler.add_listener(store.append_snapshot)
+        if stats_manager is not None and not args.replay:
+            # Earlier sessions in the 1 h / 24 h ranges
+            reader = store.reader()
+            stats_manager.backfill(reader)
+            reader.close()
+    exporter = None
+    if args.metrics_port is not None:
+        from exporter import MetricsExporter
+        exporter = MetricsExporter(args.metrics_port, args.metrics_host,
+                                   store=store.reader() if store is not None else None)
+        sampler.add_listener(exporter.publish)
+        exporter.start()
+    alerts = None
+    if args.alerts:
+        from alerts import create_alerts
+        try:
+            alerts = create_alerts(args.alerts)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+        sampler.add_listener(alerts.process)
+    try:
+        sampler.start()
+    except OSError as e:
+        print(f"ERROR: cannot listen for agents: {e}")
+        sys.exit(1)
+    chart_manager = create_chart_manager(args.charts)
+    instrumentation.wrap(chart_manager, 'chart', CHART_METHODS)
+    ui = SystemMonitorUI(root, sampler, chart_manager, instrumentation, alerts, hosts, flight,
+                         cgroups=args.cgroup_children)
+    instrumentation.wrap(ui, 'ui', ('update_display', 'flush_charts'))
+    
+    interval = args.ui_interval / 1000
+    next_tick = [None]
     
     def update_loop():
+        if instrumentation.enabled and next_tick[0] is not None:
+            instrumentation.record_lag(max(time.monotonic() - next_tick[0], 0.0))
         try:
             ui.update_display()
         except Exception as e:
             print(f"Update error: {e}")
+        instrumentation.log()
         
-        root.after(UPDATE_INTERVAL, update_loop)
+        if args.startup_report:
+            _report_startup(root, ui, startup)
+        
+        now = time.monotonic()
+        if ui._last_snapshot is None:
+            # No sample yet: check again soon instead of waiting a full tick
+            root.after(FIRST_DATA_POLL, update_loop)
+            return
+        # Reschedule against the monotonic clock, not "work time + interval"
+        next_tick[0] = advance_deadline(next_tick[0] if next_tick[0] is not None else now, interval, now)
+        root.after(max(int((next_tick[0] - now) * 1000), 1), update_loop)
     
-    root.after(UPDATE_INTERVAL, update_loop)
+    root.after_idle(update_loop)
     
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        sampler.stop()
+        if stats_manager is not None:
+            stats_manager.close()
+        if exporter is not None:
+            exporter.stop()
+        if store is not None:
+            store.close()
+        if recorder is not None:
+            recorder.close()
+
+
+def _report_startup(root, ui, startup):
+    if ui._last_snapshot is not None:
+        startup.setdefault('first data', _startup_age())
+    if ui.charts_ready:
+        startup.setdefault('charts ready', _startup_age())
+    if len(startup) == 3:
+        for name, seconds in sorted(startup.items(), key=lambda item: item[1]):
+            print(f"{name}: {seconds * 1000:.0f} ms")
+        root.after(0, root.destroy)
 
 
 if __name__ == "__main__":
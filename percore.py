@@ -0,0 +1,63 @@
+# percore.py
+#
+# Per-core CPU history as a cores x time matrix. Needs NumPy; SystemStats
+# disables per-core sampling when it is not installed.
+
+from collections import namedtuple
+
+import numpy as np
+
+BUSY_CORE_PERCENT = 80
+
+CoreStats = namedtuple('CoreStats', ['cores', 'max_core', 'max_percent', 'mean_percent', 'imbalance',
+                                     'busy_cores'])
+
+
+# Same doubled-write ring layout as HistoryBuffer, but one uint8 row per core
+# (whole percent is plenty for a heatmap and keeps 128 cores x 3600 samples
+# under 1 MB). Each row of view() is contiguous.
+class PerCoreHistory:
+    def __init__(self, cores, capacity):
+        self.cores = cores
+        self.capacity = capacity
+        self._data = np.zeros((cores, 2 * capacity), dtype=np.uint8)
+        self._index = 0
+        self._count = 0
+        self.latest = np.zeros(cores, dtype=float)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, percents):
+        column = np.asarray(percents, dtype=float)
+        self.latest = column
+        quantised = np.rint(column).astype(np.uint8)
+        self._data[:, self._index] = quantised
+        self._data[:, self._index + self.capacity] = quantised
+        self._index = (self._index + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def view(self):
+        end = self._index + self.capacity
+        view = self._data[:, end - self._count:end]
+        view.flags.writeable = False
+        return view
+
+    def frozen(self):
+        copy = self.view().copy()
+        copy.flags.writeable = False
+        return copy
+
+    def stats(self):
+        latest = self.latest
+        max_core = int(latest.argmax())
+        mean = float(latest.mean())
+        return CoreStats(
+            cores=self.cores,
+            max_core=max_core,
+            max_percent=float(latest[max_core]),
+            mean_percent=mean,
+            imbalance=float(latest[max_core]) - mean,
+            busy_cores=int(np.count_nonzero(latest >= BUSY_CORE_PERCENT)),
+        )
@@ -0,0 +1,97 @@
+# processes.py
+
+import heapq
+import time
+from collections import namedtuple
+from operator import itemgetter
+
+import psutil
+
+# Re-read on every tick; everything else is cached per process
+DYNAMIC_ATTRS = ['pid', 'create_time', 'cpu_times', 'memory_info']
+
+ProcessInfo = namedtuple('ProcessInfo', ['pid', 'name', 'username', 'cmdline', 'cpu_percent', 'memory_mb'])
+
+
+class ProcessMonitor:
+    # Samples all processes with a fixed attrs list (process_iter reads them
+    # inside oneshot()), computes CPU% from cpu_times deltas and keeps the
+    # top N by CPU and by memory with a heap instead of a full sort.
+    #
+    # Static details (name, cmdline, username) are read once per process,
+    # keyed by (pid, create_time) so a recycled PID is noticed.
+    def __init__(self, top_n=10, process_iter=None, clock=time.monotonic):
+        self.top_n = top_n
+        self._process_iter = process_iter or psutil.process_iter
+        self._clock = clock
+        self._static = {}
+        self._cpu_totals = {}
+        self._last_time = None
+        self.process_count = 0
+        self.top_cpu = []
+        self.top_memory = []
+
+    def update(self):
+        now = self._clock()
+        elapsed = now - self._last_time if self._last_time is not None else 0.0
+        self._last_time = now
+
+        static_cache = self._static
+        previous_totals = self._cpu_totals
+        totals = {}
+        rows = []
+        for process in self._process_iter(attrs=DYNAMIC_ATTRS, ad_value=None):
+            info = process.info
+            pid = info['pid']
+            create_time = info['create_time']
+            cpu_times = info['cpu_times']
+            if cpu_times is None:
+                continue
+
+            static = static_cache.get(pid)
+            if static is None or static[0] != create_time:
+                static = self._read_static(process, create_time)
+                if static is None:
+                    continue
+                static_cache[pid] = static
+
+            total = cpu_times.user + cpu_times.system
+            totals[pid] = (create_time, total)
+            previous = previous_totals.get(pid)
+            if previous is not None and previous[0] == create_time and elapsed > 0:
+                cpu_percent = (total - previous[1]) / elapsed * 100
+            else:
+                cpu_percent = 0.0
+
+            memory_info = info['memory_info']
+            rows.append((cpu_percent, memory_info.rss if memory_info is not None else 0, pid))
+
+        self._cpu_totals = totals
+        if len(static_cache) > len(totals):
+            for pid in [pid for pid in static_cache if pid not in totals]:
+                del static_cache[pid]
+
+        self.process_count = len(rows)
+        self.top_cpu = [self._make_info(row) for row in heapq.nlargest(self.top_n, rows, key=itemgetter(0))]
+        self.top_memory = [self._make_info(row) for row in heapq.nlargest(self.top_n, rows, key=itemgetter(1))]
+
+    def _read_static(self, process, create_time):
+        try:
+            with process.oneshot():
+                name = process.name()
+                try:
+                    cmdline = ' '.join(process.cmdline())
+                except (psutil.AccessDenied, psutil.ZombieProcess):
+                    cmdline = ''
+                try:
+                    username = process.username()
+                except (psutil.AccessDenied, KeyError):
+                    username = ''
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+        return create_time, name, username, cmdline
+
+    def _make_info(self, row):
+        cpu_percent, rss, pid = row
+        _, name, username, cmdline = self._static[pid]
+        return ProcessInfo(pid, name, username, cmdline, cpu_percent, rss / (1024 ** 2))
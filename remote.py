@@ -0,0 +1,77 @@
+# remote.py
+#
+# Wire format between agent.py and collector.py. Every message is
+#
+#   header   <2sBI  magic b'SM', type, payload bytes
+#
+# HELLO   agent -> collector   JSON {"name", "gpu_name", "interval", "version"}
+# BATCH   agent -> collector   one or more FRAME structs back to back
+# CREDIT  collector -> agent   <I number of further batches the agent may send
+#
+# Backpressure is credit based: the collector grants REMOTE_CREDITS batches
+# up front and tops them up as it processes them. An agent without credit
+# (or whose socket is not draining) keeps sampling into a bounded queue,
+# dropping the oldest samples, and sends the backlog as one batch when it
+# may.
+
+import json
+import struct
+
+MAGIC = b'SM'
+VERSION = 1
+HEADER = struct.Struct('<2sBI')
+HELLO = 1
+BATCH = 2
+CREDIT = 3
+CREDIT_PAYLOAD = struct.Struct('<I')
+# A larger message is a protocol error, not a big batch
+MAX_PAYLOAD = 1 << 20
+
+# Snapshot fields carried per sample, in FRAME order
+FRAME_FIELDS = (
+    'timestamp',
+    'cpu_percent',
+    'ram_used_gb',
+    'ram_total_gb',
+    'ram_percent',
+    'gpu_percent',
+    'disk_percent',
+    'net_up_kb',
+    'net_down_kb',
+    'disk_read_kb',
+    'disk_write_kb',
+    'disk_read_iops',
+    'disk_write_iops',
+    'process_count',
+)
+FRAME = struct.Struct('<d12fI')
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def message(kind, payload=b''):
+    return HEADER.pack(MAGIC, kind, len(payload)) + payload
+
+
+def hello(name, gpu_name, interval):
+    return message(HELLO, json.dumps({'name': name, 'gpu_name': gpu_name, 'interval': interval,
+                                      'version': VERSION}).encode('utf-8'))
+
+
+def parse_header(data):
+    magic, kind, length = HEADER.unpack(data)
+    if magic != MAGIC or length > MAX_PAYLOAD:
+        raise ProtocolError(f"bad message header {data!r}")
+    return kind, length
+
+
+def pack_snapshot(snapshot):
+    return FRAME.pack(*(getattr(snapshot, field) for field in FRAME_FIELDS))
+
+
+def unpack_batch(payload):
+    if len(payload) % FRAME.size:
+        raise ProtocolError(f"batch of {len(payload)} bytes is not whole frames")
+    return list(FRAME.iter_unpack(payload))
@@ -0,0 +1,400 @@
+# replay.py
+#
+# Record a run's snapshot stream to a compact binary file and play it back
+# through the normal UI and chart code, for reproducing rendering problems
+# and for load tests.
+#
+# File layout:
+#
+#   header        <4sHH  magic, version, length of the field list
+#                 JSON list of the recorded fields (RECORDED_FIELDS)
+#   block         <4sIII magic, frames, payload bytes, crc32 of payload
+#   payload       zlib-compressed JSON list of frames
+#
+# A frame holds one sample: the snapshot's current values, small
+# structures (GPUs, mounts, per-NIC/disk rates, top processes) and the
+# per-core row. Histories are not stored; ReplayStats rebuilds them by
+# appending frames the way SystemStats appends samples, so rollups, rolling
+# statistics and the per-core heatmap come out as they were recorded.
+#
+# Usage: python replay.py info FILE
+#        python replay.py synthesize FILE [--seconds S] [--rate HZ] [--cores N]
+
+import argparse
+import json
+import math
+import random
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from sampler import Sampler
+from system_stats import SystemStats
+from gpu import GpuReading
+from io_rates import MountUsage, NicRate, DiskRate
+from processes import ProcessInfo
+from constants import PER_CORE_HISTORY, REPLAY_BLOCK_FRAMES
+
+try:
+    from percore import PerCoreHistory, CoreStats
+except ImportError:
+    # NumPy is not installed: no heatmap; core stats stay plain tuples
+    PerCoreHistory = None
+
+    def CoreStats(*values):
+        return values
+
+FILE_MAGIC = b'SMRP'
+BLOCK_MAGIC = b'SMRB'
+VERSION = 1
+FILE_HEADER = struct.Struct('<4sHH')
+BLOCK_HEADER = struct.Struct('<4sIII')
+
+RECORDED_FIELDS = (
+    'timestamp',
+    'cpu_percent',
+    'ram_used_gb',
+    'ram_total_gb',
+    'ram_percent',
+    'gpu_percent',
+    'gpu_name',
+    'gpus',
+    'disk_percent',
+    'net_up_kb',
+    'net_down_kb',
+    'disk_read_kb',
+    'disk_write_kb',
+    'disk_read_iops',
+    'disk_write_iops',
+    'mounts',
+    'nic_rates',
+    'disk_rates',
+    'core_stats',
+    'process_count',
+    'top_cpu_processes',
+    'top_memory_processes',
+    'per_core',
+)
+# Recorded as lists, rebuilt as these namedtuples
+SEQUENCE_TYPES = {
+    'gpus': GpuReading,
+    'mounts': MountUsage,
+    'nic_rates': NicRate,
+    'disk_rates': DiskRate,
+    'top_cpu_processes': ProcessInfo,
+    'top_memory_processes': ProcessInfo,
+}
+
+
+class ReplayError(Exception):
+    pass
+
+
+def encode_frame(snapshot):
+    # Snapshot -> list of RECORDED_FIELDS values (JSON-ready)
+    values = []
+    for field in RECORDED_FIELDS:
+        if field == 'per_core':
+            history = snapshot.per_core_history
+            values.append(history[:, -1].tolist() if history is not None and history.shape[1] else None)
+        else:
+            values.append(getattr(snapshot, field))
+    return values
+
+
+class Recorder:
+    # Sampler/headless listener; frames are compressed and written a block
+    # at a time, so a crash loses at most the unwritten block
+    def __init__(self, path, block_frames=REPLAY_BLOCK_FRAMES):
+        self.path = path
+        self.block_frames = block_frames
+        self.frames = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._file = open(path, 'wb')
+        fields = json.dumps(RECORDED_FIELDS).encode('utf-8')
+        self._file.write(FILE_HEADER.pack(FILE_MAGIC, VERSION, len(fields)) + fields)
+
+    def record(self, snapshot):
+        self.record_frame(encode_frame(snapshot))
+
+    def record_frame(self, frame):
+        with self._lock:
+            self._pending.append(frame)
+            self.frames += 1
+            if len(self._pending) >= self.block_frames:
+                self._write_block()
+
+    def _write_block(self):
+        if not self._pending or self._file is None:
+            return
+        payload = zlib.compress(json.dumps(self._pending, separators=(',', ':')).encode('utf-8'))
+        self._file.write(BLOCK_HEADER.pack(BLOCK_MAGIC, len(self._pending), len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        self._pending = []
+
+    def close(self):
+        with self._lock:
+            self._write_block()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _read_header(replay_file, path):
+    # -> the recorded field names; ReplayError for anything else
+    header = replay_file.read(FILE_HEADER.size)
+    if len(header) < FILE_HEADER.size:
+        raise ReplayError(f"{path}: not a replay file")
+    magic, version, fields_length = FILE_HEADER.unpack(header)
+    if magic != FILE_MAGIC or version != VERSION:
+        raise ReplayError(f"{path}: not a version {VERSION} replay file")
+    try:
+        return json.loads(replay_file.read(fields_length))
+    except ValueError:
+        raise ReplayError(f"{path}: damaged header")
+
+
+def check_file(path):
+    # Raises OSError or ReplayError unless path opens as a replay file, so
+    # callers can refuse it before starting playback
+    with open(path, 'rb') as replay_file:
+        _read_header(replay_file, path)
+
+
+def read_frames(path):
+    # Yields frames as dicts keyed by RECORDED_FIELDS; stops quietly at a
+    # torn final block (a recorder that did not get to close)
+    with open(path, 'rb') as replay_file:
+        fields = _read_header(replay_file, path)
+        while True:
+            header = replay_file.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            magic, count, length, crc = BLOCK_HEADER.unpack(header)
+            payload = replay_file.read(length)
+            if magic != BLOCK_MAGIC or len(payload) < length or zlib.crc32(payload) != crc:
+                print(f"Replay warning: {path}: stopping at a damaged block")
+                return
+            for values in json.loads(zlib.decompress(payload)):
+                yield decode_frame(values, fields)
+
+
+def decode_frame(values, fields=RECORDED_FIELDS):
+    # List of values (as JSON gives them back) -> frame dict for ReplayStats.apply()
+    frame = dict(zip(fields, values))
+    for field, kind in SEQUENCE_TYPES.items():
+        if field in frame:
+            frame[field] = tuple(kind(*item) for item in frame[field])
+    if frame.get('core_stats') is not None:
+        frame['core_stats'] = CoreStats(*frame['core_stats'])
+    return frame
+
+
+class _ReplayProcesses:
+    def __init__(self):
+        self.process_count = 0
+        self.top_cpu = ()
+        self.top_memory = ()
+
+
+# SystemStats whose samples come from recorded frames instead of psutil;
+# snapshot() and the getters are inherited
+class ReplayStats(SystemStats):
+    def __init__(self, max_history=60, per_core_history=PER_CORE_HISTORY):
+        super().__init__(max_history=max_history, per_core_history=per_core_history, top_processes=0,
+                         sources=False)
+        self.processes = _ReplayProcesses()
+        self.frame = None
+
+    def apply(self, frame):
+        self.frame = frame
+        self.cpu_percent = frame['cpu_percent']
+        self.ram_info = (frame['ram_used_gb'], frame['ram_total_gb'], frame['ram_percent'])
+        self.gpu_info = (frame['gpu_percent'], frame['gpu_name'])
+        self.gpus = frame['gpus']
+        self.net_speeds = (frame['net_up_kb'], frame['net_down_kb'])
+        self.disk_io = (frame['disk_read_kb'], frame['disk_write_kb'], frame['disk_read_iops'],
+                        frame['disk_write_iops'])
+        self.processes.process_count = frame['process_count']
+        self.processes.top_cpu = frame['top_cpu_processes']
+        self.processes.top_memory = frame['top_memory_processes']
+        row = frame.get('per_core')
+        if row is not None and self.per_core_history:
+            if self.per_core is None or self.per_core.cores != len(row):
+                self.per_core = PerCoreHistory(len(row), self.per_core_history)
+            self.per_core.append(row)
+        # The recorded wall-clock time drives every window, so a trace
+        # replays the same at any speed
+        self._record_sample(frame['timestamp'], frame['timestamp'])
+
+    def update(self, max_history=None):
+        pass
+
+    def get_disk_info(self, mountpoint=None):
+        if self.frame is None:
+            return 0.0
+        if mountpoint is None:
+            return self.frame['disk_percent']
+        mount = next((mount for mount in self.frame['mounts'] if mount.mountpoint == mountpoint), None)
+        return mount.percent if mount is not None else 0.0
+
+    def get_mounts(self):
+        return self.frame['mounts'] if self.frame is not None else ()
+
+    def get_nic_rates(self):
+        return self.frame['nic_rates'] if self.frame is not None else ()
+
+    def get_disk_rates(self):
+        return self.frame['disk_rates'] if self.frame is not None else ()
+
+    def snapshot(self, time_range=None):
+        snapshot = super().snapshot(time_range)
+        if self.frame is not None and self.frame.get('core_stats') is not None:
+            # Recorded from the unrounded per-core values
+            snapshot = snapshot._replace(core_stats=self.frame['core_stats'])
+        return snapshot
+
+
+# Drop-in for Sampler that plays frames back: at the recorded pace divided
+# by speed, or as fast as possible with speed=0
+class ReplaySampler(Sampler):
+    def __init__(self, stats_manager, frames, speed=1.0):
+        super().__init__(stats_manager, max_history=stats_manager.history.capacity)
+        self.speed = speed
+        self.frames_played = 0
+        self.finished = threading.Event()
+        self._frames = iter(frames)
+
+    def sample_once(self):
+        # Next frame, immediately; None at the end of the trace
+        try:
+            frame = next(self._frames, None)
+        except Exception as e:
+            print(f"Replay error: {e}")
+            frame = None
+        if frame is None:
+            self.finished.set()
+            return None
+        return self._play(frame)
+
+    def _play(self, frame):
+        self.stats_manager.apply(frame)
+        self.frames_played += 1
+        return self._publish(self.stats_manager.snapshot(self.time_range))
+
+    def _run(self):
+        start = time.monotonic()
+        first = None
+        # Reading the file can fail too (gone, damaged); finished is set
+        # either way so the UI stops waiting
+        try:
+            for frame in self._frames:
+                if self._stop_event.is_set():
+                    break
+                if self.speed > 0:
+                    if first is None:
+                        first = frame['timestamp']
+                    delay = start + (frame['timestamp'] - first) / self.speed - time.monotonic()
+                    if delay > 0 and self._stop_event.wait(delay):
+                        break
+                try:
+                    self._play(frame)
+                except Exception as e:
+                    print(f"Replay error: {e}")
+        except Exception as e:
+            print(f"Replay error: {e}")
+        finally:
+            self.finished.set()
+
+
+def synthetic_frames(seconds=60, rate=10.0, cores=8, seed=0, start=None):
+    # A made-up but plausible trace: slow waves, noise and occasional
+    # spikes, at any sample rate, for stress-testing the UI
+    rng = random.Random(seed)
+    start = time.time() if start is None else start
+    total_gb = 16.0
+    mounts = (MountUsage('/', '/dev/sda1', 'ext4', 500.0, 210.0, 42.0),)
+    for index in range(int(seconds * rate)):
+        t = index / rate
+        spike = 40.0 if rng.random() < 0.01 else 0.0
+        per_core = [min(max(30 + 25 * math.sin(t / 7 + core) + rng.uniform(-10, 10) + spike, 0.0), 100.0)
+                    for core in range(cores)]
+        cpu = sum(per_core) / cores
+        max_core = max(range(cores), key=per_core.__getitem__)
+        ram = 50 + 10 * math.sin(t / 60)
+        gpu = max(0.0, 40 * math.sin(t / 11)) + spike / 2
+        up = max(0.0, 200 + 150 * math.sin(t / 5) + rng.uniform(-50, 50))
+        down = max(0.0, 2000 + 1800 * math.sin(t / 3) + rng.uniform(-300, 300)) * (5 if spike else 1)
+        read = max(0.0, 500 + 400 * math.sin(t / 13))
+        write = max(0.0, 300 + 250 * math.cos(t / 17))
+        frame = {
+            'timestamp': start + t,
+            'cpu_percent': round(cpu, 1),
+            'ram_used_gb': total_gb * ram / 100,
+            'ram_total_gb': total_gb,
+            'ram_percent': ram,
+            'gpu_percent': gpu,
+            'gpu_name': 'Synthetic GPU',
+            'gpus': (GpuReading(0, 'Synthetic GPU', gpu, 4096 * gpu / 100, 8192.0, 50 + gpu / 4),),
+            'disk_percent': 42.0,
+            'net_up_kb': up,
+            'net_down_kb': down,
+            'disk_read_kb': read,
+            'disk_write_kb': write,
+            'disk_read_iops': read / 4,
+            'disk_write_iops': write / 4,
+            'mounts': mounts,
+            'nic_rates': (NicRate('eth0', up, down),),
+            'disk_rates': (DiskRate('sda', read, write, read / 4, write / 4),),
+            'core_stats': CoreStats(cores, max_core, per_core[max_core], cpu, per_core[max_core] - cpu,
+                                    sum(1 for percent in per_core if percent >= 80)),
+            'process_count': 300 + index % 7,
+            'top_cpu_processes': (ProcessInfo(1000 + index % 5, 'synthetic', 'user', '', spike + 20.0, 512.0),),
+            'top_memory_processes': (ProcessInfo(2000, 'synthetic-mem', 'user', '', 1.0, 4096.0),),
+            'per_core': per_core,
+        }
+        yield [frame[field] for field in RECORDED_FIELDS]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='System Monitor replay files')
+    commands = parser.add_subparsers(dest='command', required=True)
+    info = commands.add_parser('info', help='summarize a replay file')
+    info.add_argument('path')
+    synthesize = commands.add_parser('synthesize', help='write a synthetic trace')
+    synthesize.add_argument('path')
+    synthesize.add_argument('--seconds', type=float, default=60)
+    synthesize.add_argument('--rate', type=float, default=10, help='samples per second')
+    synthesize.add_argument('--cores', type=int, default=8)
+    synthesize.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.command == 'synthesize':
+        recorder = Recorder(args.path)
+        for frame in synthetic_frames(args.seconds, args.rate, args.cores, args.seed):
+            recorder.record_frame(frame)
+        recorder.close()
+        print(f"{args.path}: {recorder.frames} frames")
+        return 0
+
+    frames = 0
+    first = last = None
+    try:
+        for frame in read_frames(args.path):
+            frames += 1
+            first = frame['timestamp'] if first is None else first
+            last = frame['timestamp']
+    except (OSError, ReplayError) as e:
+        print(f"ERROR: {e}")
+        return 1
+    span = (last - first) if frames else 0.0
+    print(f"{args.path}: {frames} frames over {span:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+# rolling.py
+#
+# Sliding-window statistics (min, max, mean, p95) over the last N seconds of
+# samples, maintained as samples arrive instead of rescanning history:
+#
+#   - min/max: monotonic deques, amortized O(1) per sample
+#   - mean: running sums, re-summed exactly once per window's worth of
+#     expiries so float error cannot accumulate
+#   - p95: a log-bucket histogram (relative error ROLLING_QUANTILE_ACCURACY)
+#     whose size depends on the spread of values, not on the window length
+#
+# Every window keeps references to the same sample tuples, so a sample is
+# stored once however many windows it is in.
+
+import math
+from bisect import bisect_left, insort
+from collections import deque, namedtuple
+
+from constants import ROLLING_QUANTILE, ROLLING_QUANTILE_ACCURACY
+
+RollingSummary = namedtuple('RollingSummary', ['count', 'min', 'max', 'mean', 'p95'])
+
+EMPTY_SUMMARY = RollingSummary(0, 0.0, 0.0, 0.0, 0.0)
+# Values at or below this land in the histogram's zero bucket
+ZERO_THRESHOLD = 1e-6
+
+
+class QuantileSketch:
+    # Counts per logarithmic bucket; values can be added and removed, so it
+    # tracks a sliding window as long as the caller removes what expires.
+    # Occupied bucket keys are kept sorted, so a high quantile only walks
+    # the top few buckets
+    def __init__(self, accuracy=ROLLING_QUANTILE_ACCURACY):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.keys = []
+        self.zeros = 0
+        self.count = 0
+
+    def _key(self, value):
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value):
+        self.count += 1
+        if value <= ZERO_THRESHOLD:
+            self.zeros += 1
+            return
+        key = self._key(value)
+        count = self.buckets.get(key)
+        if count is None:
+            self.buckets[key] = 1
+            insort(self.keys, key)
+        else:
+            self.buckets[key] = count + 1
+
+    def remove(self, value):
+        self.count -= 1
+        if value <= ZERO_THRESHOLD:
+            self.zeros -= 1
+            return
+        key = self._key(value)
+        remaining = self.buckets[key] - 1
+        if remaining:
+            self.buckets[key] = remaining
+        else:
+            del self.buckets[key]
+            del self.keys[bisect_left(self.keys, key)]
+
+    def quantile(self, fraction):
+        if not self.count:
+            return 0.0
+        # The rank-th smallest value is the (count - rank + 1)-th largest
+        rank = max(math.ceil(fraction * self.count), 1)
+        wanted = self.count - rank + 1
+        seen = 0
+        for key in reversed(self.keys):
+            seen += self.buckets[key]
+            if seen >= wanted:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key]
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 0.0
+
+
+class _Window:
+    def __init__(self, seconds, width):
+        self.seconds = seconds
+        self.samples = deque()
+        self.sums = [0.0] * width
+        self.mins = [deque() for _ in range(width)]
+        self.maxs = [deque() for _ in range(width)]
+        self.sketches = [QuantileSketch() for _ in range(width)]
+        self._expired = 0
+
+    def add(self, sample):
+        # sample: (timestamp, value, value, ...)
+        self.samples.append(sample)
+        for index in range(len(self.sums)):
+            value = sample[index + 1]
+            self.sums[index] += value
+            mins = self.mins[index]
+            while mins and mins[-1][index + 1] >= value:
+                mins.pop()
+            mins.append(sample)
+            maxs = self.maxs[index]
+            while maxs and maxs[-1][index + 1] <= value:
+                maxs.pop()
+            maxs.append(sample)
+            self.sketches[index].add(value)
+
+    def expire(self, now):
+        samples = self.samples
+        cutoff = now - self.seconds
+        while samples and samples[0][0] <= cutoff:
+            old = samples.popleft()
+            for index in range(len(self.sums)):
+                value = old[index + 1]
+                self.sums[index] -= value
+                if self.mins[index][0] is old:
+                    self.mins[index].popleft()
+                if self.maxs[index][0] is old:
+                    self.maxs[index].popleft()
+                self.sketches[index].remove(value)
+            self._expired += 1
+        if self._expired and self._expired >= len(samples):
+            # Amortized O(1): one exact re-sum per window's worth of expiries
+            self.sums = [math.fsum(sample[index + 1] for sample in samples) for index in range(len(self.sums))]
+            self._expired = 0
+
+    def summary(self, index):
+        count = len(self.samples)
+        if not count:
+            return EMPTY_SUMMARY
+        low = self.mins[index][0][index + 1]
+        high = self.maxs[index][0][index + 1]
+        p95 = min(max(self.sketches[index].quantile(ROLLING_QUANTILE), low), high)
+        return RollingSummary(count, low, high, self.sums[index] / count, p95)
+
+
+# Rolling statistics for several columns over several windows, e.g.
+# windows={'1 min': 60, '5 min': 300, '1 h': 3600}
+class RollingStats:
+    def __init__(self, columns, windows):
+        self.columns = tuple(columns)
+        self.windows = {name: _Window(seconds, len(self.columns)) for name, seconds in windows.items()}
+        self._summary = None
+
+    def add(self, timestamp, values):
+        sample = (timestamp, *values)
+        for window in self.windows.values():
+            window.add(sample)
+            window.expire(timestamp)
+        self._summary = None
+
+    def summary(self):
+        # {window: {column: RollingSummary}}, built at most once per sample
+        if self._summary is None:
+            self._summary = {name: {column: window.summary(index) for index, column in enumerate(self.columns)}
+                             for name, window in self.windows.items()}
+        return self._summary
@@ -0,0 +1,61 @@
+# rollups.py
+
+from history import HistoryBuffer
+
+ROLLUP_STATS = ('min', 'max', 'avg')
+
+
+# Incrementally folds raw samples into fixed-width time buckets and keeps the
+# last `capacity` buckets as min/max/avg columns (e.g. 'cpu_min', 'cpu_avg').
+# Each sample costs O(columns); a bucket is written once, when the first
+# sample of the next bucket arrives.
+class RollupTier:
+    def __init__(self, name, bucket_seconds, capacity, columns):
+        self.name = name
+        self.bucket_seconds = bucket_seconds
+        self.columns = tuple(columns)
+        self.history = HistoryBuffer(capacity, [f"{column}_{stat}" for column in self.columns
+                                                for stat in ROLLUP_STATS])
+        self._bucket = None
+        self._count = 0
+        self._sums = [0.0] * len(self.columns)
+        self._mins = [0.0] * len(self.columns)
+        self._maxs = [0.0] * len(self.columns)
+
+    def add(self, timestamp, values):
+        bucket = int(timestamp // self.bucket_seconds)
+        if bucket != self._bucket:
+            self._emit()
+            self._bucket = bucket
+            self._count = 0
+
+        if self._count == 0:
+            self._sums = list(values)
+            self._mins = list(values)
+            self._maxs = list(values)
+        else:
+            sums, mins, maxs = self._sums, self._mins, self._maxs
+            for index, value in enumerate(values):
+                sums[index] += value
+                if value < mins[index]:
+                    mins[index] = value
+                if value > maxs[index]:
+                    maxs[index] = value
+        self._count += 1
+
+    def _emit(self):
+        if self._bucket is None or self._count == 0:
+            return
+        row = {}
+        for index, column in enumerate(self.columns):
+            row[f"{column}_min"] = self._mins[index]
+            row[f"{column}_max"] = self._maxs[index]
+            row[f"{column}_avg"] = self._sums[index] / self._count
+        # Buckets are plotted at their midpoint
+        self.history.append((self._bucket + 0.5) * self.bucket_seconds, **row)
+
+    def view(self, column, stat='avg'):
+        return self.history.view(f"{column}_{stat}")
+
+    def frozen(self, column, stat='avg'):
+        return self.history.frozen(f"{column}_{stat}")
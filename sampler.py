@@ -0,0 +1,79 @@
+# sampler.py
+
+import threading
+import time
+
+
+# Owns SystemStats on a background thread and publishes immutable snapshots.
+# The Tk thread only calls latest(), which never touches psutil.
+class Sampler:
+    def __init__(self, stats_manager, interval=1.0, max_history=60):
+        self.stats_manager = stats_manager
+        self.interval = interval
+        self.max_history = max_history
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self.time_range = None
+
+    def set_time_range(self, time_range):
+        # Picks which history (raw or a rollup tier) the next snapshots carry
+        self.time_range = time_range
+
+    def add_listener(self, callback):
+        # Called on the sampler thread with every new snapshot
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='SystemStatsSampler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def latest(self):
+        with self._lock:
+            return self._snapshot
+
+    def sample_once(self):
+        self.stats_manager.update(self.max_history)
+        return self._publish(self.stats_manager.snapshot(self.time_range))
+
+    def _publish(self, snapshot):
+        with self._lock:
+            self._snapshot = snapshot
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Sampler listener error: {e}")
+        return snapshot
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                self.sample_once()
+            except Exception as e:
+                print(f"Sampler error: {e}")
+
+            now = time.monotonic()
+            next_tick = advance_deadline(next_tick, self.interval, now)
+            self._stop_event.wait(next_tick - now)
+
+
+def advance_deadline(deadline, interval, now):
+    # Schedule against the monotonic clock so the period does not drift;
+    # ticks missed by a slow collector are skipped rather than replayed.
+    deadline += interval
+    if deadline < now:
+        deadline += ((now - deadline) // interval + 1) * interval
+    return deadline
@@ -0,0 +1,84 @@
+# scheduler.py
+
+import time
+
+from constants import COLLECTOR_BUDGET, COLLECTOR_MAX_BACKOFF
+
+# A collector counts as due this many seconds (at most a tenth of its period)
+# before its deadline, so one whose period equals the sampler's tick does not
+# slip a whole tick on wake-up jitter
+DUE_SLACK = 0.05
+# Weight of the newest measurement in the running cost average
+COST_SMOOTHING = 0.3
+
+
+class _Collector:
+    def __init__(self, name, function, interval):
+        self.name = name
+        self.function = function
+        self.interval = interval
+        self.backoff = 1
+        self.next_due = None
+        self.cost = 0.0
+        self.runs = 0
+
+
+# Runs each collector at its own cadence on ticks aligned to the monotonic
+# clock (origin + k * interval, never "last run + interval"), so periods do
+# not drift. A collector whose average cost exceeds COLLECTOR_BUDGET of its
+# period is backed off by doubling its period (up to COLLECTOR_MAX_BACKOFF)
+# and brought back once it is cheap again.
+class CollectorScheduler:
+    def __init__(self, clock=time.monotonic, budget=COLLECTOR_BUDGET, max_backoff=COLLECTOR_MAX_BACKOFF,
+                 instrumentation=None):
+        self._clock = clock
+        self.instrumentation = instrumentation
+        self.budget = budget
+        self.max_backoff = max_backoff
+        self.collectors = {}
+
+    def add(self, name, function, interval):
+        self.collectors[name] = _Collector(name, function, interval)
+
+    def run_due(self):
+        ran = []
+        now = self._clock()
+        for collector in self.collectors.values():
+            period = collector.interval * collector.backoff
+            if collector.next_due is not None and now < collector.next_due - min(DUE_SLACK, period / 10):
+                continue
+
+            start = time.perf_counter()
+            try:
+                collector.function()
+            except Exception as e:
+                print(f"Collector '{collector.name}' error: {e}")
+            cost = time.perf_counter() - start
+            if self.instrumentation is not None and self.instrumentation.enabled:
+                self.instrumentation.record(f"collector.{collector.name}", cost)
+            collector.runs += 1
+            collector.cost = cost if collector.runs == 1 else \
+                collector.cost + COST_SMOOTHING * (cost - collector.cost)
+            ran.append(collector.name)
+
+            self._adjust_backoff(collector)
+            period = collector.interval * collector.backoff
+            if collector.next_due is None:
+                collector.next_due = now
+            collector.next_due += period
+            if collector.next_due <= now:
+                # Missed ticks are skipped, not replayed
+                collector.next_due += ((now - collector.next_due) // period + 1) * period
+        return ran
+
+    def _adjust_backoff(self, collector):
+        budget = collector.interval * collector.backoff * self.budget
+        if collector.cost > budget and collector.backoff < self.max_backoff:
+            collector.backoff *= 2
+        elif collector.cost < budget / 4 and collector.backoff > 1:
+            collector.backoff //= 2
+
+    def stats(self):
+        # name -> (configured period, current period, average cost in ms)
+        return {name: (collector.interval, collector.interval * collector.backoff, collector.cost * 1000)
+                for name, collector in self.collectors.items()}
@@ -0,0 +1,371 @@
+# shm_bus.py
+#
+# Shared-memory sample bus: one process samples, any number of others (a
+# second window, headless.py with the exporter, `python shm_bus.py watch`)
+# read the same samples without touching psutil.
+#
+# Segment layout (multiprocessing.shared_memory, default name SHM_NAME):
+#
+#   0    <4sHHII   magic, version, reserved, slots, slot bytes
+#   16   <Idd      writer pid, writer heartbeat, writer interval
+#   40   <Q        head: samples published so far
+#   64   slots     <QII seq, payload bytes, crc32, then the payload
+#
+# A payload is one replay frame (replay.encode_frame) as compact JSON,
+# with process command lines cut to SHM_CMDLINE_CHARS so it fits a slot;
+# a sample still too big loses its per-device lists, then its processes.
+# Each slot is a seqlock: the writer of sample n sets seq to 2n+1, writes
+# the payload, then sets seq to 2n+2 and advances head. A reader copies the
+# slot and keeps it only if seq read 2n+2 both before and after and the
+# crc matches; anything else was overwritten (the reader fell a whole ring
+# behind) or torn.
+#
+# Every process, the writer included, builds its snapshots by applying
+# frames from the bus to a ReplayStats, so all viewers show identical data.
+# Readers copy and decode each sample rather than read it in place: a frame
+# is mostly variable-length lists (mounts, NICs, disks, processes, the
+# per-core row) that fixed struct fields could only hold by capping each,
+# and at one sample per second decoding costs a reader about half a
+# millisecond (benchmarks/bench_bus.py). The chart histories are rebuilt
+# in each process from those frames, not shared.
+# A reader whose writer has exited or stopped heartbeating (SHM_STALE)
+# claims the bus and starts sampling itself. Claims are last-writer-wins:
+# a writer that finds another pid in the header steps back to reading, so
+# two racing claimants publish at most one sample each before one yields.
+#
+# The segment outlives the processes using it (it is small and reused by
+# the next run); `python shm_bus.py remove` deletes it.
+#
+# Usage: python shm_bus.py info [--name NAME]
+#        python shm_bus.py watch [--name NAME] [--interval S] [--no-takeover]
+#        python shm_bus.py remove [--name NAME]
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from multiprocessing import shared_memory
+
+import psutil
+
+from replay import ReplayStats, encode_frame, decode_frame
+from system_stats import SystemStats, format_network_speed
+from constants import (SHM_NAME, SHM_SLOTS, SHM_SLOT_BYTES, SHM_CMDLINE_CHARS, SHM_STALE, PER_CORE_HISTORY,
+                       COLLECTOR_INTERVALS, GPU_PROVIDER, UPDATE_INTERVAL)
+
+MAGIC = b'SMSB'
+VERSION = 1
+LAYOUT = struct.Struct('<4sHHII')
+OWNER = struct.Struct('<Idd')
+OWNER_OFFSET = 16
+HEAD = struct.Struct('<Q')
+HEAD_OFFSET = 40
+SLOTS_OFFSET = 64
+SLOT = struct.Struct('<QII')
+# How long an attaching process waits for a creator to finish the header
+ATTACH_TIMEOUT = 1.0
+
+
+class SampleBus:
+    # Attaches to the segment, creating it (unless create is False) if it
+    # does not exist yet
+    def __init__(self, name=SHM_NAME, slots=SHM_SLOTS, slot_bytes=SHM_SLOT_BYTES, create=True):
+        self.name = name
+        created = False
+        try:
+            if not create:
+                raise FileExistsError
+            self._shm = shared_memory.SharedMemory(name, create=True, size=SLOTS_OFFSET + slots * slot_bytes)
+            created = True
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name)
+        if os.name == 'posix':
+            # Python's resource tracker would unlink the segment when this
+            # process exits, pulling it from under the other viewers
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self._shm._name, 'shared_memory')
+        self.buf = self._shm.buf
+        if created:
+            # Magic last: attachers wait for it before reading the layout
+            LAYOUT.pack_into(self.buf, 0, b'\0' * 4, VERSION, 0, slots, slot_bytes)
+            LAYOUT.pack_into(self.buf, 0, MAGIC, VERSION, 0, slots, slot_bytes)
+        else:
+            deadline = time.monotonic() + ATTACH_TIMEOUT
+            while bytes(self.buf[:4]) != MAGIC and time.monotonic() < deadline:
+                time.sleep(0.01)
+        magic, version, _, self.slots, self.slot_bytes = LAYOUT.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"shared memory {name!r} is not a version {VERSION} sample bus")
+        if SLOTS_OFFSET + self.slots * self.slot_bytes > len(self.buf):
+            self.close()
+            raise ValueError(f"shared memory {name!r} is smaller than its layout")
+        self.capacity = self.slot_bytes - SLOT.size
+
+    @property
+    def head(self):
+        return HEAD.unpack_from(self.buf, HEAD_OFFSET)[0]
+
+    def oldest(self):
+        # Index of the oldest sample still in the ring
+        return max(self.head - self.slots, 0)
+
+    def owner(self):
+        # -> (writer pid or 0, heartbeat, interval)
+        return OWNER.unpack_from(self.buf, OWNER_OFFSET)
+
+    def claim(self, pid, interval, now):
+        OWNER.pack_into(self.buf, OWNER_OFFSET, pid, now, interval)
+
+    def release(self, pid):
+        if self.owner()[0] == pid:
+            OWNER.pack_into(self.buf, OWNER_OFFSET, 0, 0.0, 0.0)
+
+    def writer_alive(self, now):
+        pid, heartbeat, interval = self.owner()
+        if not pid:
+            return False
+        if pid == os.getpid():
+            return True
+        if not psutil.pid_exists(pid):
+            return False
+        # Heartbeats use time.monotonic(), which is system-wide
+        return now - heartbeat <= max(SHM_STALE, 3 * interval)
+
+    def publish(self, payload, now):
+        # -> index of the published sample
+        if len(payload) > self.capacity:
+            raise ValueError(f"sample of {len(payload)} bytes does not fit a {self.capacity} byte slot")
+        index = self.head
+        offset = SLOTS_OFFSET + (index % self.slots) * self.slot_bytes
+        SLOT.pack_into(self.buf, offset, 2 * index + 1, 0, 0)
+        self.buf[offset + SLOT.size:offset + SLOT.size + len(payload)] = payload
+        SLOT.pack_into(self.buf, offset, 2 * index + 2, len(payload), zlib.crc32(payload))
+        HEAD.pack_into(self.buf, HEAD_OFFSET, index + 1)
+        self.heartbeat(now)
+        return index
+
+    def heartbeat(self, now):
+        # The writer is alive, published or not
+        pid, _, interval = self.owner()
+        OWNER.pack_into(self.buf, OWNER_OFFSET, pid, now, interval)
+
+    def read(self, index):
+        # Payload of sample index, or None if it is not (or no longer) there
+        offset = SLOTS_OFFSET + (index % self.slots) * self.slot_bytes
+        seq, length, crc = SLOT.unpack_from(self.buf, offset)
+        if seq != 2 * index + 2 or length > self.capacity:
+            return None
+        payload = bytes(self.buf[offset + SLOT.size:offset + SLOT.size + length])
+        if SLOT.unpack_from(self.buf, offset)[0] != seq or zlib.crc32(payload) != crc:
+            return None
+        return payload
+
+    def read_since(self, index):
+        # -> (payloads from index on, next index, samples missed)
+        head = self.head
+        oldest = max(head - self.slots, 0)
+        missed = 0
+        if index < oldest:
+            missed = oldest - index
+            index = oldest
+        elif index > head:
+            index = head
+        payloads = []
+        for position in range(index, head):
+            payload = self.read(position)
+            if payload is None:
+                missed += 1
+            else:
+                payloads.append(payload)
+        return payloads, head, missed
+
+    def close(self):
+        self.buf = None
+        self._shm.close()
+
+    def unlink(self):
+        if os.name == 'posix':
+            # unlink() unregisters from the resource tracker; undo our unregister first
+            from multiprocessing import resource_tracker
+            resource_tracker.register(self._shm._name, 'shared_memory')
+        self._shm.unlink()
+
+
+# SystemStats drop-in on top of the bus. update() reads the samples
+# published since the last call, or, while this process is the writer,
+# samples with a private SystemStats and publishes
+class SharedStats(ReplayStats):
+    def __init__(self, name=SHM_NAME, max_history=60, per_core_history=PER_CORE_HISTORY,
+                 interval=UPDATE_INTERVAL / 1000, collector_intervals=COLLECTOR_INTERVALS,
+                 gpu_provider=GPU_PROVIDER, takeover=True, instrumentation=None, clock=time.monotonic):
+        super().__init__(max_history=max_history, per_core_history=per_core_history)
+        self.bus = SampleBus(name)
+        self.interval = interval
+        self.collector_intervals = collector_intervals
+        self.gpu_provider = gpu_provider
+        self.takeover = takeover
+        self.instrumentation = instrumentation
+        self._clock = clock
+        self.pid = os.getpid()
+        self.source = None
+        self.writer = False
+        self.received = 0
+        self.missed = 0
+        # Samples cut down to fit a slot, and ones too big even then
+        self.trimmed = 0
+        self.unpublished = 0
+        # Start with the ring's history so charts are populated at once
+        self.next_index = self.bus.oldest()
+
+    def update(self, max_history=None):
+        if self.writer and self.bus.owner()[0] != self.pid:
+            print(f"Shared bus {self.bus.name}: process {self.bus.owner()[0]} took over sampling")
+            self._stop_sampling()
+        if not self.writer:
+            self._read()
+            if self.takeover and not self.bus.writer_alive(self._clock()):
+                self._start_sampling()
+        if self.writer:
+            self._sample()
+
+    def _read(self):
+        payloads, self.next_index, missed = self.bus.read_since(self.next_index)
+        self.missed += missed
+        for payload in payloads:
+            self.apply(decode_frame(json.loads(payload)))
+        self.received += len(payloads)
+
+    def _start_sampling(self):
+        previous = self.bus.owner()[0]
+        self.bus.claim(self.pid, self.interval, self._clock())
+        if previous:
+            print(f"Shared bus {self.bus.name}: writer {previous} is gone or stalled, sampling here")
+        if self.source is None:
+            # One history row is enough: snapshots only feed encode_frame()
+            self.source = SystemStats(max_history=1, per_core_history=1, collector_intervals=self.collector_intervals,
+                                      gpu_provider=self.gpu_provider, instrumentation=self.instrumentation)
+        self.writer = True
+        # Samples published between our last read and the claim
+        self._read()
+
+    def _stop_sampling(self):
+        self.writer = False
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+    def _sample(self):
+        self.source.update()
+        snapshot = self.source.snapshot()
+        snapshot = snapshot._replace(top_cpu_processes=_shorten(snapshot.top_cpu_processes),
+                                     top_memory_processes=_shorten(snapshot.top_memory_processes))
+        payload, trimmed = _fit(snapshot, self.bus.capacity)
+        if trimmed and not self.trimmed:
+            print(f"Shared bus {self.bus.name}: samples over {self.bus.capacity} bytes are published without "
+                  f"the per-device lists or process tables")
+        self.trimmed += trimmed
+        if len(payload) <= self.bus.capacity:
+            self.next_index = self.bus.publish(payload, self._clock()) + 1
+        else:
+            # Still sampling: readers must not take over
+            self.bus.heartbeat(self._clock())
+            if not self.unpublished:
+                print(f"Shared bus {self.bus.name}: sample of {len(payload)} bytes does not fit a "
+                      f"{self.bus.capacity} byte slot even trimmed, not published")
+            self.unpublished += 1
+        # Apply what readers will decode, so every viewer shows the same values
+        self.apply(decode_frame(json.loads(payload)))
+
+    def close(self):
+        if self.bus.buf is None:
+            return
+        if self.writer:
+            # Hand over at once instead of after SHM_STALE seconds
+            self.bus.release(self.pid)
+        self._stop_sampling()
+        self.bus.close()
+
+
+def _encode(snapshot):
+    return json.dumps(encode_frame(snapshot), separators=(',', ':')).encode('utf-8')
+
+
+def _fit(snapshot, capacity):
+    # -> (payload, whether anything was dropped). While over capacity (many
+    # NICs or mounts, long process names) the per-NIC / per-disk / per-mount
+    # lists go first, then the process tables; the totals always stay
+    payload = _encode(snapshot)
+    trimmed = False
+    for fields in (('nic_rates', 'disk_rates', 'mounts'), ('top_cpu_processes', 'top_memory_processes')):
+        if len(payload) <= capacity:
+            break
+        snapshot = snapshot._replace(**{field: () for field in fields})
+        payload = _encode(snapshot)
+        trimmed = True
+    return payload, trimmed
+
+
+def _shorten(processes):
+    return [process._replace(cmdline=process.cmdline[:SHM_CMDLINE_CHARS]) for process in processes]
+
+
+def _watch(args):
+    stats = SharedStats(args.name, max_history=1, per_core_history=0, interval=args.interval,
+                        takeover=not args.no_takeover)
+    shown = None
+    try:
+        while True:
+            stats.update()
+            snapshot = stats.snapshot()
+            if snapshot.timestamp and snapshot.timestamp != shown:
+                shown = snapshot.timestamp
+                print(f"{time.strftime('%H:%M:%S', time.localtime(snapshot.timestamp))}  "
+                      f"CPU {snapshot.cpu_percent:5.1f}%  RAM {snapshot.ram_percent:5.1f}%  "
+                      f"GPU {snapshot.gpu_percent:5.1f}%  up {format_network_speed(snapshot.net_up_kb)}  "
+                      f"down {format_network_speed(snapshot.net_down_kb)}  "
+                      f"read {format_network_speed(snapshot.disk_read_kb)}  "
+                      f"write {format_network_speed(snapshot.disk_write_kb)}"
+                      f"{'  (sampling)' if stats.writer else ''}", flush=True)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stats.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='System Monitor shared-memory sample bus')
+    parser.add_argument('command', choices=('info', 'watch', 'remove'))
+    parser.add_argument('--name', default=SHM_NAME, help='shared memory segment name')
+    parser.add_argument('--interval', type=float, default=UPDATE_INTERVAL / 1000, help='watch: seconds between reads')
+    parser.add_argument('--no-takeover', action='store_true', help='watch: never start sampling')
+    args = parser.parse_args(argv)
+
+    if args.command == 'watch':
+        _watch(args)
+        return 0
+    try:
+        bus = SampleBus(args.name, create=False) if args.command == 'info' else None
+        if args.command == 'remove':
+            shared_memory.SharedMemory(args.name).unlink()
+            print(f"removed {args.name}")
+            return 0
+    except (FileNotFoundError, ValueError) as e:
+        print(f"ERROR: {e}")
+        return 1
+    pid, heartbeat, interval = bus.owner()
+    alive = bus.writer_alive(time.monotonic())
+    print(f"{args.name}: {bus.slots} slots x {bus.slot_bytes} B, {bus.head} samples published")
+    print(f"writer: {pid or 'none'}"
+          + (f", {'alive' if alive else 'stale'}, last sample {time.monotonic() - heartbeat:.1f} s ago, "
+             f"every {interval:g} s" if pid else ''))
+    bus.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,134 +1,439 @@
 # system_stats.py
 
+import time
+from collections import namedtuple
+
 import psutil
 
+from history import HistoryBuffer
+from rollups import RollupTier
+from processes import ProcessMonitor
+from io_rates import CounterRates, WholeDisks, FilesystemUsage, NicRate, DiskRate
+from scheduler import CollectorScheduler
+from gpu import GpuProvider, create_provider
+from rolling import RollingStats
+from procfs import open_procfs
+from cgroups import CgroupStats, open_cgroup
+from constants import (ROLLUP_TIERS, TIME_RANGES, PER_CORE_HISTORY, TOP_PROCESSES, COLLECTOR_INTERVALS, GPU_PROVIDER,
+                       ROLLING_WINDOWS, PROCFS_FAST_PATH, CGROUP_MODE)
+
+try:
+    from percore import PerCoreHistory
+except ImportError:
+    # NumPy is not installed: no per-core sampling
+    PerCoreHistory = None
+
+HISTORY_COLUMNS = ('cpu', 'ram', 'gpu', 'net_up', 'net_down', 'disk_read', 'disk_write')
+
+StatsSnapshot = namedtuple('StatsSnapshot', [
+    'timestamp',
+    'cpu_percent',
+    'ram_used_gb',
+    'ram_total_gb',
+    'ram_percent',
+    'gpu_percent',
+    'gpu_name',
+    'gpus',
+    'disk_percent',
+    'net_up_kb',
+    'net_down_kb',
+    'disk_read_kb',
+    'disk_write_kb',
+    'disk_read_iops',
+    'disk_write_iops',
+    'mounts',
+    'nic_rates',
+    'disk_rates',
+    'cpu_history',
+    'ram_history',
+    'gpu_history',
+    'net_up_history',
+    'net_down_history',
+    'disk_read_history',
+    'disk_write_history',
+    'history_timestamps',
+    'per_core_history',
+    'core_stats',
+    'process_count',
+    'top_cpu_processes',
+    'top_memory_processes',
+    'rolling',
+    'cgroup',
+])
+
 
 class SystemStats:
-    def __init__(self):
-        self.cpu_history = []
-        self.ram_history = []
-        self.gpu_history = []
-        self.net_up_history = []
-        self.net_down_history = []
-        self.last_net_io = None
-        self.gpu_available = self._check_gpu_availability()
-
-    def _check_gpu_availability(self):
+    def __init__(self, max_history=60, per_core_history=PER_CORE_HISTORY, top_processes=TOP_PROCESSES,
+                 collector_intervals=COLLECTOR_INTERVALS, gpu_provider=GPU_PROVIDER, instrumentation=None,
+                 flight=None, procfs=PROCFS_FAST_PATH, cgroup=CGROUP_MODE, sources=True):
+        self.history = HistoryBuffer(max_history, HISTORY_COLUMNS)
+        self.rollups = {name: RollupTier(name, bucket_seconds, capacity, HISTORY_COLUMNS)
+                        for name, (bucket_seconds, capacity) in ROLLUP_TIERS.items()}
+        self.rolling = RollingStats(HISTORY_COLUMNS, ROLLING_WINDOWS)
+        self.net_rates = CounterRates(('bytes_sent', 'bytes_recv'))
+        self.disk_rates = CounterRates(('read_bytes', 'write_bytes', 'read_count', 'write_count'))
+        self.whole_disks = WholeDisks()
+        self.filesystems = FilesystemUsage()
+        self.disk_io = (0.0, 0.0, 0.0, 0.0)
+        self.net_speeds = (0.0, 0.0)
+        self.gpus = ()
+        self.cpu_percent = 0.0
+        self.ram_info = (0.0, 0.0, 0.0)
+        self.gpu_info = (0, "No GPU")
+        self.timestamp = 0.0
+        self.per_core_history = per_core_history if PerCoreHistory is not None else 0
+        self.per_core = None
+        # Cgroup metrics currently failing (and falling back to the host)
+        self._cgroup_errors = set()
+        self.scheduler = CollectorScheduler(instrumentation=instrumentation)
+        if not sources:
+            # Samples come from elsewhere (a replay file, the shared bus, an
+            # agent) and are applied by a subclass: no providers, no collectors
+            self.gpu = GpuProvider()
+            self.processes = None
+            self.proc = None
+            self.cgroup = None
+            self.flight = None
+            return
+
+        # A provider name from gpu.PROVIDERS ('auto' picks one) or an instance
+        self.gpu = gpu_provider if isinstance(gpu_provider, GpuProvider) else create_provider(gpu_provider)
+        self.processes = ProcessMonitor(top_processes) if top_processes else None
+        # Linux: CPU, RAM, network and disk counters straight from /proc
+        # (procfs.py); None falls back to psutil
+        self.proc = open_procfs() if procfs else None
+        # A cgroups.open_cgroup() mode or a CgroupStats (None: off): CPU,
+        # RAM and disk I/O of the container rather than the host
+        self.cgroup = cgroup if cgroup is None or isinstance(cgroup, CgroupStats) else open_cgroup(cgroup)
+        # Prime the CPU baseline so the first non-blocking reading is meaningful
+        if self.per_core_history:
+            cores = self._cpu_percents(percpu=True)
+            self.per_core = PerCoreHistory(len(cores), per_core_history)
+        else:
+            self._cpu_percents()
+
+        # Each collector runs at its own cadence; update() records whatever
+        # each one last measured
+        collectors = (
+            ('cpu', self._update_cpu),
+            ('ram', self._update_ram),
+            ('network', self._update_network),
+            ('disk_io', self._update_disk_io),
+            ('gpu', self._update_gpu),
+            ('disk', self._update_disk),
+            ('processes', self._update_processes),
+            ('cgroups', self._update_cgroups),
+        )
+        for name, function in collectors:
+            if name == 'processes' and self.processes is None:
+                continue
+            if name == 'cgroups' and (self.cgroup is None or self.cgroup.children is None):
+                continue
+            self.scheduler.add(name, function, collector_intervals[name])
+
+        # FlightRecorder (--flight): high-rate cheap counters on their own
+        # thread, beside the collectors above
+        self.flight = flight
+        if flight is not None:
+            flight.start()
+
+    @property
+    def cpu_history(self):
+        return self.history.view('cpu')
+
+    @property
+    def ram_history(self):
+        return self.history.view('ram')
+
+    @property
+    def gpu_history(self):
+        return self.history.view('gpu')
+
+    @property
+    def net_up_history(self):
+        return self.history.view('net_up')
+
+    @property
+    def net_down_history(self):
+        return self.history.view('net_down')
+
+    @property
+    def disk_read_history(self):
+        return self.history.view('disk_read')
+
+    @property
+    def disk_write_history(self):
+        return self.history.view('disk_write')
+
+    def update(self, max_history=None):
+        if max_history is not None and max_history != self.history.capacity:
+            self.history = self.history.resize(max_history)
+
+        self.scheduler.run_due()
+        # Wall-clock time of this sample; charts plot against these, so a
+        # late or skipped tick shows up as a gap rather than being squeezed.
+        # Rolling windows use the monotonic clock, so a wall-clock step
+        # cannot stretch or empty them
+        self._record_sample(time.time(), time.monotonic())
+
+    def _record_sample(self, timestamp, monotonic):
+        # Appends the last value of every collector to the histories
+        self.timestamp = timestamp
+        cpu_percent = self.cpu_percent
+        ram_percent = self.ram_info[2]
+        gpu_percent = self.gpu_info[0]
+        upload_kb, download_kb = self.net_speeds
+        read_kb, write_kb = self.disk_io[0], self.disk_io[1]
+        self.history.append(self.timestamp, cpu=cpu_percent, ram=ram_percent, gpu=gpu_percent,
+                            net_up=upload_kb, net_down=download_kb, disk_read=read_kb, disk_write=write_kb)
+        values = (cpu_percent, ram_percent, gpu_percent, upload_kb, download_kb, read_kb, write_kb)
+        for tier in self.rollups.values():
+            tier.add(self.timestamp, values)
+        self.rolling.add(monotonic, values)
+
+    def _cpu_percents(self, percpu=False):
+        if self.proc is not None:
+            return self.proc.cpu_percent(percpu=percpu)
+        return psutil.cpu_percent(interval=None, percpu=percpu)
+
+    def backfill(self, reader, now=None):
+        # Loads the last ROLLUP_TIERS span from an on-disk store
+        # (tsdb.TimeSeriesReader) into the rollup tiers behind the 1 h / 24 h
+        # chart ranges, so they show earlier sessions after a restart. Call
+        # before sampling starts; -> samples loaded
+        now = time.time() if now is None else now
+        span = max(bucket_seconds * capacity for bucket_seconds, capacity in ROLLUP_TIERS.values())
+        timestamps, _ = reader.query(HISTORY_COLUMNS[0], now - span, now)
+        columns = []
+        for column in HISTORY_COLUMNS:
+            column_timestamps, values = reader.query(column, now - span, now)
+            if len(column_timestamps) != len(timestamps):
+                # Column missing from older segments: align on timestamps
+                by_time = dict(zip(column_timestamps, values))
+                values = [by_time.get(timestamp, 0.0) for timestamp in timestamps]
+            columns.append(values)
+        for timestamp, *values in zip(timestamps, *columns):
+            for tier in self.rollups.values():
+                tier.add(timestamp, values)
+        return len(timestamps)
+
+    def _update_cpu(self):
+        # Non-blocking: measures utilisation since the previous call
+        if self.per_core is None:
+            self.cpu_percent = self._cpu_percents()
+            if self.cgroup is not None:
+                self.cpu_percent = self._from_cgroup('CPU', self.cgroup.cpu_percent, self.cpu_percent)
+            return self.cpu_percent
+
+        # One per-core read; the aggregate is its mean
+        percents = self._cpu_percents(percpu=True)
+        if len(percents) != self.per_core.cores:
+            self.per_core = PerCoreHistory(len(percents), self.per_core_history)
+        self.per_core.append(percents)
+        self.cpu_percent = round(float(self.per_core.latest.mean()), 1)
+        if self.cgroup is not None:
+            # The heatmap stays per host core; the figure is of the quota
+            self.cpu_percent = self._from_cgroup('CPU', self.cgroup.cpu_percent, self.cpu_percent)
+        return self.cpu_percent
+
+    def _from_cgroup(self, metric, read, host):
+        # read() from the cgroup, or the host figure when the file is gone or
+        # unreadable (no cpu/io controller delegated); reported once per outage
         try:
-            import GPUtil
-            return True
-        except ImportError:
+            value = read()
+        except (OSError, KeyError, ValueError) as e:
+            if metric not in self._cgroup_errors:
+                self._cgroup_errors.add(metric)
+                print(f"Cgroup {metric} error: {e}; showing the host figure")
+            return host
+        self._cgroup_errors.discard(metric)
+        return value
+
+    def _update_ram(self):
+        ram = self.proc.virtual_memory() if self.proc is not None else psutil.virtual_memory()
+        used, total, percent = ram.used, ram.total, ram.percent
+        if self.cgroup is not None:
             try:
-                if psutil.virtual_memory():
-                    pass
-            except:
+                used = self.cgroup.memory_used()
+            except (OSError, ValueError):
+                # The root cgroup has no memory.current: host figures
                 pass
-            return False
-
-    def update(self, max_history=60):
-        self._update_cpu(max_history)
-        self._update_ram(max_history)
-        self._update_gpu(max_history)
-        self._update_network(max_history)
-
-    def _update_cpu(self, max_history):
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        self.cpu_history.append(cpu_percent)
-        if len(self.cpu_history) > max_history:
-            self.cpu_history.pop(0)
-
-    def _update_ram(self, max_history):
-        ram = psutil.virtual_memory()
-        ram_percent = ram.percent
-        self.ram_history.append(ram_percent)
-        if len(self.ram_history) > max_history:
-            self.ram_history.pop(0)
-
-    def _update_gpu(self, max_history):
-        gpu_percent = self._get_gpu_usage()
-        self.gpu_history.append(gpu_percent)
-        if len(self.gpu_history) > max_history:
-            self.gpu_history.pop(0)
+            else:
+                total = min(self.cgroup.memory_limit or total, total)
+                percent = round(used / total * 100, 1) if total else 0.0
+        self.ram_info = (used / (1024 ** 3), total / (1024 ** 3), percent)
+        return percent
+
+    def _update_gpu(self):
+        self.gpus = self.gpu.read()
+        self.gpu_info = self._summarize_gpus(self.gpus)
+        return self.gpu_info[0]
+
+    def _summarize_gpus(self, gpus):
+        # Aggregate load is the mean over all devices, like the CPU figure
+        if not gpus:
+            return 0, "No GPU"
+        load = sum(gpu.load_percent for gpu in gpus) / len(gpus)
+        names = [gpu.name for gpu in gpus]
+        if len(gpus) == 1:
+            return load, names[0]
+        if len(set(names)) == 1:
+            return load, f"{len(gpus)}x {names[0]}"
+        return load, ', '.join(names)
 
     def _get_gpu_usage(self):
-        try:
-            import GPUtil
-            gpus = GPUtil.getGPUs()
-            if gpus:
-                return gpus[0].load * 100
-        except:
-            pass
-        return 0
-
-    def _update_network(self, max_history):
-        net_io = psutil.net_io_counters()
-        if self.last_net_io is None:
-            self.last_net_io = net_io
-            self.net_up_history.append(0)
-            self.net_down_history.append(0)
+        return self.gpu_info[0]
+
+    def _update_processes(self):
+        if self.processes is not None:
+            self.processes.update()
+
+    def _update_cgroups(self):
+        self.cgroup.update_children()
+
+    def _update_disk(self):
+        self.filesystems.update()
+
+    def _update_network(self):
+        # KB/s per interface over the time actually elapsed since the last read
+        if self.proc is not None:
+            counters = self.proc.net_io_counters()
         else:
-            bytes_sent_delta = net_io.bytes_sent - self.last_net_io.bytes_sent
-            bytes_recv_delta = net_io.bytes_recv - self.last_net_io.bytes_recv
-            
-            upload_kb = bytes_sent_delta / 1024
-            download_kb = bytes_recv_delta / 1024
-            
-            self.net_up_history.append(upload_kb)
-            self.net_down_history.append(download_kb)
-            
-            if len(self.net_up_history) > max_history:
-                self.net_up_history.pop(0)
-            if len(self.net_down_history) > max_history:
-                self.net_down_history.pop(0)
-            
-            self.last_net_io = net_io
+            counters = psutil.net_io_counters(pernic=True)
+        self.net_rates.update(counters)
+        sent, received = self.net_rates.totals()
+        self.net_speeds = (sent / 1024, received / 1024)
+        return self.net_speeds
+
+    def _update_disk_io(self):
+        counters = None
+        if self.cgroup is not None:
+            counters = self._from_cgroup('disk I/O', self.cgroup.io_counters, None)
+        # io.stat only lists whole devices
+        whole_devices = counters is not None
+        if counters is None:
+            try:
+                if self.proc is not None:
+                    counters = self.proc.disk_io_counters()
+                else:
+                    counters = psutil.disk_io_counters(perdisk=True) or {}
+            except (OSError, NotImplementedError, RuntimeError, ValueError) as e:
+                print(f"Disk I/O error: {e}")
+                counters = {}
+        self.disk_rates.update(counters)
+        names = None if whole_devices else self.whole_disks.filter(counters)
+        read_bytes, write_bytes, reads, writes = self.disk_rates.totals(names)
+        self.disk_io = (read_bytes / 1024, write_bytes / 1024, reads, writes)
+        return self.disk_io[0], self.disk_io[1]
 
     def get_cpu_percent(self):
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        return cpu_percent
+        return self.cpu_percent
 
     def get_ram_info(self):
-        ram = psutil.virtual_memory()
-        used_gb = ram.used / (1024 ** 3)
-        total_gb = ram.total / (1024 ** 3)
-        percent = ram.percent
-        return used_gb, total_gb, percent
+        return self.ram_info
 
     def get_gpu_info(self):
-        if not self.gpu_available:
-            return 0, "No GPU"
-        
-        try:
-            import GPUtil
-            gpus = GPUtil.getGPUs()
-            if gpus:
-                gpu = gpus[0]
-                return gpu.load * 100, gpu.name
-        except:
-            pass
-        
-        return 0, "No GPU"
-
-    def get_disk_info(self):
-        disk = psutil.disk_usage('/')
-        percent = disk.percent
-        return percent
+        return self.gpu_info
 
-    def get_network_speeds(self):
-        if self.net_up_history:
-            upload_kb = self.net_up_history[-1]
-        else:
-            upload_kb = 0
-        
-        if self.net_down_history:
-            download_kb = self.net_down_history[-1]
+    def get_disk_info(self, mountpoint=None):
+        # Percent used of one mount (default: the system mount)
+        if mountpoint is None:
+            mount = self.filesystems.root()
         else:
-            download_kb = 0
-        
-        return upload_kb, download_kb
+            mount = next((mount for mount in self.filesystems.mounts if mount.mountpoint == mountpoint), None)
+        return mount.percent if mount is not None else 0.0
+
+    def get_mounts(self):
+        return self.filesystems.mounts
+
+    def get_disk_io(self):
+        # (read KB/s, write KB/s, read IOPS, write IOPS), whole disks only
+        return self.disk_io
+
+    def get_nic_rates(self):
+        return tuple(NicRate(name, sent / 1024, received / 1024)
+                     for name, (sent, received) in self.net_rates.rates.items())
+
+    def get_disk_rates(self):
+        return tuple(DiskRate(name, read_bytes / 1024, write_bytes / 1024, reads, writes)
+                     for name, (read_bytes, write_bytes, reads, writes) in self.disk_rates.rates.items())
+
+    def get_network_speeds(self):
+        return self.net_speeds
+
+    def get_cgroup(self):
+        # cgroups.CgroupUsage, or None when the host is accounted
+        return self.cgroup.usage() if self.cgroup is not None else None
+
+    def get_rolling_stats(self, window=None):
+        # {window: {column: RollingSummary}}, or {column: RollingSummary} for
+        # one of ROLLING_WINDOWS; columns are HISTORY_COLUMNS
+        summary = self.rolling.summary()
+        return summary if window is None else summary[window]
+
+    def history_source(self, time_range=None):
+        # The raw ring buffer, or the rollup tier backing a chart time range;
+        # returns (buffer, column name suffix)
+        tier = TIME_RANGES[time_range][1] if time_range else None
+        if tier is None:
+            return self.history, ''
+        return self.rollups[tier].history, '_avg'
+
+    def snapshot(self, time_range=None):
+        source, suffix = self.history_source(time_range)
+        used_gb, total_gb, ram_percent = self.get_ram_info()
+        gpu_percent, gpu_name = self.get_gpu_info()
+        upload_kb, download_kb = self.get_network_speeds()
+        read_kb, write_kb, read_iops, write_iops = self.get_disk_io()
+        return StatsSnapshot(
+            timestamp=self.timestamp,
+            cpu_percent=self.get_cpu_percent(),
+            ram_used_gb=used_gb,
+            ram_total_gb=total_gb,
+            ram_percent=ram_percent,
+            gpu_percent=gpu_percent,
+            gpu_name=gpu_name,
+            gpus=self.gpus,
+            disk_percent=self.get_disk_info(),
+            net_up_kb=upload_kb,
+            net_down_kb=download_kb,
+            disk_read_kb=read_kb,
+            disk_write_kb=write_kb,
+            disk_read_iops=read_iops,
+            disk_write_iops=write_iops,
+            mounts=self.get_mounts(),
+            nic_rates=self.get_nic_rates(),
+            disk_rates=self.get_disk_rates(),
+            cpu_history=source.frozen('cpu' + suffix),
+            ram_history=source.frozen('ram' + suffix),
+            gpu_history=source.frozen('gpu' + suffix),
+            net_up_history=source.frozen('net_up' + suffix),
+            net_down_history=source.frozen('net_down' + suffix),
+            disk_read_history=source.frozen('disk_read' + suffix),
+            disk_write_history=source.frozen('disk_write' + suffix),
+            history_timestamps=source.frozen('timestamp'),
+            per_core_history=self.per_core.frozen() if self.per_core is not None else None,
+            core_stats=self.per_core.stats() if self.per_core is not None else None,
+            process_count=self.processes.process_count if self.processes is not None else 0,
+            top_cpu_processes=tuple(self.processes.top_cpu) if self.processes is not None else (),
+            top_memory_processes=tuple(self.processes.top_memory) if self.processes is not None else (),
+            rolling=self.get_rolling_stats(),
+            cgroup=self.get_cgroup(),
+        )
+
+    def close(self):
+        if self.flight is not None:
+            self.flight.stop()
+        self.gpu.close()
+        if self.proc is not None:
+            self.proc.close()
 
     def format_network_speed(self, kb_s):
-        if kb_s >= 1024:
-            return f"{kb_s / 1024:.2f} MB/s"
-        else:
-            return f"{kb_s:.2f} KB/s"
+        return format_network_speed(kb_s)
+
+
+def format_network_speed(kb_s):
+    if kb_s >= 1024:
+        return f"{kb_s / 1024:.2f} MB/s"
+    else:
+        return f"{kb_s:.2f} KB/s"
@@ -0,0 +1,128 @@
+# tests/fakes.py
+#
+# Stand-ins shared by the tests and the benchmarks: a Tk root that only
+# queues idle callbacks, a chart manager that draws nothing, a deliberately
+# slow collector, the update logic of the real UI without widgets, and a
+# fake cgroup v2 tree stepped on a fake clock.
+
+import os
+import time
+
+from system_stats import SystemStats
+from ui import SystemMonitorUI
+
+SLOW_COLLECTOR_S = 0.5
+CGROUP_CHILDREN = 200
+GIB = 1024 ** 3
+
+
+class SlowSystemStats(SystemStats):
+    def _update_cpu(self):
+        time.sleep(SLOW_COLLECTOR_S)
+        return super()._update_cpu()
+
+
+class NullChartManager:
+    def set_time_range(self, time_range):
+        pass
+
+    def update_cpu_chart(self, data, timestamps=None):
+        pass
+
+    def update_ram_chart(self, data, timestamps=None):
+        pass
+
+    def update_gpu_chart(self, data, timestamps=None):
+        pass
+
+    def update_network_chart(self, up_data, down_data, timestamps=None):
+        pass
+
+    def update_disk_io_chart(self, read_data, write_data, timestamps=None):
+        pass
+
+    def update_heatmap_chart(self, matrix):
+        pass
+
+
+class IdleRoot:
+    # Collects idle callbacks; run_idle() plays Tk's idle loop
+    def __init__(self):
+        self.idle = []
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+    def run_idle(self):
+        while self.idle:
+            self.idle.pop(0)()
+
+
+def detached_ui(sampler, chart_manager=None, label=None):
+    # The real update and render code without widgets; label swaps in a
+    # label class that counts or records its updates
+    ui = SystemMonitorUI(IdleRoot(), sampler, chart_manager or NullChartManager(), build_widgets=False)
+    if label is not None:
+        ui.labels = {key: label() for key in ui.labels}
+    return ui
+
+
+def render(ui):
+    # One whole frame: the Tk callback plus the chart flush it schedules
+    ui.update_display()
+    ui.flush_charts()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='ascii') as cgroup_file:
+        cgroup_file.write(text)
+
+
+def build_cgroup_tree(base):
+    # A pod limited to 2 CPUs and 1 GiB with the container below it and
+    # CGROUP_CHILDREN child cgroups in the container; -> (root, container
+    # directory, fake /proc/self/cgroup, fake /sys/dev/block, a v2 root
+    # without limits)
+    root = os.path.join(base, 'cgroup')
+    _write(os.path.join(root, 'cgroup.controllers'), 'cpuset cpu io memory pids\n')
+    _write(os.path.join(root, 'cpu.stat'), 'usage_usec 900000000\n')
+    _write(os.path.join(root, 'kubepods', 'cpu.max'), '200000 100000\n')
+    _write(os.path.join(root, 'kubepods', 'memory.max'), f'{GIB}\n')
+    app = os.path.join(root, 'kubepods', 'app')
+    _write(os.path.join(app, 'cpu.max'), 'max 100000\n')
+    _write(os.path.join(app, 'memory.max'), 'max\n')
+    _write(os.path.join(app, 'cpu.stat'), 'usage_usec 5000000\nuser_usec 4000000\nsystem_usec 1000000\n')
+    _write(os.path.join(app, 'memory.current'), f'{600 * 1024 ** 2}\n')
+    _write(os.path.join(app, 'memory.stat'), f'anon 400000000\ninactive_file {88 * 1024 ** 2}\n')
+    _write(os.path.join(app, 'io.stat'), '8:0 rbytes=1048576 wbytes=2097152 rios=10 wios=20 dbytes=0 dios=0\n')
+    for index in range(CGROUP_CHILDREN):
+        child = os.path.join(app, f"svc-{index:03d}.service")
+        _write(os.path.join(child, 'cpu.stat'), 'usage_usec 0\n')
+        _write(os.path.join(child, 'memory.current'), f'{(index + 1) * 1024 ** 2}\n')
+    _write(os.path.join(base, 'proc', 'self', 'cgroup'), '0::/kubepods/app\n')
+    dev = os.path.join(base, 'dev', 'block')
+    os.makedirs(dev)
+    os.symlink('../../devices/pci0000:00/block/sda', os.path.join(dev, '8:0'))
+    plain = os.path.join(base, 'plain')
+    _write(os.path.join(plain, 'cgroup.controllers'), 'cpu memory\n')
+    _write(os.path.join(plain, 'user.slice', 'cpu.stat'), 'usage_usec 0\n')
+    return root, app, os.path.join(base, 'proc', 'self', 'cgroup'), dev, plain
+
+
+def add_cgroup_cpu(directory, usec):
+    # Charges usec more CPU time to the cgroup
+    path = os.path.join(directory, 'cpu.stat')
+    with open(path, encoding='ascii') as cgroup_file:
+        lines = cgroup_file.read().splitlines()
+    key, value = lines[0].split()
+    lines[0] = f"{key} {int(value) + usec}"
+    _write(path, '\n'.join(lines) + '\n')
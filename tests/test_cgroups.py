@@ -0,0 +1,128 @@
+# tests/test_cgroups.py
+#
+# cgroups.py on the fake cgroup v2 tree from tests/fakes.py (a
+# pod limited to 2 CPUs and 1 GiB with the container below it, 200 child
+# cgroups), stepped on a fake clock. The child scan cost is in the
+# benchmark.
+
+import os
+import shutil
+
+import pytest
+
+from cgroups import CgroupStats, ChildScanner, find_cgroup, open_cgroup, parse_cpuset
+from system_stats import SystemStats
+from tests.fakes import CGROUP_CHILDREN as CHILDREN, GIB, FakeClock, add_cgroup_cpu, build_cgroup_tree
+from constants import CGROUP_SCAN_BATCH, CGROUP_RESCAN
+
+
+@pytest.fixture
+def tree(tmp_path):
+    # -> (root, app directory, fake /proc/self/cgroup, fake /sys/dev/block, a v2 root without limits)
+    return build_cgroup_tree(str(tmp_path))
+
+
+@pytest.fixture
+def app_stats(tree):
+    root, _, self_cgroup, dev, _ = tree
+    clock = FakeClock()
+    return CgroupStats(root, find_cgroup(root, self_cgroup), cpu_count=16, sys_dev_block=dev, clock=clock), clock
+
+
+def _system_stats(cgroup):
+    return SystemStats(max_history=1, per_core_history=0, top_processes=0, gpu_provider='none', cgroup=cgroup)
+
+
+def test_detection(tree, tmp_path):
+    root, _, self_cgroup, _, plain = tree
+    assert find_cgroup(root, self_cgroup) == 'kubepods/app'
+    assert open_cgroup('auto', root=root, proc_self_cgroup=self_cgroup) is not None
+    # Unlimited: left alone unless forced; not v2 at all: nothing
+    assert open_cgroup('auto', path='user.slice', root=plain) is None
+    assert open_cgroup('on', path='user.slice', root=plain) is not None
+    assert open_cgroup('auto', root=str(tmp_path / 'proc')) is None
+    assert open_cgroup('off', root=root, proc_self_cgroup=self_cgroup) is None
+
+
+def test_limits_come_from_the_pod(app_stats):
+    stats, _ = app_stats
+    assert stats.cpu_limit == 2.0
+    assert stats.memory_limit == GIB
+    assert stats.limited()
+    assert parse_cpuset('0-3,6') == 5
+
+
+def test_usage(tree, app_stats):
+    _, app, _, _, _ = tree
+    stats, clock = app_stats
+    assert stats.cpu_percent() == 0.0
+    clock.now += 1.0
+    add_cgroup_cpu(app, 1500000)
+    # 1.5 s of CPU in 1 s against a 2 CPU quota
+    assert stats.cpu_percent() == 75.0
+    # memory.current less inactive_file
+    assert stats.memory_used() == 512 * 1024 ** 2
+    io = stats.io_counters()
+    assert set(io) == {'sda'}
+    assert tuple(io['sda']) == (10, 20, 1048576, 2097152)
+
+
+def test_system_stats_reports_the_cgroup(tree, app_stats):
+    _, app, _, _, _ = tree
+    stats, clock = app_stats
+    stats.cpu_percent()
+    system = _system_stats(stats)
+    try:
+        clock.now += 1.0
+        add_cgroup_cpu(app, 500000)
+        system._update_cpu()
+        system._update_ram()
+        snapshot = system.snapshot()
+    finally:
+        system.close()
+    assert snapshot.cpu_percent == 25.0
+    assert snapshot.ram_total_gb == 1.0
+    assert snapshot.ram_used_gb == 512 / 1024
+    assert snapshot.cgroup.path == '/kubepods/app'
+
+
+def test_missing_controllers_fall_back_to_the_host(tree, app_stats, capsys):
+    _, app, _, _, _ = tree
+    stats, _ = app_stats
+    system = _system_stats(stats)
+    try:
+        os.remove(os.path.join(app, 'io.stat'))
+        os.remove(os.path.join(app, 'cpu.stat'))
+        for _ in range(3):
+            system._update_cpu()
+            system._update_disk_io()
+    finally:
+        system.close()
+    output = capsys.readouterr().out
+    # Reported once each, not every tick
+    assert output.count('Cgroup CPU error') == 1
+    assert output.count('Cgroup disk I/O error') == 1
+    assert 'Disk I/O error' not in output
+    assert 0.0 <= system.cpu_percent <= 100.0
+
+
+def test_children_are_read_in_batches(tree, app_stats):
+    _, app, _, _, _ = tree
+    stats, clock = app_stats
+    scanner = ChildScanner(app, stats.cpu_limit, clock=clock)
+    busy = os.path.join(app, 'svc-123.service')
+    updates = CHILDREN // CGROUP_SCAN_BATCH * 2
+    for _ in range(updates):
+        clock.now += 1.0
+        add_cgroup_cpu(busy, 500000)
+        scanner.update()
+    assert scanner.reads == updates * CGROUP_SCAN_BATCH
+    assert len(scanner.usage) == CHILDREN
+    assert scanner.top[0].name == 'svc-123.service' and scanner.top[0].cpu_percent > 0
+    assert scanner.usage['svc-009.service'].memory_bytes == 10 * 1024 ** 2
+
+    shutil.rmtree(os.path.join(app, 'svc-000.service'))
+    clock.now += CGROUP_RESCAN
+    scanner.update()
+    assert 'svc-000.service' not in scanner.usage
+    assert len(scanner.names) == CHILDREN - 1
@@ -0,0 +1,155 @@
+# tests/test_exporter.py
+#
+# The exporter on localhost, as bench_exporter.py scrapes it: every scrape
+# of a sample gets the same bytes from one serialization, and /history
+# answers from the on-disk store when there is one. Latency is in the
+# benchmark.
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from exporter import MetricsExporter, render_metrics
+from gpu import GpuReading
+from system_stats import SystemStats
+from tsdb import TimeSeriesStore
+
+
+@pytest.fixture(scope='module')
+def snapshot():
+    stats = SystemStats(max_history=10, per_core_history=10, top_processes=0, gpu_provider='fake')
+    for _ in range(3):
+        stats.update()
+    yield stats.snapshot()
+    stats.close()
+
+
+def _start(store=None):
+    exporter = MetricsExporter(0, store=store)
+    exporter.start()
+    return exporter
+
+
+def _get(exporter, path):
+    # -> (status, content type, body)
+    try:
+        with urllib.request.urlopen(f"http://{exporter.host}:{exporter.port}{path}") as response:
+            return response.status, response.headers['Content-Type'], response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers['Content-Type'], e.read()
+
+
+def test_no_sample_yet_and_unknown_paths():
+    exporter = _start()
+    try:
+        assert _get(exporter, '/metrics')[0] == 503
+        assert _get(exporter, '/nothing')[0] == 404
+    finally:
+        exporter.stop()
+
+
+def test_concurrent_scrapes_share_one_serialization(snapshot):
+    exporter = _start()
+    try:
+        exporter.publish(snapshot)
+        results = []
+        threads = [threading.Thread(target=lambda: results.extend(_get(exporter, '/metrics') for _ in range(10)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        exporter.stop()
+    assert len(results) == 40
+    assert all(result == results[0] for result in results)
+    status, content_type, body = results[0]
+    assert status == 200 and content_type.startswith('text/plain; version=0.0.4')
+    assert f"cpu_percent {snapshot.cpu_percent}" in body.decode('utf-8')
+    assert exporter.builds == 1
+
+
+def test_new_sample_is_serialized_again(snapshot):
+    exporter = _start()
+    try:
+        exporter.publish(snapshot)
+        _get(exporter, '/history')
+        exporter.publish(snapshot._replace(cpu_percent=42.0))
+        body = _get(exporter, '/metrics')[2].decode('utf-8')
+    finally:
+        exporter.stop()
+    assert 'cpu_percent 42.0' in body
+    assert exporter.builds == 2
+
+
+def test_history_from_the_snapshot(snapshot):
+    exporter = _start()
+    try:
+        exporter.publish(snapshot)
+        status, content_type, body = _get(exporter, '/history')
+    finally:
+        exporter.stop()
+    history = json.loads(body)
+    assert status == 200 and content_type == 'application/json'
+    assert history['timestamps'] == list(snapshot.history_timestamps)
+    assert history['cpu'] == list(snapshot.cpu_history)
+
+
+def test_history_from_the_store(tmp_path, snapshot):
+    store = TimeSeriesStore(str(tmp_path), ('cpu', 'ram'))
+    now = time.time()
+    for second in range(30):
+        store.append(now - 29.75 + second, cpu=second, ram=50.0)
+    store.flush()
+    exporter = _start(store.reader())
+    try:
+        exporter.publish(snapshot)
+        history = json.loads(_get(exporter, '/history?seconds=10.5')[2])
+        everything = json.loads(_get(exporter, '/history?seconds=1e300')[2])
+        bad = [_get(exporter, f"/history?seconds={value}")[0] for value in ('soon', 'inf', 'nan', '-5', '0')]
+    finally:
+        exporter.stop()
+        store.close()
+    assert history['cpu'] == [float(second) for second in range(20, 30)]
+    assert len(history['timestamps']) == 10 and set(history['ram']) == {50.0}
+    # Capped at the retention window rather than overflowing
+    assert len(everything['cpu']) == 30
+    assert bad == [400] * 5
+
+
+def test_publish_does_not_wait_for_a_render(snapshot, monkeypatch):
+    import exporter as exporter_module
+    rendering = threading.Event()
+    release = threading.Event()
+
+    def slow_render(snapshot):
+        rendering.set()
+        release.wait(5)
+        return b'slow\n'
+
+    monkeypatch.setitem(exporter_module.RENDERERS, '/metrics', (slow_render, 'text/plain'))
+    exporter = MetricsExporter(0)
+    exporter.publish(snapshot)
+    scrape = threading.Thread(target=exporter.payload, args=('/metrics',))
+    scrape.start()
+    try:
+        assert rendering.wait(5)
+        start = time.perf_counter()
+        exporter.publish(snapshot._replace(cpu_percent=1.0))
+        assert time.perf_counter() - start < 0.1
+    finally:
+        release.set()
+        scrape.join()
+    # Rendered from the older sample, so not kept for the new one
+    assert exporter._payloads == {}
+
+
+def test_gpu_without_temperature(snapshot):
+    gpus = (GpuReading(0, 'A', 10.0, 1.0, 2.0, 55.0), GpuReading(1, 'B', 20.0, 1.0, 2.0, None))
+    body = render_metrics(snapshot._replace(gpus=gpus)).decode('utf-8')
+    assert 'gpu_temperature_celsius{gpu="0",name="A"} 55.0' in body
+    assert 'gpu="1"' in body and 'gpu_temperature_celsius{gpu="1"' not in body
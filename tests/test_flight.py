@@ -0,0 +1,57 @@
+# tests/test_flight.py
+#
+# The flight recorder times rates and captures on the monotonic clock: a
+# wall-clock step (NTP) shows in the stored timestamps only.
+
+import pytest
+
+from flight import FlightRecorder
+
+RATE = 20
+PRE = 2
+POST = 2
+
+
+def _counters(spike_at, wall_step_at, wall_step):
+    # read() replacement: a steady 10% CPU and 100 KB/s received with a
+    # CPU spike at spike_at; the wall clock jumps by wall_step at
+    # wall_step_at (both in seconds of monotonic time)
+    interval = 1.0 / RATE
+    state = {'monotonic': 500.0, 'busy': 0.0, 'total': 0.0, 'received': 0}
+    start = state['monotonic']
+
+    def read():
+        monotonic = state['monotonic'] = state['monotonic'] + interval
+        offset = monotonic - start
+        wall = 1_700_000_000.0 + offset + (wall_step if offset >= wall_step_at else 0.0)
+        cpu = 90 if spike_at <= offset < spike_at + 0.2 else 10
+        state['busy'] += cpu / 100 * interval
+        state['total'] += interval
+        state['received'] += int(100 * 1024 * interval)
+        return wall, monotonic, state['busy'], state['total'], 0, state['received'], 0, 0
+
+    return read
+
+
+def _record(wall_step_at, wall_step):
+    recorder = FlightRecorder(rate=RATE, pre_seconds=PRE, post_seconds=POST, read=_counters(5.0, wall_step_at,
+                                                                                            wall_step))
+    for _ in range(10 * RATE):
+        recorder.step()
+    assert len(recorder.captures) == 1
+    return recorder.captures[0]
+
+
+@pytest.mark.parametrize('wall_step', [-30.0, 30.0])
+def test_wall_clock_step_leaves_rates_and_length_alone(wall_step):
+    steady = _record(wall_step_at=1000.0, wall_step=0.0)
+    # Steps back and forward after the trigger, inside the post window
+    stepped = _record(wall_step_at=6.0, wall_step=wall_step)
+
+    assert len(stepped.samples) == len(steady.samples)
+    assert len(stepped.samples) / RATE == pytest.approx(PRE + POST, abs=2.0 / RATE)
+    for stepped_sample, steady_sample in zip(stepped.samples, steady.samples):
+        assert stepped_sample[1:] == pytest.approx(steady_sample[1:])
+    # Only the stored timestamps carry the step
+    assert stepped.samples[-1][0] - steady.samples[-1][0] == pytest.approx(wall_step)
+    assert stepped.trigger_time == steady.trigger_time
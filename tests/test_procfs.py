@@ -0,0 +1,110 @@
+# tests/test_procfs.py
+#
+# procfs.py on the recorded /proc snapshots in benchmarks/fixtures/proc (two
+# per machine a moment apart): psutil is pointed at the same files through
+# psutil.PROCFS_PATH and both must agree. Timing is in benchmarks/bench_procfs.py.
+
+import os
+import sys
+
+import psutil
+import pytest
+
+from procfs import ProcFile, ProcStats, open_procfs, cpu_percents, parse_cpu_times, parse_meminfo, parse_diskstats
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures', 'proc')
+MACHINES = ('vm', 'desktop')
+
+# psutil only reads PROCFS_PATH on Linux
+linux_only = pytest.mark.skipif(not sys.platform.startswith('linux'), reason='psutil reads /proc only on Linux')
+
+
+@pytest.fixture
+def fixture_pair(request):
+    first, second = (os.path.join(FIXTURES, f"{request.param}-{index}") for index in (1, 2))
+    procs = [ProcStats(first), ProcStats(second)]
+    saved = psutil.PROCFS_PATH
+    yield first, second, procs
+    psutil.PROCFS_PATH = saved
+    for proc in procs:
+        proc.close()
+
+
+@linux_only
+@pytest.mark.parametrize('fixture_pair', MACHINES, indirect=True)
+def test_cpu_matches_psutil(fixture_pair):
+    first, second, procs = fixture_pair
+    psutil.PROCFS_PATH = first
+    psutil.cpu_percent(interval=None)
+    psutil.cpu_percent(interval=None, percpu=True)
+    psutil.PROCFS_PATH = second
+    expected = [psutil.cpu_percent(interval=None)] + psutil.cpu_percent(interval=None, percpu=True)
+    cpu = cpu_percents(parse_cpu_times(procs[0].files['stat'].read()), procs[1].cpu_times())
+    # psutil works in seconds (jiffies / CLK_TCK), so the last digit may round the other way
+    assert cpu == pytest.approx(expected, abs=0.1)
+
+
+@linux_only
+@pytest.mark.parametrize('fixture_pair', MACHINES, indirect=True)
+def test_memory_matches_psutil(fixture_pair):
+    _, second, procs = fixture_pair
+    psutil.PROCFS_PATH = second
+    memory = psutil.virtual_memory()
+    ours = procs[1].virtual_memory()
+    assert (ours.total, ours.available, ours.used, ours.percent) == \
+        (memory.total, memory.available, memory.used, memory.percent)
+
+
+@linux_only
+@pytest.mark.parametrize('fixture_pair', MACHINES, indirect=True)
+def test_counters_match_psutil(fixture_pair):
+    _, second, procs = fixture_pair
+    psutil.PROCFS_PATH = second
+    nics = psutil.net_io_counters(pernic=True)
+    disks = psutil.disk_io_counters(perdisk=True)
+    assert {name: tuple(counters) for name, counters in procs[1].net_io_counters().items()} == \
+        {name: (counters.bytes_sent, counters.bytes_recv) for name, counters in nics.items()}
+    fields = ('read_count', 'write_count', 'read_bytes', 'write_bytes')
+    assert {name: tuple(counters) for name, counters in procs[1].disk_io_counters().items()} == \
+        {name: tuple(getattr(counters, field) for field in fields) for name, counters in disks.items()}
+
+
+def test_first_cpu_reading_is_zero():
+    proc = ProcStats(os.path.join(FIXTURES, 'vm-1'))
+    try:
+        assert proc.cpu_percent() == 0.0
+        assert set(proc.cpu_percent(percpu=True)) == {0.0}
+    finally:
+        proc.close()
+
+
+def test_meminfo_without_memavailable():
+    # Kernels before 3.14: free + buffers + cached
+    data = b'MemTotal: 1000 kB\nMemFree: 100 kB\nBuffers: 50 kB\nCached: 250 kB\n'
+    memory = parse_meminfo(data)
+    assert memory.total == 1000 * 1024
+    assert memory.available == 400 * 1024
+    assert memory.used == 600 * 1024
+    assert memory.percent == 60.0
+
+
+def test_diskstats_old_partition_lines():
+    data = (b'   8       0 sda 10 0 80 5 20 0 160 9 0 14 14\n'
+            b'   8       1 sda1 4 16 6 24\n')
+    counters = parse_diskstats(data)
+    assert tuple(counters['sda']) == (10, 20, 80 * 512, 160 * 512)
+    assert tuple(counters['sda1']) == (4, 6, 16 * 512, 24 * 512)
+
+
+def test_proc_file_grows_its_buffer():
+    path = os.path.join(FIXTURES, 'desktop-1', 'stat')
+    proc_file = ProcFile(path, size=16)
+    try:
+        with open(path, 'rb') as stat_file:
+            assert proc_file.read() == stat_file.read()
+    finally:
+        proc_file.close()
+
+
+def test_open_procfs_without_proc(tmp_path):
+    assert open_procfs(str(tmp_path)) is None
@@ -0,0 +1,84 @@
+# tests/test_replay.py
+#
+# Recording and playing back traces: a trace round-trips through a file,
+# and a missing or damaged file ends playback instead of leaving the
+# window waiting for a sample.
+
+import pytest
+
+import main
+from replay import (Recorder, ReplayError, ReplaySampler, ReplayStats, RECORDED_FIELDS, check_file, read_frames,
+                    synthetic_frames)
+from system_stats import SystemStats
+
+
+@pytest.fixture
+def trace(tmp_path):
+    path = str(tmp_path / 'trace.rpl')
+    recorder = Recorder(path)
+    for frame in synthetic_frames(seconds=2, rate=10, cores=4, start=1000.0):
+        recorder.record_frame(frame)
+    recorder.close()
+    return path
+
+
+def test_trace_plays_back(trace):
+    stats = ReplayStats(max_history=60)
+    sampler = ReplaySampler(stats, read_frames(trace), speed=0)
+    sampler.start()
+    try:
+        assert sampler.finished.wait(5)
+    finally:
+        sampler.stop()
+    snapshot = sampler.latest()
+    assert sampler.frames_played == 20
+    assert snapshot.timestamp == pytest.approx(1001.9)
+    assert len(snapshot.cpu_history) == 20
+
+
+def test_replay_stats_has_what_system_stats_has():
+    # Built through SystemStats.__init__, so attributes added there reach replay
+    replay = vars(ReplayStats(max_history=10))
+    live = SystemStats(max_history=10, per_core_history=0, top_processes=0, gpu_provider='none')
+    try:
+        assert set(vars(live)) <= set(replay)
+    finally:
+        live.close()
+    assert replay['cgroup'] is None and replay['proc'] is None
+
+
+@pytest.mark.parametrize('speed', [0, 1.0])
+def test_missing_file_finishes_playback(tmp_path, speed):
+    sampler = ReplaySampler(ReplayStats(), read_frames(str(tmp_path / 'missing.rpl')), speed=speed)
+    sampler.start()
+    try:
+        assert sampler.finished.wait(5)
+    finally:
+        sampler.stop()
+    assert sampler.latest() is None
+
+
+def test_damaged_files_are_refused(tmp_path, trace):
+    foreign = tmp_path / 'foreign.rpl'
+    foreign.write_bytes(b'not a replay file at all')
+    with pytest.raises(ReplayError):
+        check_file(str(foreign))
+    with pytest.raises(OSError):
+        check_file(str(tmp_path / 'missing.rpl'))
+    check_file(trace)
+    with pytest.raises(SystemExit):
+        main.parse_args(['--replay', str(foreign)])
+    assert main.parse_args(['--replay', trace]).replay == trace
+
+
+def test_info_reports_errors(tmp_path, trace, capsys):
+    from replay import main as replay_main
+    assert replay_main(['info', trace]) == 0
+    assert '20 frames over 1.9 s' in capsys.readouterr().out
+    assert replay_main(['info', str(tmp_path / 'missing.rpl')]) == 1
+    assert 'ERROR' in capsys.readouterr().out
+
+
+def test_frames_keep_the_recorded_fields(trace):
+    frame = next(read_frames(trace))
+    assert set(frame) == set(RECORDED_FIELDS)
@@ -0,0 +1,116 @@
+# tests/test_sampler.py
+#
+# The Tk update callback against the Sampler thread, on the UI built
+# without widgets (no display needed): it only reads the latest snapshot,
+# relabels what changed and leaves the charts to idle time.
+
+import time
+
+from sampler import Sampler, advance_deadline
+from system_stats import SystemStats
+from ui import SystemMonitorUI
+from tests.fakes import IdleRoot, NullChartManager, SlowSystemStats, SLOW_COLLECTOR_S, detached_ui
+from constants import TOP_PROCESSES
+
+# What the Tk callback may take, as in benchmarks/bench_sampler.py
+CALLBACK_BUDGET_MS = 5.0
+
+
+class RecordingLabel:
+    def __init__(self):
+        self.texts = []
+
+    def config(self, **kwargs):
+        self.texts.append(kwargs['text'])
+
+
+class RecordingChartManager(NullChartManager):
+    def __init__(self):
+        self.calls = []
+
+    def update_cpu_chart(self, data, timestamps=None):
+        self.calls.append('update_cpu_chart')
+
+
+def _stats():
+    return SystemStats(max_history=10, per_core_history=0, top_processes=0, gpu_provider='none')
+
+
+def test_update_display_does_not_wait_for_a_slow_collector():
+    sampler = Sampler(SlowSystemStats(max_history=10, per_core_history=0, gpu_provider='none'), interval=0.1)
+    ui = detached_ui(sampler, NullChartManager())
+    sampler.start()
+    timings = []
+    rendered = 0
+    try:
+        deadline = time.monotonic() + SLOW_COLLECTOR_S * 3
+        while time.monotonic() < deadline:
+            shown = ui._last_snapshot
+            start = time.perf_counter()
+            ui.update_display()
+            timings.append((time.perf_counter() - start) * 1000)
+            rendered += ui._last_snapshot is not shown
+            time.sleep(0.01)
+    finally:
+        sampler.stop()
+        sampler.stats_manager.close()
+    timings.sort()
+    # Every collector pass sleeps SLOW_COLLECTOR_S; a callback that sampled
+    # inline would take that long
+    assert rendered >= 2
+    assert timings[len(timings) // 2] < 1.0
+    assert timings[int(len(timings) * 0.95)] < CALLBACK_BUDGET_MS
+
+
+def test_labels_show_the_latest_snapshot_once():
+    sampler = Sampler(_stats())
+    ui = detached_ui(sampler, NullChartManager(), label=RecordingLabel)
+    try:
+        ui.update_display()
+        assert not ui.labels['cpu_label'].texts
+        snapshot = sampler.sample_once()
+        ui.update_display()
+        assert ui.labels['cpu_label'].texts == [f"CPU: {snapshot.cpu_percent:.1f}%"]
+        assert ui.labels['disk_label'].texts[-1].startswith('Disk: ')
+        # Same snapshot again: nothing is reconfigured
+        ui.update_display()
+        assert len(ui.labels['cpu_label'].texts) == 1
+    finally:
+        sampler.stats_manager.close()
+
+
+def test_charts_are_drawn_in_idle_time():
+    sampler = Sampler(_stats())
+    charts = RecordingChartManager()
+    ui = detached_ui(sampler, charts)
+    try:
+        sampler.sample_once()
+        ui.update_display()
+        sampler.sample_once()
+        ui.update_display()
+        # Queued, not drawn, and the newer update replaced the older one
+        assert charts.calls == []
+        assert len(ui.root.idle) == 1
+        ui.root.run_idle()
+        assert charts.calls == ['update_cpu_chart']
+    finally:
+        sampler.stats_manager.close()
+
+
+def test_advance_deadline_skips_missed_ticks():
+    assert advance_deadline(10.0, 1.0, 10.5) == 11.0
+    # A collector that took 3.5 intervals: the next tick is on the grid after now
+    assert advance_deadline(10.0, 1.0, 14.5) == 15.0
+
+
+def test_detached_ui_fills_its_tables():
+    sampler = Sampler(_stats())
+    ui = SystemMonitorUI(IdleRoot(), sampler, NullChartManager(), build_widgets=False)
+    try:
+        sampler.sample_once()
+        ui.update_display()
+    finally:
+        sampler.stats_manager.close()
+    assert len(ui.process_table.rows) == TOP_PROCESSES
+    assert ui.labels['processes_label'].options['text'].startswith('Processes: ')
+    assert 'cgroups_label' not in ui.labels
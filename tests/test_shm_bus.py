@@ -0,0 +1,76 @@
+# tests/test_shm_bus.py
+#
+# The shared-memory sample bus: frames too big for a slot are trimmed (or
+# skipped) without the writer looking dead to readers.
+
+import os
+
+import pytest
+
+import shm_bus
+from io_rates import MountUsage
+from shm_bus import SampleBus, SharedStats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def bus_name():
+    name = f"systemmonitor-test-{os.getpid()}"
+    yield name
+    try:
+        SampleBus(name, create=False).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _many_mounts(snapshot):
+    return snapshot._replace(mounts=tuple(MountUsage(f"/mnt/a/long/mount/point/{index}", '/dev/x', 'ext4',
+                                                     1.0, 0.5, 50.0) for index in range(200)))
+
+
+def _writer(name, clock):
+    stats = SharedStats(name, max_history=5, gpu_provider='none', clock=clock)
+    stats.update()
+    assert stats.writer
+    return stats
+
+
+def test_oversized_sample_is_trimmed(bus_name):
+    clock = FakeClock()
+    stats = _writer(bus_name, clock)
+    try:
+        source = stats.source.snapshot
+        stats.source.snapshot = lambda time_range=None: _many_mounts(source())
+        head = stats.bus.head
+        stats.update()
+        payload = stats.bus.read(head)
+    finally:
+        stats.close()
+    assert payload is not None and len(payload) <= stats.bus.capacity
+    assert stats.trimmed == 1 and stats.unpublished == 0
+    assert stats.get_mounts() == ()
+
+
+def test_skipped_sample_still_heartbeats(bus_name, monkeypatch):
+    clock = FakeClock()
+    stats = _writer(bus_name, clock)
+    try:
+        # Trimmed and still over the slot (padded with JSON whitespace)
+        monkeypatch.setattr(shm_bus, '_fit', lambda snapshot, capacity:
+                            (shm_bus._encode(snapshot).ljust(capacity + 1), True))
+        head = stats.bus.head
+        clock.now += 60.0
+        stats.update()
+        assert stats.unpublished == 1 and stats.bus.head == head
+        # Readers still see a live writer
+        assert stats.bus.owner()[1] == clock.now
+        assert stats.bus.writer_alive(clock.now)
+    finally:
+        stats.close()
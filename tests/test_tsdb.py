@@ -0,0 +1,51 @@
+# tests/test_tsdb.py
+#
+# The on-disk store writes a short block once buffered rows get old, so
+# readers (and a crash) trail the writer by seconds, not a full block.
+
+from tests.fakes import FakeClock
+from tsdb import TimeSeriesStore, _decode_segment_header, _scan_blocks, _segment_names
+
+START = 1_700_000_000.0
+
+
+def _blocks(directory, name):
+    with open(f"{directory}/{name}", 'rb') as segment_file:
+        data = segment_file.read()
+    _, _, offset = _decode_segment_header(data)
+    return [block[3] for block in _scan_blocks(data, offset, len(data), verify=True)[0]]
+
+
+def test_readers_see_rows_after_flush_seconds(tmp_path):
+    clock = FakeClock()
+    store = TimeSeriesStore(str(tmp_path), ('cpu',), block_rows=60, flush_seconds=5, clock=clock)
+    reader = store.reader()
+    seen = []
+    for second in range(12):
+        store.append(START + second, cpu=second)
+        seen.append(len(reader.query('cpu')[1]))
+        clock.now += 1
+    reader.close()
+    # Nothing until the first row is 5 s old, then a short block per 5 s
+    assert seen == [0] * 5 + [6] * 6 + [12]
+    # No close(): what a crash would leave behind
+    second_reader = store.reader()
+    timestamps, values = second_reader.query('cpu')
+    second_reader.close()
+    store.close()
+    assert list(values) == [float(second) for second in range(12)]
+    assert timestamps[-1] == START + 11
+
+
+def test_compaction_merges_the_short_blocks(tmp_path):
+    clock = FakeClock()
+    store = TimeSeriesStore(str(tmp_path), ('cpu',), block_rows=60, segment_seconds=3600, flush_seconds=5,
+                            clock=clock)
+    for second in range(3600 + 1):
+        store.append(START + second, cpu=50.0)
+        clock.now += 1
+    store.close()
+    closed, active = _segment_names(str(tmp_path))
+    # Rolling to a new segment rewrote the closed one into full blocks
+    assert _blocks(tmp_path, closed) == [60] * 60
+    assert sum(_blocks(tmp_path, active)) == 1
@@ -0,0 +1,477 @@
+# tsdb.py
+#
+# Append-only, segment-based on-disk store for SystemStats samples.
+#
+# A store is a directory of segment files. Each file holds up to
+# segment_seconds of samples and is named after its first timestamp in ms.
+# A segment is a header followed by self-contained blocks:
+#
+#   block header  <4sHIqqI  magic, rows, payload bytes, first/last ts (ms), crc32
+#   payload       per column: <qcI base value, array typecode, byte length,
+#                 followed by the fixed-point deltas in the narrowest integer
+#                 type that holds them
+#
+# Readers memory-map segments and keep a per-segment index of block time
+# ranges, so a range query bisects straight to the first relevant block and
+# decodes only the timestamp column and the requested one.
+#
+# A block only counts once its CRC matches. A crash mid-append leaves at most
+# one torn block at the end of the active segment; the writer truncates it on
+# open and readers skip it.
+
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SEGMENT_MAGIC = b'SMTS'
+BLOCK_MAGIC = b'SMBK'
+VERSION = 1
+SEGMENT_SUFFIX = '.seg'
+LOCK_NAME = 'writer.lock'
+# Default age after which closed segments are dropped
+RETENTION_SECONDS = 7 * 24 * 3600
+# Default longest time a row waits in memory before its block is written
+FLUSH_SECONDS = 5
+
+SEGMENT_HEADER = struct.Struct('<4sHIH')  # magic, version, value scale, column names length
+BLOCK_HEADER = struct.Struct('<4sHIqqI')
+COLUMN_HEADER = struct.Struct('<qcI')
+
+DELTA_TYPECODES = ('b', 'h', 'i', 'q')
+SWAP_BYTES = sys.byteorder != 'little'
+
+# Columns recorded from a StatsSnapshot, and the snapshot field each comes from
+STORE_COLUMNS = {
+    'cpu': 'cpu_percent',
+    'ram': 'ram_percent',
+    'gpu': 'gpu_percent',
+    'disk': 'disk_percent',
+    'net_up': 'net_up_kb',
+    'net_down': 'net_down_kb',
+    'disk_read': 'disk_read_kb',
+    'disk_write': 'disk_write_kb',
+}
+
+
+class StoreError(Exception):
+    pass
+
+
+class TruncatedSegmentError(StoreError):
+    pass
+
+
+def _encode_column(values):
+    deltas = [b - a for a, b in zip(values, values[1:])]
+    low = min(deltas, default=0)
+    high = max(deltas, default=0)
+    for typecode in DELTA_TYPECODES:
+        limit = 1 << (array(typecode).itemsize * 8 - 1)
+        if -limit <= low and high < limit:
+            break
+    packed = array(typecode, deltas)
+    if SWAP_BYTES:
+        packed.byteswap()
+    raw = packed.tobytes()
+    return COLUMN_HEADER.pack(values[0], typecode.encode(), len(raw)) + raw
+
+
+def _decode_column(buffer, offset):
+    base, typecode, length = COLUMN_HEADER.unpack_from(buffer, offset)
+    offset += COLUMN_HEADER.size
+    deltas = array(typecode.decode())
+    deltas.frombytes(buffer[offset:offset + length])
+    if SWAP_BYTES:
+        deltas.byteswap()
+    return accumulate(deltas, initial=base), offset + length
+
+
+def _skip_column(buffer, offset):
+    length = COLUMN_HEADER.unpack_from(buffer, offset)[2]
+    return offset + COLUMN_HEADER.size + length
+
+
+def _encode_block(rows):
+    payload = b''.join(_encode_column(column) for column in zip(*rows))
+    return BLOCK_HEADER.pack(BLOCK_MAGIC, len(rows), len(payload), rows[0][0], rows[-1][0],
+                             zlib.crc32(payload)) + payload
+
+
+def _encode_segment_header(columns, scale):
+    names = ','.join(columns).encode('utf-8')
+    return SEGMENT_HEADER.pack(SEGMENT_MAGIC, VERSION, scale, len(names)) + names
+
+
+def _decode_segment_header(buffer):
+    if len(buffer) < SEGMENT_HEADER.size:
+        raise TruncatedSegmentError("truncated segment header")
+    magic, version, scale, names_length = SEGMENT_HEADER.unpack_from(buffer, 0)
+    if magic != SEGMENT_MAGIC or version != VERSION:
+        raise StoreError("not a segment file")
+    end = SEGMENT_HEADER.size + names_length
+    if len(buffer) < end:
+        raise TruncatedSegmentError("truncated segment header")
+    columns = tuple(bytes(buffer[SEGMENT_HEADER.size:end]).decode('utf-8').split(','))
+    return columns, scale, end
+
+
+def _scan_blocks(buffer, offset, end, verify):
+    blocks = []
+    while offset + BLOCK_HEADER.size <= end:
+        magic, rows, length, first, last, crc = BLOCK_HEADER.unpack_from(buffer, offset)
+        payload = offset + BLOCK_HEADER.size
+        if magic != BLOCK_MAGIC or payload + length > end:
+            break
+        if verify and zlib.crc32(buffer[payload:payload + length]) != crc:
+            break
+        blocks.append((first, last, offset, rows))
+        offset = payload + length
+    return blocks, offset
+
+
+def _segment_names(directory):
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)]
+    except FileNotFoundError:
+        return []
+    return sorted(names, key=_segment_start)
+
+
+def _segment_start(name):
+    return int(name[:-len(SEGMENT_SUFFIX)])
+
+
+def _segment_name(start_ms):
+    return f"{start_ms:016d}{SEGMENT_SUFFIX}"
+
+
+class _MappedSegment:
+    # Read-only, memory-mapped view of one segment file plus its block index.
+    # Grows incrementally while the writer appends to it.
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        stat = os.fstat(self._file.fileno())
+        self.inode = (stat.st_dev, stat.st_ino)
+        self._map = None
+        self.size = 0
+        self.columns = ()
+        self.scale = 1
+        self.firsts = []
+        self.lasts = []
+        self.offsets = []
+        self._scanned = 0
+        self.refresh()
+
+    def refresh(self):
+        size = os.fstat(self._file.fileno()).st_size
+        if size == self.size:
+            return
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.size = size
+        if self._map is None:
+            return
+        if not self._scanned:
+            try:
+                self.columns, self.scale, self._scanned = _decode_segment_header(self._map)
+            except StoreError:
+                self._scanned = 0
+                return
+        blocks, self._scanned = _scan_blocks(self._map, self._scanned, size, verify=False)
+        for first, last, offset, rows in blocks:
+            self.firsts.append(first)
+            self.lasts.append(last)
+            self.offsets.append(offset)
+
+    def read_block(self, index, column_index):
+        # Returns (timestamps_ms, values) as iterables, or None if the block is torn
+        buffer = self._map
+        offset = self.offsets[index]
+        _, _, length, _, _, crc = BLOCK_HEADER.unpack_from(buffer, offset)
+        payload = offset + BLOCK_HEADER.size
+        if zlib.crc32(buffer[payload:payload + length]) != crc:
+            return None
+        timestamps, offset = _decode_column(buffer, payload)
+        for _ in range(column_index):
+            offset = _skip_column(buffer, offset)
+        values, _ = _decode_column(buffer, offset)
+        return timestamps, values
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+
+class TimeSeriesReader:
+    # Readers never write or lock, so any number of them can run next to the
+    # writer (the UI, an exporter, another process).
+    def __init__(self, directory):
+        self.directory = directory
+        self._segments = {}
+
+    def _segment(self, name):
+        path = os.path.join(self.directory, name)
+        segment = self._segments.get(name)
+        if segment is not None:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                segment.close()
+                del self._segments[name]
+                return None
+            if (stat.st_dev, stat.st_ino) != segment.inode:
+                # Replaced by compaction
+                segment.close()
+                segment = None
+        if segment is None:
+            try:
+                segment = _MappedSegment(path)
+            except FileNotFoundError:
+                return None
+            self._segments[name] = segment
+        else:
+            segment.refresh()
+        return segment
+
+    def columns(self):
+        for name in reversed(_segment_names(self.directory)):
+            segment = self._segment(name)
+            if segment is not None and segment.columns:
+                return segment.columns
+        return ()
+
+    def query(self, column, start=None, end=None):
+        # Returns (timestamps, values) as array('d'), timestamps in seconds
+        start_ms = -(1 << 62) if start is None else int(start * 1000)
+        end_ms = (1 << 62) if end is None else int(end * 1000)
+        timestamps = array('d')
+        values = array('d')
+
+        names = _segment_names(self.directory)
+        live = set(names)
+        for stale in [name for name in self._segments if name not in live]:
+            self._segments.pop(stale).close()
+
+        starts = [_segment_start(name) for name in names]
+        first_segment = max(bisect_right(starts, start_ms) - 1, 0)
+        for name, segment_start in zip(names[first_segment:], starts[first_segment:]):
+            if segment_start > end_ms:
+                break
+            segment = self._segment(name)
+            if segment is None or column not in segment.columns:
+                continue
+            column_index = segment.columns.index(column)
+            scale = segment.scale
+
+            index = bisect_left(segment.lasts, start_ms)
+            while index < len(segment.firsts) and segment.firsts[index] <= end_ms:
+                block = segment.read_block(index, column_index)
+                index += 1
+                if block is None:
+                    continue
+                block_timestamps, block_values = block
+                for timestamp, value in zip(block_timestamps, block_values):
+                    if start_ms <= timestamp <= end_ms:
+                        timestamps.append(timestamp / 1000)
+                        values.append(value / scale)
+        return timestamps, values
+
+    def latest(self, column, seconds, now=None):
+        now = time.time() if now is None else now
+        return self.query(column, now - seconds, now)
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+
+class TimeSeriesStore:
+    # Single writer. Rows are buffered and written as one block every
+    # block_rows samples, or sooner (a short block) once the oldest buffered
+    # row is flush_seconds old on clock, so a crash loses and readers miss at
+    # most that much. A new segment starts every segment_seconds, which is
+    # also when the retention/compaction pass runs and merges the short
+    # blocks back into full ones.
+    def __init__(self, directory, columns, block_rows=60, segment_seconds=3600, scale=100,
+                 retention_seconds=RETENTION_SECONDS, fsync=False, flush_seconds=FLUSH_SECONDS,
+                 clock=time.monotonic):
+        self.directory = directory
+        self.columns = tuple(columns)
+        self.block_rows = block_rows
+        self.segment_ms = int(segment_seconds * 1000)
+        self.scale = scale
+        self.retention_seconds = retention_seconds
+        self.fsync = fsync
+        self.flush_seconds = flush_seconds
+        self.clock = clock
+        self._rows = []
+        self._buffered_at = None
+        self._fd = None
+        self._segment_start = None
+        self._last_ms = None
+        self._compacted = set()
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock = self._acquire_lock()
+        self._recover()
+
+    def _acquire_lock(self):
+        lock = open(os.path.join(self.directory, LOCK_NAME), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock.close()
+                raise StoreError(f"{self.directory} is already open for writing")
+        return lock
+
+    def _recover(self):
+        names = _segment_names(self.directory)
+        if not names:
+            return
+        path = os.path.join(self.directory, names[-1])
+        with open(path, 'rb') as segment_file:
+            data = segment_file.read()
+        try:
+            columns, scale, offset = _decode_segment_header(data)
+        except TruncatedSegmentError:
+            # Crashed while creating the segment; it holds no samples
+            os.remove(path)
+            return
+        except StoreError:
+            return
+        if columns != self.columns or scale != self.scale:
+            # Different layout: leave it alone and start a fresh segment on
+            # the next append
+            return
+
+        blocks, valid_end = _scan_blocks(data, offset, len(data), verify=True)
+        self._fd = os.open(path, os.O_WRONLY | getattr(os, 'O_BINARY', 0))
+        if valid_end < len(data):
+            os.ftruncate(self._fd, valid_end)
+        os.lseek(self._fd, valid_end, os.SEEK_SET)
+        self._segment_start = _segment_start(names[-1])
+        self._last_ms = blocks[-1][1] if blocks else None
+
+    def append(self, timestamp, **values):
+        timestamp_ms = int(round(timestamp * 1000))
+        if self._last_ms is not None and timestamp_ms <= self._last_ms:
+            # Keep timestamps strictly increasing if the wall clock steps back
+            timestamp_ms = self._last_ms + 1
+        self._last_ms = timestamp_ms
+
+        if self._segment_start is None or timestamp_ms >= self._segment_start + self.segment_ms:
+            self._roll(timestamp_ms)
+
+        now = self.clock()
+        if not self._rows:
+            self._buffered_at = now
+        scale = self.scale
+        self._rows.append((timestamp_ms,) + tuple(int(round(values.get(name, 0.0) * scale))
+                                                  for name in self.columns))
+        if len(self._rows) >= self.block_rows or now - self._buffered_at >= self.flush_seconds:
+            self.flush()
+
+    def append_snapshot(self, snapshot):
+        self.append(snapshot.timestamp, **{column: getattr(snapshot, field)
+                                           for column, field in STORE_COLUMNS.items()
+                                           if column in self.columns})
+
+    def flush(self):
+        if not self._rows or self._fd is None:
+            return
+        block = _encode_block(self._rows)
+        self._rows = []
+        os.write(self._fd, block)
+        if self.fsync:
+            os.fsync(self._fd)
+
+    def _roll(self, timestamp_ms):
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+        path = os.path.join(self.directory, _segment_name(timestamp_ms))
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+        os.write(self._fd, _encode_segment_header(self.columns, self.scale))
+        self._segment_start = timestamp_ms
+        self.compact(now=timestamp_ms / 1000)
+
+    def compact(self, now=None):
+        # Drops closed segments older than the retention window and rewrites
+        # closed segments made of several short blocks (frequent flushes,
+        # restarts) into full blocks. Rewrites go through os.replace, so
+        # readers holding the old mapping keep a consistent view.
+        now = time.time() if now is None else now
+        cutoff_ms = int((now - self.retention_seconds) * 1000)
+        names = _segment_names(self.directory)
+        active = _segment_name(self._segment_start) if self._segment_start is not None else None
+
+        for name, next_name in zip(names, names[1:] + [None]):
+            if name == active:
+                continue
+            path = os.path.join(self.directory, name)
+            segment_end = _segment_start(next_name) if next_name else _segment_start(name) + self.segment_ms
+            if segment_end <= cutoff_ms:
+                os.remove(path)
+                self._compacted.discard(name)
+                continue
+            if name not in self._compacted:
+                self._defragment(path)
+                self._compacted.add(name)
+
+    def _defragment(self, path):
+        with open(path, 'rb') as segment_file:
+            data = segment_file.read()
+        try:
+            columns, scale, offset = _decode_segment_header(data)
+        except StoreError:
+            return
+        blocks, _ = _scan_blocks(data, offset, len(data), verify=True)
+        if sum(1 for block in blocks if block[3] < self.block_rows) < 2:
+            return
+
+        rows = []
+        for first, last, block_offset, count in blocks:
+            payload = block_offset + BLOCK_HEADER.size
+            column_values = []
+            for _ in range(len(columns) + 1):
+                column, payload = _decode_column(data, payload)
+                column_values.append(column)
+            rows.extend(zip(*column_values))
+
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as segment_file:
+            segment_file.write(_encode_segment_header(columns, scale))
+            for start in range(0, len(rows), self.block_rows):
+                segment_file.write(_encode_block(rows[start:start + self.block_rows]))
+            segment_file.flush()
+            os.fsync(segment_file.fileno())
+        os.replace(temp_path, path)
+
+    def reader(self):
+        return TimeSeriesReader(self.directory)
+
+    def close(self):
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._lock is not None:
+            self._lock.close()
+            self._lock = None
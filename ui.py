@@ -1,31 +1,150 @@
 # ui.py
 
+import os
+import time
 import tkinter as tk
 from tkinter import ttk
-from constants import THEMES, UPDATE_INTERVAL, MAX_HISTORY
+from constants import (THEMES, UPDATE_INTERVAL, MAX_HISTORY, TIME_RANGES, DEFAULT_TIME_RANGE, TOP_PROCESSES,
+                       ROLLING_WINDOWS, DEFAULT_ROLLING_WINDOW, HOST_ROWS, CHART_FRAME_BUDGET, CGROUP_ROWS,
+                       DISK_LABEL_MOUNTS)
+from system_stats import format_network_speed
+
+
+# Labels update_display() sets, for a UI without widgets
+DETACHED_LABELS = ('cpu_label', 'cpu_stats_label', 'cores_label', 'ram_label', 'ram_stats_label', 'gpu_label',
+                   'gpu_stats_label', 'disk_label', 'disk_io_label', 'disk_io_stats_label', 'net_up_label',
+                   'net_down_label', 'net_stats_label', 'processes_label')
+
+
+class _DetachedWidget:
+    # Label or table stand-in for a UI built without widgets; keeps what was
+    # last configured so it can be inspected
+    def __init__(self):
+        self.options = {}
+        self.rows = {}
+
+    def config(self, **options):
+        self.options.update(options)
+
+    def item(self, row, **options):
+        self.rows[row] = options
 
 
 class SystemMonitorUI:
-    def __init__(self, root, stats_manager, chart_manager):
+    # build_widgets=False skips the window, widgets and intro animation and
+    # gives update_display() stand-in labels and tables instead, so the
+    # update and render logic runs without a display (tests, benchmarks);
+    # root then only needs after_idle()
+    def __init__(self, root, sampler, chart_manager, instrumentation=None, alerts=None, hosts=None, flight=None,
+                 cgroups=False, build_widgets=True):
         self.root = root
-        self.stats_manager = stats_manager
+        self.sampler = sampler
+        self.stats_manager = sampler.stats_manager
+        self._last_snapshot = None
         self.chart_manager = chart_manager
+        # Debug panel only when instrumentation is switched on (--debug)
+        self.instrumentation = instrumentation if instrumentation is not None and instrumentation.enabled else None
+        # AlertEngine (--alerts) whose firing rules are shown in a banner
+        self.alerts = alerts
+        self.shown_alerts = ()
+        # Collector (--collect): host selector and overview grid of all agents
+        self.hosts = hosts
+        self.host_names = ()
+        self.host_rows = {}
+        # FlightRecorder (--flight): its captures open from a "Spikes" menu
+        self.flight = flight
+        self.shown_captures = ()
+        # Child cgroup table (--cgroup-children)
+        self.cgroups = cgroups
         self.theme = 'dark'
         self.labels = {}
         self.chart_frames = {}
         self.section_frames = {}
         self.animation_step = 0
         self.label_animations = {}
-        
+        self.range_buttons = []
+        self.pending_charts = []
+        # Render scheduler: label texts as last configured, chart updates
+        # waiting for the next idle flush (latest per chart), and whether
+        # the window can be seen at all
+        self.label_text = {}
+        self.chart_updates = {}
+        self.flush_scheduled = False
+        self.mapped = True
+        self.obscured = False
+        self.charts_ready = False
+        self.time_range = DEFAULT_TIME_RANGE
+        self.rolling_window = DEFAULT_ROLLING_WINDOW
+        self.sampler.set_time_range(self.time_range)
+        self.chart_manager.set_time_range(self.time_range)
+        if not build_widgets:
+            self._detach_widgets()
+            return
+
         self.root.title("System Monitor")
-        self.root.geometry("900x600")
+        self.root.geometry("900x1030")
         self.root.resizable(True, True)
         
         self._setup_ui()
         self._apply_theme()
         self._animate_intro()
+        for sequence in ('<Map>', '<Unmap>', '<Visibility>'):
+            self.root.bind(sequence, self._on_visibility_change, add='+')
+        # Window and labels first; charts (and matplotlib) once Tk is idle
+        self.root.after_idle(self._build_next_chart)
+
+    def _detach_widgets(self):
+        keys = DETACHED_LABELS + (('cgroups_label',) if self.cgroups else ()) + \
+            (('debug_label',) if self.instrumentation is not None else ())
+        self.labels = {key: _DetachedWidget() for key in keys}
+        self.process_table = _DetachedWidget()
+        self.process_rows = list(range(TOP_PROCESSES))
+        self.process_row_values = [None] * TOP_PROCESSES
+        self.cgroup_table = _DetachedWidget()
+        self.cgroup_rows = list(range(CGROUP_ROWS))
+        self.cgroup_row_values = [None] * CGROUP_ROWS
 
     def _setup_ui(self):
+        # Chart time range selector
+        self.range_bar = tk.Frame(self.root)
+        self.range_bar.pack(fill='x', padx=12, pady=(12, 0))
+        self.time_range_var = tk.StringVar(value=self.time_range)
+        for label in TIME_RANGES:
+            button = tk.Radiobutton(self.range_bar, text=label, value=label, variable=self.time_range_var,
+                                    indicatoron=False, command=self._on_time_range_change,
+                                    font=('Arial', 9), padx=8, bd=1)
+            button.pack(side='left', padx=(0, 4))
+            self.range_buttons.append(button)
+        # Window of the min/avg/p95/max line under each value
+        self.rolling_window_var = tk.StringVar(value=self.rolling_window)
+        for label in reversed(tuple(ROLLING_WINDOWS)):
+            button = tk.Radiobutton(self.range_bar, text=label, value=label, variable=self.rolling_window_var,
+                                    indicatoron=False, command=self._on_rolling_window_change,
+                                    font=('Arial', 9), padx=8, bd=1)
+            button.pack(side='right', padx=(4, 0))
+            self.range_buttons.append(button)
+        self.rolling_caption = tk.Label(self.range_bar, text="Stats:", font=('Arial', 9))
+        self.rolling_caption.pack(side='right')
+        if self.flight is not None:
+            self.spikes_button = tk.Menubutton(self.range_bar, text="Spikes (0)", font=('Arial', 9), padx=8, bd=1,
+                                               relief='raised')
+            self.spikes_menu = tk.Menu(self.spikes_button, tearoff=False)
+            self.spikes_button.config(menu=self.spikes_menu)
+            self.spikes_button.pack(side='left', padx=(8, 0))
+        if self.hosts is not None:
+            self.host_var = tk.StringVar()
+            self.host_selector = ttk.Combobox(self.range_bar, textvariable=self.host_var, state='readonly',
+                                              width=18, font=('Arial', 9))
+            self.host_selector.pack(side='left', padx=(8, 0))
+            self.host_selector.bind('<<ComboboxSelected>>', lambda event: self._select_host(self.host_var.get()))
+        if self.alerts is not None:
+            self.alert_banner = tk.Label(self.root, text="", font=('Arial', 10, 'bold'), anchor='w', justify='left')
+            self.alert_banner.pack(fill='x', padx=12, pady=(6, 0))
+        if self.hosts is not None:
+            self.hosts_container = tk.Frame(self.root)
+            self.hosts_container.pack(fill='x', padx=12, pady=(12, 0))
+            self._create_section_in_container("Hosts", 'hosts_section', self.hosts_container, has_chart=False)
+        
         # Create main container with two columns (no scroll)
         self.main_container = tk.Frame(self.root)
         self.main_container.pack(fill='both', expand=True, padx=12, pady=12)
@@ -46,10 +165,34 @@ class SystemMonitorUI:
         self._create_section_in_container("Memory (RAM)", 'ram_section', self.right_column, has_chart=True)
         self._create_section_in_container("Network", 'network_section', self.right_column, has_chart=True)
         
+        # Per-core heatmap and process table side by side
+        self.cores_container = tk.Frame(self.root)
+        self.cores_container.pack(fill='x', padx=12, pady=(0, 0))
+        self.cores_left = tk.Frame(self.cores_container)
+        self.cores_left.pack(side='left', fill='both', expand=True, padx=(0, 8))
+        self.cores_right = tk.Frame(self.cores_container)
+        self.cores_right.pack(side='right', fill='both', expand=True, padx=(8, 0))
+        self._create_section_in_container("CPU Cores", 'cores_section', self.cores_left, has_chart=True)
+        self._create_section_in_container("Processes", 'processes_section', self.cores_right, has_chart=False)
+        if self.cgroups:
+            self._create_section_in_container("Cgroups", 'cgroups_section', self.cores_right, has_chart=False)
+        
         # Create disk section (full width at bottom)
         self.disk_container = tk.Frame(self.root)
         self.disk_container.pack(fill='x', padx=12, pady=(0, 12))
-        self._create_section_in_container("Disk", 'disk_section', self.disk_container, has_chart=False)
+        self._create_section_in_container("Disk", 'disk_section', self.disk_container, has_chart=True)
+        if self.instrumentation is not None:
+            self._create_section_in_container("Debug", 'debug_section', self.disk_container, has_chart=False)
+
+    def _on_time_range_change(self):
+        self.time_range = self.time_range_var.get()
+        self.sampler.set_time_range(self.time_range)
+        self.chart_manager.set_time_range(self.time_range)
+        self._last_snapshot = None
+
+    def _on_rolling_window_change(self):
+        self.rolling_window = self.rolling_window_var.get()
+        self._last_snapshot = None
 
     def _on_mousewheel(self, event):
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
@@ -71,41 +214,115 @@ class SystemMonitorUI:
         if section_key == 'cpu_section':
             self.labels['cpu_label'] = tk.Label(content_frame, text="CPU: 0.0%", font=('Arial', 10, 'bold'))
             self.labels['cpu_label'].pack(anchor='w', pady=(6, 4))
+            self.labels['cpu_stats_label'] = tk.Label(content_frame, text="", font=('Arial', 8), justify='left')
+            self.labels['cpu_stats_label'].pack(anchor='w', pady=(0, 4))
             self.label_animations['cpu_label'] = {'current': '0.0', 'target': '0.0'}
             if has_chart:
                 chart_frame = tk.Frame(content_frame)
                 chart_frame.pack(fill='both', expand=False, pady=(0, 0))
-                chart_frame.configure(height=80)
                 self.chart_frames['cpu'] = chart_frame
-                self.chart_manager.create_cpu_chart(chart_frame, width=3.5, height=0.85)
+                self._defer_chart(chart_frame, self.chart_manager.create_cpu_chart, width=3.5, height=0.85)
         
         elif section_key == 'ram_section':
             self.labels['ram_label'] = tk.Label(content_frame, text="RAM: 0.0 / 0.0 GB (0.0%)", 
                                                 font=('Arial', 10, 'bold'))
             self.labels['ram_label'].pack(anchor='w', pady=(0, 4))
+            self.labels['ram_stats_label'] = tk.Label(content_frame, text="", font=('Arial', 8), justify='left')
+            self.labels['ram_stats_label'].pack(anchor='w', pady=(0, 4))
             self.label_animations['ram_label'] = {'current': '0.0', 'target': '0.0'}
             if has_chart:
                 chart_frame = tk.Frame(content_frame)
                 chart_frame.pack(fill='both', expand=False, pady=(0, 0))
-                chart_frame.configure(height=80)
                 self.chart_frames['ram'] = chart_frame
-                self.chart_manager.create_ram_chart(chart_frame, width=3.5, height=0.85)
+                self._defer_chart(chart_frame, self.chart_manager.create_ram_chart, width=3.5, height=0.85)
         
         elif section_key == 'gpu_section':
             self.labels['gpu_label'] = tk.Label(content_frame, text="GPU: 0.0% / No GPU", font=('Arial', 10, 'bold'))
             self.labels['gpu_label'].pack(anchor='w', pady=(0, 4))
+            self.labels['gpu_stats_label'] = tk.Label(content_frame, text="", font=('Arial', 8), justify='left')
+            self.labels['gpu_stats_label'].pack(anchor='w', pady=(0, 4))
             self.label_animations['gpu_label'] = {'current': '0.0', 'target': '0.0'}
             if has_chart:
                 chart_frame = tk.Frame(content_frame)
                 chart_frame.pack(fill='both', expand=False, pady=(0, 0))
-                chart_frame.configure(height=80)
                 self.chart_frames['gpu'] = chart_frame
-                self.chart_manager.create_gpu_chart(chart_frame, width=3.5, height=0.85)
+                self._defer_chart(chart_frame, self.chart_manager.create_gpu_chart, width=3.5, height=0.85)
+        
+        elif section_key == 'cores_section':
+            self.labels['cores_label'] = tk.Label(content_frame, text="Cores: -", font=('Arial', 10, 'bold'))
+            self.labels['cores_label'].pack(anchor='w', pady=(0, 4))
+            if has_chart:
+                chart_frame = tk.Frame(content_frame)
+                chart_frame.pack(fill='both', expand=False, pady=(0, 0))
+                self.chart_frames['heatmap'] = chart_frame
+                self._defer_chart(chart_frame, self.chart_manager.create_heatmap_chart, width=3.5, height=0.85)
+        
+        elif section_key == 'processes_section':
+            self.labels['processes_label'] = tk.Label(content_frame, text="Processes: 0",
+                                                      font=('Arial', 10, 'bold'))
+            self.labels['processes_label'].pack(anchor='w', pady=(0, 4))
+            columns = ('pid', 'name', 'user', 'cpu', 'memory')
+            self.process_table = ttk.Treeview(content_frame, columns=columns, show='headings',
+                                              height=TOP_PROCESSES, style='Monitor.Treeview')
+            for column, heading, width, anchor in (('pid', 'PID', 60, 'e'), ('name', 'Name', 150, 'w'),
+                                                   ('user', 'User', 80, 'w'), ('cpu', 'CPU %', 60, 'e'),
+                                                   ('memory', 'Memory', 80, 'e')):
+                self.process_table.heading(column, text=heading)
+                self.process_table.column(column, width=width, anchor=anchor, stretch=(column == 'name'))
+            self.process_table.pack(fill='x')
+            # Fixed rows, updated in place
+            self.process_rows = [self.process_table.insert('', 'end', values=('', '', '', '', ''))
+                                 for _ in range(TOP_PROCESSES)]
+            self.process_row_values = [None] * TOP_PROCESSES
+        
+        elif section_key == 'cgroups_section':
+            self.labels['cgroups_label'] = tk.Label(content_frame, text="Cgroup: -", font=('Arial', 10, 'bold'))
+            self.labels['cgroups_label'].pack(anchor='w', pady=(0, 4))
+            columns = ('name', 'cpu', 'memory')
+            self.cgroup_table = ttk.Treeview(content_frame, columns=columns, show='headings', height=CGROUP_ROWS,
+                                             style='Monitor.Treeview')
+            for column, heading, width, anchor in (('name', 'Child cgroup', 220, 'w'), ('cpu', 'CPU %', 60, 'e'),
+                                                   ('memory', 'Memory', 80, 'e')):
+                self.cgroup_table.heading(column, text=heading)
+                self.cgroup_table.column(column, width=width, anchor=anchor, stretch=(column == 'name'))
+            self.cgroup_table.pack(fill='x')
+            self.cgroup_rows = [self.cgroup_table.insert('', 'end', values=('', '', '')) for _ in range(CGROUP_ROWS)]
+            self.cgroup_row_values = [None] * CGROUP_ROWS
         
         elif section_key == 'disk_section':
             self.labels['disk_label'] = tk.Label(content_frame, text="Disk: 0.0%", font=('Arial', 10, 'bold'))
             self.labels['disk_label'].pack(anchor='w')
             self.label_animations['disk_label'] = {'current': '0.0', 'target': '0.0'}
+            self.labels['disk_io_label'] = tk.Label(content_frame, text="Read: 0.00 KB/s | Write: 0.00 KB/s",
+                                                    font=('Arial', 10, 'bold'))
+            self.labels['disk_io_label'].pack(anchor='w', pady=(0, 4))
+            self.labels['disk_io_stats_label'] = tk.Label(content_frame, text="", font=('Arial', 8), justify='left')
+            self.labels['disk_io_stats_label'].pack(anchor='w', pady=(0, 4))
+            if has_chart:
+                chart_frame = tk.Frame(content_frame)
+                chart_frame.pack(fill='both', expand=False, pady=(0, 0))
+                self.chart_frames['disk_io'] = chart_frame
+                self._defer_chart(chart_frame, self.chart_manager.create_disk_io_chart, width=7.5, height=0.85)
+        
+        elif section_key == 'hosts_section':
+            self.labels['hosts_label'] = tk.Label(content_frame, text="Hosts: 0", font=('Arial', 10, 'bold'))
+            self.labels['hosts_label'].pack(anchor='w', pady=(0, 4))
+            columns = ('host', 'state', 'cpu', 'ram', 'up', 'down', 'read', 'write')
+            self.host_table = ttk.Treeview(content_frame, columns=columns, show='headings', height=HOST_ROWS,
+                                           style='Monitor.Treeview', selectmode='browse')
+            for column, heading, width, anchor in (('host', 'Host', 140, 'w'), ('state', 'State', 60, 'w'),
+                                                   ('cpu', 'CPU %', 60, 'e'), ('ram', 'RAM %', 60, 'e'),
+                                                   ('up', 'Up', 90, 'e'), ('down', 'Down', 90, 'e'),
+                                                   ('read', 'Read', 90, 'e'), ('write', 'Write', 90, 'e')):
+                self.host_table.heading(column, text=heading)
+                self.host_table.column(column, width=width, anchor=anchor, stretch=(column == 'host'))
+            self.host_table.pack(fill='x')
+            # Row ids are host names; clicking a row shows that host
+            self.host_table.bind('<<TreeviewSelect>>', self._on_host_table_select)
+        
+        elif section_key == 'debug_section':
+            self.labels['debug_label'] = tk.Label(content_frame, text="", font=('Courier', 9), justify='left')
+            self.labels['debug_label'].pack(anchor='w')
         
         elif section_key == 'network_section':
             stats_frame = tk.Frame(content_frame)
@@ -114,12 +331,33 @@ class SystemMonitorUI:
             self.labels['net_up_label'].pack(anchor='w')
             self.labels['net_down_label'] = tk.Label(stats_frame, text="Download: 0.00 KB/s", font=('Arial', 10, 'bold'))
             self.labels['net_down_label'].pack(anchor='w')
+            self.labels['net_stats_label'] = tk.Label(stats_frame, text="", font=('Arial', 8), justify='left')
+            self.labels['net_stats_label'].pack(anchor='w')
             if has_chart:
                 chart_frame = tk.Frame(content_frame)
                 chart_frame.pack(fill='both', expand=False, pady=(0, 0))
-                chart_frame.configure(height=80)
                 self.chart_frames['network'] = chart_frame
-                self.chart_manager.create_network_chart(chart_frame, width=3.5, height=0.85)
+                self._defer_chart(chart_frame, self.chart_manager.create_network_chart, width=3.5, height=0.85)
+
+    def _defer_chart(self, frame, create, width, height):
+        # Reserve the chart's space now, build it later
+        frame.configure(height=int(height * 100))
+        self.pending_charts.append((frame, create, width, height))
+
+    def _build_next_chart(self):
+        # One chart per idle slot so the window keeps painting in between
+        if self.pending_charts:
+            frame, create, width, height = self.pending_charts.pop(0)
+            try:
+                create(frame, width=width, height=height)
+            except Exception as e:
+                print(f"Chart error: {e}")
+            self.root.after_idle(self._build_next_chart)
+            return
+        self.charts_ready = True
+        # Redraw everything into the new charts
+        self._last_snapshot = None
+        self.update_display()
 
     def _create_cpu_section(self):
         pass
@@ -140,30 +378,205 @@ class SystemMonitorUI:
         pass
 
     def update_display(self):
-        self.stats_manager.update(MAX_HISTORY)
+        # Runs on the Tk thread: only reads the sampler's latest snapshot.
+        # Nothing is drawn while the window is minimized or covered; the
+        # sampler keeps filling the history meanwhile
+        if not self.mapped or self.obscured:
+            return
+        if self.alerts is not None and self.alerts.firing is not self.shown_alerts:
+            self._update_alert_banner()
+        if self.hosts is not None:
+            self._update_hosts()
+        if self.flight is not None and self.flight.captures is not self.shown_captures:
+            self._update_spikes_menu()
+        snapshot = self.sampler.latest()
+        if snapshot is None or snapshot is self._last_snapshot:
+            return
+        self._last_snapshot = snapshot
+        
+        rolling = snapshot.rolling[self.rolling_window]
+        # In a container CPU is of its quota and RAM of its memory limit
+        cgroup = snapshot.cgroup
+        quota = f" of {cgroup.cpu_limit:g} CPUs in {cgroup.path}" if cgroup is not None else ""
+        self._set_label('cpu_label', f"CPU: {snapshot.cpu_percent:.1f}%{quota}")
+        self._set_label('cpu_stats_label', _format_percent_stats(rolling['cpu']))
+        timestamps = snapshot.history_timestamps
+        self._queue_chart('update_cpu_chart', snapshot.cpu_history, timestamps)
+        
+        limit = " (cgroup limit)" if cgroup is not None and cgroup.memory_limit is not None else ""
+        self._set_label('ram_label', f"RAM: {snapshot.ram_used_gb:.2f} / {snapshot.ram_total_gb:.2f} GB "
+                                     f"({snapshot.ram_percent:.1f}%){limit}")
+        self._set_label('ram_stats_label', _format_percent_stats(rolling['ram']))
+        self._queue_chart('update_ram_chart', snapshot.ram_history, timestamps)
         
-        cpu_percent = self.stats_manager.get_cpu_percent()
-        self.labels['cpu_label'].config(text=f"CPU: {cpu_percent:.1f}%")
-        self.chart_manager.update_cpu_chart(self.stats_manager.cpu_history)
+        self._set_label('gpu_label', f"GPU: {snapshot.gpu_percent:.1f}% / {snapshot.gpu_name}")
+        self._set_label('gpu_stats_label', _format_percent_stats(rolling['gpu']))
+        self._queue_chart('update_gpu_chart', snapshot.gpu_history, timestamps)
         
-        used_gb, total_gb, ram_percent = self.stats_manager.get_ram_info()
-        self.labels['ram_label'].config(text=f"RAM: {used_gb:.2f} / {total_gb:.2f} GB ({ram_percent:.1f}%)")
-        self.chart_manager.update_ram_chart(self.stats_manager.ram_history)
+        core_stats = snapshot.core_stats
+        if core_stats is not None:
+            self._set_label('cores_label',
+                            f"Cores: {core_stats.cores} | Max: #{core_stats.max_core} {core_stats.max_percent:.0f}% | "
+                            f"Busy: {core_stats.busy_cores} | Imbalance: {core_stats.imbalance:.1f}%")
+            self._queue_chart('update_heatmap_chart', snapshot.per_core_history)
         
-        gpu_percent, gpu_name = self.stats_manager.get_gpu_info()
-        self.labels['gpu_label'].config(text=f"GPU: {gpu_percent:.1f}% / {gpu_name}")
-        self.chart_manager.update_gpu_chart(self.stats_manager.gpu_history)
+        self._update_process_table(snapshot)
+        if self.cgroups:
+            self._update_cgroup_table(cgroup)
         
-        disk_percent = self.stats_manager.get_disk_info()
-        self.labels['disk_label'].config(text=f"Disk: {disk_percent:.1f}%")
+        self._set_label('disk_label', f"Disk: {_format_mounts(snapshot) or f'{snapshot.disk_percent:.1f}%'}")
+        self._set_label('disk_io_label',
+                        f"Read: {format_network_speed(snapshot.disk_read_kb)} ({snapshot.disk_read_iops:.0f} IOPS) | "
+                        f"Write: {format_network_speed(snapshot.disk_write_kb)} ({snapshot.disk_write_iops:.0f} IOPS)")
+        self._set_label('disk_io_stats_label', f"{_format_rate_stats('Read', rolling['disk_read'])}\n"
+                                               f"{_format_rate_stats('Write', rolling['disk_write'])}")
+        self._queue_chart('update_disk_io_chart', snapshot.disk_read_history, snapshot.disk_write_history, timestamps)
         
-        upload_kb, download_kb = self.stats_manager.get_network_speeds()
-        upload_str = self.stats_manager.format_network_speed(upload_kb)
-        download_str = self.stats_manager.format_network_speed(download_kb)
-        self.labels['net_up_label'].config(text=f"Upload: {upload_str}")
-        self.labels['net_down_label'].config(text=f"Download: {download_str}")
-        self.chart_manager.update_network_chart(self.stats_manager.net_up_history, 
-                                                self.stats_manager.net_down_history)
+        upload_str = format_network_speed(snapshot.net_up_kb)
+        download_str = format_network_speed(snapshot.net_down_kb)
+        self._set_label('net_up_label', f"Upload: {upload_str}")
+        self._set_label('net_down_label', f"Download: {download_str}")
+        self._set_label('net_stats_label', f"{_format_rate_stats('Up', rolling['net_up'])}\n"
+                                           f"{_format_rate_stats('Down', rolling['net_down'])}")
+        self._queue_chart('update_network_chart', snapshot.net_up_history, snapshot.net_down_history, timestamps)
+        
+        if self.instrumentation is not None:
+            self._update_debug_panel()
+
+    def _set_label(self, key, text):
+        # Tk relayouts on every config(); skip texts that did not change
+        if self.label_text.get(key) != text:
+            self.labels[key].config(text=text)
+            self.label_text[key] = text
+
+    def _queue_chart(self, method, *args):
+        # A newer update for the same chart replaces one not yet drawn
+        self.chart_updates[method] = args
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.root.after_idle(self._flush_idle)
+
+    def _flush_idle(self):
+        self.flush_scheduled = False
+        if self.flush_charts(CHART_FRAME_BUDGET / 1000):
+            # Over budget: the rest waits for the next idle slot, so input
+            # and expose events are handled in between
+            self.flush_scheduled = True
+            self.root.after_idle(self._flush_idle)
+
+    def flush_charts(self, budget=None):
+        # Draws queued chart updates, stopping once budget seconds are spent
+        # (at least one is drawn); -> whether any are left
+        start = time.perf_counter()
+        while self.chart_updates:
+            method = next(iter(self.chart_updates))
+            args = self.chart_updates.pop(method)
+            try:
+                getattr(self.chart_manager, method)(*args)
+            except Exception as e:
+                print(f"Chart error: {e}")
+            if budget is not None and time.perf_counter() - start >= budget:
+                break
+        return bool(self.chart_updates)
+
+    def _on_visibility_change(self, event):
+        # Bound on root, so children's events arrive here too
+        if event.widget is not self.root:
+            return
+        was_visible = self.mapped and not self.obscured
+        if event.type == tk.EventType.Map:
+            self.mapped = True
+        elif event.type == tk.EventType.Unmap:
+            self.mapped = False
+        else:
+            self.obscured = event.state == 'VisibilityFullyObscured'
+        visible = self.mapped and not self.obscured
+        if not visible:
+            self.chart_updates.clear()
+        elif not was_visible:
+            # Catch up with one redraw of the latest snapshot, whose
+            # histories hold everything sampled while hidden
+            self._last_snapshot = None
+            self.root.after_idle(self.update_display)
+
+    def _update_spikes_menu(self):
+        self.shown_captures = self.flight.captures
+        self.spikes_button.config(text=f"Spikes ({len(self.shown_captures)})")
+        self.spikes_menu.delete(0, 'end')
+        for capture in reversed(self.shown_captures):
+            stamp = time.strftime('%H:%M:%S', time.localtime(capture.trigger_time))
+            self.spikes_menu.add_command(label=f"{stamp}  {capture.reason}",
+                                         command=lambda capture=capture: self._show_capture(capture))
+
+    def _show_capture(self, capture):
+        from flight import show_capture
+        show_capture(self.root, capture, self.theme)
+
+    def _update_alert_banner(self):
+        self.shown_alerts = self.alerts.firing
+        self.alert_banner.config(text='\n'.join(f"\u26a0 {event.message}" for event in self.shown_alerts))
+
+    def _update_hosts(self):
+        names = tuple(self.hosts.host_names())
+        if names != self.host_names:
+            self.host_names = names
+            self.host_selector.config(values=names)
+        if self.hosts.selected is not None and self.host_var.get() != self.hosts.selected:
+            self.host_var.set(self.hosts.selected)
+        overview = self.hosts.overview()
+        self._set_label('hosts_label',
+                        f"Hosts: {len(overview)} | Online: {sum(1 for host in overview if host.state == 'online')}")
+        for host in overview:
+            values = (host.name, host.state, f"{host.cpu_percent:.1f}", f"{host.ram_percent:.1f}",
+                      format_network_speed(host.net_up_kb), format_network_speed(host.net_down_kb),
+                      format_network_speed(host.disk_read_kb), format_network_speed(host.disk_write_kb))
+            previous = self.host_rows.get(host.name)
+            if previous is None:
+                self.host_table.insert('', 'end', iid=host.name, values=values)
+            elif values != previous:
+                self.host_table.item(host.name, values=values)
+            self.host_rows[host.name] = values
+
+    def _on_host_table_select(self, event):
+        selection = self.host_table.selection()
+        if selection:
+            self._select_host(selection[0])
+
+    def _select_host(self, name):
+        if name and name != self.hosts.selected:
+            self.host_var.set(name)
+            self.hosts.select(name)
+            self._last_snapshot = None
+
+    def _update_debug_panel(self):
+        self._set_label('debug_label', self.instrumentation.format_report())
+
+    def _update_process_table(self, snapshot):
+        self._set_label('processes_label', f"Processes: {snapshot.process_count}")
+        processes = snapshot.top_cpu_processes
+        for index, row in enumerate(self.process_rows):
+            if index < len(processes):
+                process = processes[index]
+                values = (process.pid, process.name, process.username, f"{process.cpu_percent:.1f}",
+                          f"{process.memory_mb:.0f} MB")
+            else:
+                values = ('', '', '', '', '')
+            if values != self.process_row_values[index]:
+                self.process_table.item(row, values=values)
+                self.process_row_values[index] = values
+
+    def _update_cgroup_table(self, cgroup):
+        children = cgroup.children if cgroup is not None else ()
+        self._set_label('cgroups_label', f"Cgroup: {cgroup.path}" if cgroup is not None else "Cgroup: -")
+        for index, row in enumerate(self.cgroup_rows):
+            if index < len(children):
+                child = children[index]
+                values = (child.name, f"{child.cpu_percent:.1f}", f"{child.memory_bytes / 1024 ** 2:.0f} MB")
+            else:
+                values = ('', '', '')
+            if values != self.cgroup_row_values[index]:
+                self.cgroup_table.item(row, values=values)
+                self.cgroup_row_values[index] = values
 
     def _apply_theme(self):
         theme_colors = THEMES[self.theme]
@@ -173,6 +586,28 @@ class SystemMonitorUI:
         self.left_column.config(bg=theme_colors['bg'])
         self.right_column.config(bg=theme_colors['bg'])
         self.disk_container.config(bg=theme_colors['bg'])
+        self.cores_container.config(bg=theme_colors['bg'])
+        self.cores_left.config(bg=theme_colors['bg'])
+        self.cores_right.config(bg=theme_colors['bg'])
+        
+        style = ttk.Style(self.root)
+        style.configure('Monitor.Treeview', background=theme_colors['section_bg'], foreground=theme_colors['fg'],
+                        fieldbackground=theme_colors['section_bg'], borderwidth=0, font=('Arial', 9))
+        style.configure('Monitor.Treeview.Heading', background=theme_colors['accent'],
+                        foreground=theme_colors['fg'], font=('Arial', 9, 'bold'))
+        self.range_bar.config(bg=theme_colors['bg'])
+        if self.hosts is not None:
+            self.hosts_container.config(bg=theme_colors['bg'])
+        if self.flight is not None:
+            self.spikes_button.config(bg=theme_colors['accent'], fg=theme_colors['fg'],
+                                      activebackground=theme_colors['accent_hover'],
+                                      activeforeground=theme_colors['fg'])
+        self.rolling_caption.config(bg=theme_colors['bg'], fg=theme_colors['fg'])
+        if self.alerts is not None:
+            self.alert_banner.config(bg=theme_colors['bg'], fg=theme_colors['alert'])
+        for button in self.range_buttons:
+            button.config(bg=theme_colors['accent'], fg=theme_colors['fg'], selectcolor=theme_colors['accent_hover'],
+                          activebackground=theme_colors['accent_hover'], activeforeground=theme_colors['fg'])
         
         for section_key, frame in self.section_frames.items():
             self._apply_section_theme(frame, theme_colors)
@@ -222,3 +657,23 @@ class SystemMonitorUI:
         
         button.bind('<Enter>', on_enter)
         button.bind('<Leave>', on_leave)
+
+
+def _format_mounts(snapshot):
+    # The system mount, then the fullest others; the rest only counted so
+    # a machine with many mounts keeps the label on one line
+    system = os.path.normcase(os.path.splitdrive(os.path.abspath(os.sep))[0] + os.sep)
+    mounts = sorted(snapshot.mounts, key=lambda mount: (os.path.normcase(mount.mountpoint) != system, -mount.percent))
+    text = '  '.join(f"{mount.mountpoint} {mount.percent:.1f}%" for mount in mounts[:DISK_LABEL_MOUNTS])
+    if len(mounts) > DISK_LABEL_MOUNTS:
+        text += f"  +{len(mounts) - DISK_LABEL_MOUNTS} more"
+    return text
+
+
+def _format_percent_stats(stats):
+    return f"min {stats.min:.1f}  avg {stats.mean:.1f}  p95 {stats.p95:.1f}  max {stats.max:.1f}%"
+
+
+def _format_rate_stats(title, stats):
+    return (f"{title}: avg {format_network_speed(stats.mean)}  p95 {format_network_speed(stats.p95)}  "
+            f"max {format_network_speed(stats.max)}")